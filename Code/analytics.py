@@ -0,0 +1,176 @@
+# analytics.py
+# Columnar (NumPy) view of a class's marks for class-wide analytics.
+#
+# Each class becomes a students x subjects int32 array plus a "present"
+# mask, so totals, ranks and statistics are vectorized instead of walking
+# per-student marks dicts. Requires numpy; the app imports this lazily.
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (label, lowest mark in band), ascending
+GRADE_BANDS: List[Tuple[str, int]] = [("F", 0), ("D", 35), ("C", 50), ("B", 60), ("A", 75), ("A+", 90)]
+
+
+class MarksMatrix:
+    """
+    students x subjects marks array for one class.
+    Rows follow cls["students"], columns follow cls["subjects"]. Missing or
+    non-integer marks are masked out (they count as 0 in totals, like
+    compute_totals_and_ranks). SchoolService.parse_mark() keeps marks
+    within int32, so no valid mark is masked out as an overflow.
+    """
+
+    def __init__(self, data: Dict[str, Any], class_id: str):
+        self.data = data
+        self.class_id = class_id
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        cls = self.data.get("classes", {}).get(self.class_id, {})
+        self.students: List[str] = list(cls.get("students", []) or [])
+        self.subjects: List[str] = list(cls.get("subjects", []) or [])
+        self._row: Dict[str, int] = {sid: i for i, sid in enumerate(self.students)}
+        self._col: Dict[str, int] = {sub: j for j, sub in enumerate(self.subjects)}
+        n, m = len(self.students), len(self.subjects)
+        self._values = np.zeros((max(n, 16), m), dtype=np.int32)
+        self._present = np.zeros((max(n, 16), m), dtype=bool)
+        for i, sid in enumerate(self.students):
+            self._load_row(i, sid)
+
+    def _load_row(self, i: int, sid: str) -> None:
+        marks = self.data.get("students", {}).get(sid, {}).get("marks", {})
+        for sub, val in marks.items():
+            j = self._col.get(sub)
+            if j is not None:
+                self._store(i, j, val)
+
+    def _store(self, i: int, j: int, val: Any) -> None:
+        try:
+            self._values[i, j] = int(val)
+            self._present[i, j] = True
+        except Exception:
+            self._values[i, j] = 0
+            self._present[i, j] = False
+
+    # ---------- keeping in sync ----------
+    def add_student(self, sid: str) -> None:
+        if sid in self._row:
+            return
+        i = len(self.students)
+        if i == self._values.shape[0]:
+            # grow capacity geometrically so bulk registration stays linear
+            grow = max(16, i)
+            self._values = np.vstack([self._values, np.zeros((grow, len(self.subjects)), np.int32)])
+            self._present = np.vstack([self._present, np.zeros((grow, len(self.subjects)), bool)])
+        self.students.append(sid)
+        self._row[sid] = i
+        self._load_row(i, sid)
+
+    def update_student(self, sid: str) -> None:
+        """Reload one student's row from data (adds them if new)."""
+        i = self._row.get(sid)
+        if i is None:
+            self.add_student(sid)
+            return
+        self._values[i] = 0
+        self._present[i] = False
+        self._load_row(i, sid)
+
+    def set_mark(self, sid: str, subject: str, value: Any) -> None:
+        i, j = self._row.get(sid), self._col.get(subject)
+        if i is not None and j is not None:
+            self._store(i, j, value)
+
+    # ---------- views ----------
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:len(self.students)]
+
+    @property
+    def present(self) -> np.ndarray:
+        return self._present[:len(self.students)]
+
+    def totals(self) -> np.ndarray:
+        return np.where(self.present, self.values, 0).sum(axis=1, dtype=np.int64)
+
+    def ranks(self) -> np.ndarray:
+        """Rank per row: 1 + number of students with a strictly higher total."""
+        totals = self.totals()
+        ascending = np.sort(totals)
+        return len(totals) - np.searchsorted(ascending, totals, side="right") + 1
+
+    def subject_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Per-subject count/mean/median/std over the marks that are present."""
+        vals = np.where(self.present, self.values, np.nan).astype(np.float64)
+        counts = self.present.sum(axis=0)
+        stats: Dict[str, Dict[str, Optional[float]]] = {}
+        for j, sub in enumerate(self.subjects):
+            if counts[j] == 0:
+                stats[sub] = {"count": 0, "mean": None, "median": None, "std": None}
+                continue
+            col = vals[:, j]
+            stats[sub] = {
+                "count": int(counts[j]),
+                "mean": float(np.nanmean(col)),
+                "median": float(np.nanmedian(col)),
+                "std": float(np.nanstd(col)),
+            }
+        return stats
+
+    def total_percentiles(self, qs: Sequence[float] = (25, 50, 75, 90)) -> Dict[float, float]:
+        totals = self.totals()
+        if not len(totals):
+            return {}
+        return dict(zip(qs, (float(p) for p in np.percentile(totals, qs))))
+
+    def top_n(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """(student_id, total, rank) for the n best totals, ties by student ID."""
+        totals = self.totals()
+        if not len(totals) or n <= 0:
+            return []
+        ranks = self.ranks()
+        if n < len(totals):
+            # only the rows that can make the cut need a full sort
+            cutoff = np.partition(totals, len(totals) - n)[len(totals) - n]
+            candidates = np.nonzero(totals >= cutoff)[0]
+        else:
+            candidates = np.arange(len(totals))
+        ordered = sorted(candidates, key=lambda i: (-totals[i], self.students[i]))[:n]
+        return [(self.students[i], int(totals[i]), int(ranks[i])) for i in ordered]
+
+    def grade_histogram(self, bands: Sequence[Tuple[str, int]] = GRADE_BANDS) -> Dict[str, Dict[str, int]]:
+        """Per subject, number of present marks falling in each grade band."""
+        labels = [label for label, _ in bands]
+        edges = np.array([low for _, low in bands[1:]])
+        band_idx = np.digitize(self.values, edges)
+        hist: Dict[str, Dict[str, int]] = {}
+        for j, sub in enumerate(self.subjects):
+            counts = np.bincount(band_idx[self.present[:, j], j], minlength=len(labels))
+            hist[sub] = dict(zip(labels, (int(c) for c in counts)))
+        return hist
+
+
+class MatrixIndex:
+    """Lazily built MarksMatrix per class, kept in sync alongside RankIndex."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self._classes: Dict[str, MarksMatrix] = {}
+
+    def for_class(self, class_id: str) -> MarksMatrix:
+        matrix = self._classes.get(class_id)
+        if matrix is None:
+            matrix = self._classes[class_id] = MarksMatrix(self.data, class_id)
+        return matrix
+
+    def update_student(self, class_id: str, sid: str) -> None:
+        if class_id in self._classes:
+            self._classes[class_id].update_student(sid)
+
+    def invalidate(self, class_id: Optional[str] = None) -> None:
+        if class_id is None:
+            self._classes.clear()
+        else:
+            self._classes.pop(class_id, None)
@@ -0,0 +1,335 @@
+# api.py
+# Local HTTP/JSON API over SchoolService, built on asyncio streams (stdlib only).
+#
+# One process serves every faculty and student client from a single
+# in-memory dataset. Run: python api.py [--host 127.0.0.1] [--port 8765]
+#
+#   POST /login                      {"role", "username", "password"} -> {"token", "first_login"}
+#   POST /logout                     ends the token's session
+#   POST /faculties                  {"username", "name", "password"}
+#   POST /password                   {"password"}                (student, token)
+#   GET  /classes                    faculty's classes           (faculty, token)
+#   POST /classes                    {"name"} -> {"class_id"}
+#   POST /classes/<cid>/subjects     {"subject"}
+#   POST /classes/<cid>/students     {"roll_no", "name"} -> {"student_id", "temp_password"}
+#   GET  /classes/<cid>/ranks        [{"rank", "student_id", "name", "roll_no", "total"}]
+#   GET  /classes/<cid>/assessments  [{"assessment_id", "name", "term", "weight"}]
+#   POST /classes/<cid>/assessments  {"name", "term", "weight", "from_current"} -> {"assessment_id"}
+#   GET  /classes/<cid>/trends       class averages per assessment and the most improved students
+#   GET  /assessments/<aid>/ranks    ranks by that assessment; aid "<cid>:weighted" uses the stored weights
+#   PUT  /students/<sid>/marks       {"marks": {subject: value}, "assessment"?: aid}
+#   GET  /students/<sid>             marks, total and rank
+#   GET  /students/<sid>/history     marks and total per assessment
+#   GET  /metrics                    latency percentiles, save sizes, counters (faculty)
+#
+# Authenticated requests send "Authorization: Bearer <token>". A token
+# expires after SESSION_TTL seconds unused. A student logged in with a
+# temporary password (first_login) may only POST /password until they have
+# changed it; changing it ends their other sessions.
+
+import argparse
+import asyncio
+import json
+import secrets
+import sys
+import time
+import traceback
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
+
+import assessments
+import instrument
+import storage
+from service import SchoolService, ServiceError
+
+MAX_BODY = 1 << 20
+SESSION_TTL = 8 * 3600  # idle seconds before a token stops working
+
+Session = Tuple[str, str]  # (role, username)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Login:
+    """One token's session; ``password_only`` until a temporary password is changed."""
+
+    __slots__ = ("session", "expires", "password_only")
+
+    def __init__(self, session: Session, password_only: bool):
+        self.session = session
+        self.expires = time.monotonic() + SESSION_TTL
+        self.password_only = password_only
+
+
+class SchoolAPI:
+    def __init__(self, service: SchoolService):
+        self.service = service
+        self.sessions: Dict[str, _Login] = {}
+
+    # ---------- plumbing ----------
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    # the body was not read, so the connection cannot carry on
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.dispatch(method, path, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return None
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "Bad Content-Length header.")
+        if length > MAX_BODY:
+            return None
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    async def dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Any]:
+        try:
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                raise HTTPError(400, "Body must be JSON.")
+            token = self._token(headers)
+            login = self._login(token)
+            session = login.session if login else None
+            parts = [p for p in path.split("/") if p]
+            if method == "POST" and parts == ["logout"]:
+                if login is None:
+                    raise HTTPError(401, "Login required.")
+                del self.sessions[token]
+                return 200, {"ok": True}
+            if login is not None and login.password_only and not (method == "POST" and parts == ["password"]):
+                raise HTTPError(403, "Change your temporary password first (POST /password).")
+            if method == "POST" and parts in (["login"], ["faculties"], ["password"]):
+                # password hashing is slow on purpose; keep it off the event loop
+                return 200, await self.route_credentials(parts[0], payload, session, token)
+            return 200, self.route(method, parts, payload, session)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except ServiceError as e:
+            status = 404 if e.title == "Not Found" else 400
+            return status, {"error": str(e), "title": e.title}
+        except Exception:
+            # details stay in the server log; clients only learn that it failed
+            print(f"Internal error on {method} {path}:", file=sys.stderr)
+            traceback.print_exc()
+            return 500, {"error": "Internal server error."}
+
+    @staticmethod
+    def _token(headers: Dict[str, str]) -> Optional[str]:
+        auth = headers.get("authorization", "")
+        return auth[7:] if auth.startswith("Bearer ") else None
+
+    def _login(self, token: Optional[str]) -> Optional[_Login]:
+        """The token's live session, its idle timer restarted; None if unknown or expired."""
+        login = self.sessions.get(token) if token else None
+        if login is None:
+            return None
+        now = time.monotonic()
+        if login.expires < now:
+            del self.sessions[token]
+            return None
+        login.expires = now + SESSION_TTL
+        return login
+
+    def _end_sessions(self, session: Optional[Session] = None, keep: Optional[str] = None) -> None:
+        """Drop expired tokens, and ``session``'s other than ``keep`` if given."""
+        now = time.monotonic()
+        for token, login in list(self.sessions.items()):
+            if login.expires < now or (token != keep and login.session == session):
+                del self.sessions[token]
+
+    @staticmethod
+    def _require(session: Optional[Session], role: str) -> str:
+        if session is None:
+            raise HTTPError(401, "Login required.")
+        if session[0] != role:
+            raise HTTPError(403, f"Only {role} accounts may do this.")
+        return session[1]
+
+    # ---------- routes ----------
+    async def route_credentials(self, action: str, body: Dict[str, Any], session: Optional[Session],
+                                token: Optional[str]) -> Any:
+        svc = self.service
+        loop = asyncio.get_running_loop()
+        if action == "login":
+            role = body.get("role", "faculty")
+            if role not in ("faculty", "student"):
+                raise HTTPError(400, "role must be 'faculty' or 'student'.")
+            uname = str(body.get("username", "")).strip()
+            record = await asyncio.wrap_future(
+                svc.authenticate_async(role, uname, str(body.get("password", "")).strip()))
+            first_login = bool(role == "student" and record.get("first_login", True))
+            self._end_sessions()  # sweep expired tokens
+            token = secrets.token_urlsafe(24)
+            self.sessions[token] = _Login((role, uname), password_only=first_login)
+            return {"token": token, "first_login": first_login}
+        if action == "faculties":
+            await loop.run_in_executor(svc.verifier.pool, svc.register_faculty, str(body.get("username", "")),
+                                       body.get("name", ""), body.get("password", ""))
+            return {"ok": True}
+        sid = self._require(session, "student")
+        await loop.run_in_executor(svc.verifier.pool, svc.change_student_password, sid, body.get("password", ""))
+        self._end_sessions(session, keep=token)
+        login = self.sessions.get(token)
+        if login is not None:
+            login.password_only = False
+        return {"ok": True}
+
+    def route(self, method: str, parts: list, body: Dict[str, Any], session: Optional[Session]) -> Any:
+        svc = self.service
+        svc.refresh()  # pick up writes from other processes sharing the store
+        if parts == ["classes"]:
+            fac = self._require(session, "faculty")
+            if method == "GET":
+                return [{"class_id": cid, "name": svc.data["classes"][cid]["name"]}
+                        for cid in svc.faculty_classes(fac)]
+            if method == "POST":
+                return {"class_id": svc.create_class(fac, str(body.get("name", "")))}
+        if len(parts) == 3 and parts[0] == "classes":
+            fac = self._require(session, "faculty")
+            cid = parts[1]
+            if parts[2] == "subjects" and method == "POST":
+                return {"subject": svc.add_subject(fac, cid, str(body.get("subject", "")))}
+            if parts[2] == "students" and method == "POST":
+                sid, pwd = svc.register_student(fac, cid, str(body.get("roll_no", "")), body.get("name", ""))
+                return {"student_id": sid, "temp_password": pwd}
+            if parts[2] == "assessments" and method == "GET":
+                svc.check_class_owner(fac, cid)
+                return svc.class_assessments(cid)
+            if parts[2] == "assessments" and method == "POST":
+                aid = svc.create_assessment(fac, cid, str(body.get("name", "")), str(body.get("term", "")),
+                                            body.get("weight", 1.0), bool(body.get("from_current")))
+                return {"assessment_id": aid}
+            if parts[2] == "trends" and method == "GET":
+                svc.check_class_owner(fac, cid)
+                return {"averages": svc.assessment_averages(cid),
+                        "most_improved": [{"student_id": sid, "before": old, "after": new, "gain": gain}
+                                          for sid, old, new, gain in svc.most_improved(cid)]}
+            if parts[2] == "ranks" and method == "GET":
+                svc.check_class_owner(fac, cid)
+                students = svc.data["students"]
+                return [{"rank": rank, "student_id": sid, "name": students[sid]["name"],
+                         "roll_no": students[sid]["roll_no"], "total": total}
+                        for rank, sid, total in svc.rank_list(cid)]
+        if len(parts) == 3 and parts[0] == "assessments" and parts[2] == "ranks" and method == "GET":
+            fac = self._require(session, "faculty")
+            cid = assessments.assessment_class(parts[1])
+            svc.check_class_owner(fac, cid)
+            if parts[1] == f"{cid}:weighted":
+                ranks = svc.assessment_ranks(cid, weights={})
+            else:
+                ranks = svc.assessment_ranks(cid, parts[1])
+            return sorted(({"rank": r["rank"], "student_id": sid, "total": r["total"]} for sid, r in ranks.items()),
+                          key=lambda r: (r["rank"], r["student_id"]))
+        if len(parts) == 3 and parts[0] == "students" and parts[2] == "marks" and method == "PUT":
+            marks = body.get("marks")
+            if not isinstance(marks, dict):
+                raise HTTPError(400, "'marks' must be an object.")
+            svc.set_marks(self._require(session, "faculty"), parts[1], marks, body.get("assessment"))
+            return svc.student_report(parts[1])
+        if len(parts) == 3 and parts[0] == "students" and parts[2] == "history" and method == "GET":
+            self._check_student_access(session, parts[1])
+            return svc.student_trajectory(parts[1])
+        if parts == ["metrics"] and method == "GET":
+            self._require(session, "faculty")
+            return instrument.metrics()
+        if len(parts) == 2 and parts[0] == "students" and method == "GET":
+            self._check_student_access(session, parts[1])
+            return svc.student_report(parts[1])
+        raise HTTPError(404, f"No route for {method} /{'/'.join(parts)}")
+
+    def _check_student_access(self, session: Optional[Session], sid: str) -> None:
+        """The student themself, or the faculty owning their class."""
+        if session is None:
+            raise HTTPError(401, "Login required.")
+        stu = self.service.data["students"].get(sid)
+        if not stu:
+            raise HTTPError(404, "No such student.")
+        if session[0] == "student" and session[1] != sid:
+            raise HTTPError(403, "Students may only view their own record.")
+        if session[0] == "faculty":
+            self.service.check_class_owner(session[1], stu["class_id"])
+
+
+async def _report_save_errors(writer) -> None:
+    """Log background write/fsync failures, which the writer retries until they succeed.
+
+    Conflicts never end up here: storage checks them before a write
+    returns, so the request that caused one gets the error as its reply.
+    """
+    while True:
+        await asyncio.sleep(0.5)
+        while not writer.errors.empty():
+            print("Save failed:", writer.errors.get_nowait(), file=sys.stderr)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, service: Optional[SchoolService] = None) -> None:
+    api = SchoolAPI(service or SchoolService())
+    reporter = asyncio.ensure_future(_report_save_errors(storage.start_writer()))
+    server = await asyncio.start_server(api.handle_client, host, port)
+    print(f"Serving on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reporter.cancel()
+        storage.stop_writer()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student Management System HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,24 +1,28 @@
 # app.py
+import os
+import queue
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from storage import load_data, save_data
-from utils import (
-    generate_student_id,
-    generate_temp_password,
-    compute_totals_and_ranks,
-)
-from datetime import datetime
-import random
-import re
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from service import SchoolService, ServiceError
+import assessments
+import bulk
+import instrument
+import reports
+import storage
+from widgets import EditableGrid, SearchBox, VirtualRankList
+from typing import List, Optional
 
 APP_TITLE = "Student Management System - Final Version"
-
-CLASS_NAME_REGEX = re.compile(r'^\d+[A-Za-z]$')  # starts with digits, ends with 1 letter
+# Edits within this many ms are written to disk together by the background writer.
+SAVE_WINDOW_MS = int(os.environ.get("SMS_SAVE_WINDOW_MS", "100"))
+SEARCH_RESULTS = 20  # rows in the dashboard's student search
+PICKER_ROWS = 50     # rows in the marks student picker
 
 
 class SMSApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, service: Optional[SchoolService] = None):
         super().__init__()
         self.title(APP_TITLE)
         self.geometry("980x620")
@@ -36,11 +40,39 @@ class SMSApp(tk.Tk):
                   foreground=[("active", "white")])
         style.configure("TButton", padding=6)
 
-        self.data = load_data()
+        self.service = service or SchoolService()
+        self.data = self.service.data
         self.current_user: Optional[str] = None
         self.current_role: Optional[str] = None
+        self._class_ids: List[str] = []  # class IDs backing class_combo, same order
+        self._writer = storage.start_writer(SAVE_WINDOW_MS / 1000)
+        self._report_pool = ThreadPoolExecutor(1, thread_name_prefix="reports")  # drives the process pool
+        self.after(500, self._poll_save_errors)
         self._build_login()
 
+    # ---------- BACKGROUND SAVES ----------
+    def _poll_save_errors(self):
+        try:
+            err = self._writer.errors.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            if isinstance(err, storage.ConflictError):
+                # the change was already undone in memory; the next sync refreshes the views
+                storage.sync(self.data)
+                messagebox.showwarning("Not Saved",
+                                       f"Another user changed the same record first:\n{err}\n\n"
+                                       "Your change was undone; please check and re-enter it.", parent=self)
+            else:
+                messagebox.showerror("Save Failed",
+                                     f"Could not write changes to disk:\n{err}\n\nThey will be retried.", parent=self)
+        self.after(500, self._poll_save_errors)
+
+    def destroy(self):
+        self._report_pool.shutdown(wait=False)
+        storage.stop_writer()
+        super().destroy()
+
     # ---------- LOGIN SCREEN ----------
     def _build_login(self):
         for w in self.winfo_children():
@@ -89,12 +121,10 @@ class SMSApp(tk.Tk):
             uname = simpledialog.askstring("Register Faculty", "Faculty username (unique):", parent=self)
             if uname is None:
                 return
-            uname = uname.strip()
-            if not uname:
-                messagebox.showwarning("Invalid", "Username cannot be empty.")
-                continue
-            if uname in self.data.get("faculties", {}):
-                messagebox.showerror("Exists", "Username already taken.")
+            try:
+                uname = self.service.check_faculty_username(uname)
+            except ServiceError as e:
+                messagebox.showerror(e.title, str(e))
                 continue
             break
         name = simpledialog.askstring("Full Name", "Enter full name:", parent=self)
@@ -106,8 +136,19 @@ class SMSApp(tk.Tk):
             messagebox.showwarning("Invalid", "Password required.")
             return
 
-        self.data["faculties"][uname] = {"name": name.strip(), "password": pwd}
-        save_data(self.data)
+        # the password hash takes a while; keep the mainloop live meanwhile
+        self.reg_btn.state(["disabled"])
+        future = self.service.verifier.pool.submit(self.service.register_faculty, uname, name, pwd)
+        self._when_done(future, lambda: self._finish_register(future))
+
+    def _finish_register(self, future):
+        if self.reg_btn.winfo_exists():
+            self.reg_btn.state(["!disabled"])
+        try:
+            future.result()
+        except ServiceError as e:
+            messagebox.showerror(e.title, str(e))
+            return
         messagebox.showinfo("Success", "Faculty registered successfully!")
 
     # ---------- LOGIN HANDLER ----------
@@ -115,37 +156,61 @@ class SMSApp(tk.Tk):
         uname = self.ent_user.get().strip()
         pwd = self.ent_pass.get().strip()
         role = self.role_var.get()
-        if not uname or not pwd:
-            messagebox.showerror("Login Failed", "Enter username and password.")
+        # hash verification runs on the auth pool; poll so the mainloop stays live
+        self.login_btn.state(["disabled"])
+        started = time.perf_counter()
+        future = self.service.authenticate_async(role, uname, pwd)
+        self._when_done(future, lambda: self._finish_login(future, role, uname, started))
+
+    def _when_done(self, future, callback, interval: int = 15):
+        """Run callback on the Tk thread once a concurrent future completes."""
+        if future.done():
+            callback()
+        else:
+            self.after(interval, self._when_done, future, callback, interval)
+
+    def _finish_login(self, future, role: str, uname: str, started: float):
+        instrument.record("ui.login", time.perf_counter() - started)
+        try:
+            record = future.result()
+        except ServiceError as e:
+            if self.login_btn.winfo_exists():
+                self.login_btn.state(["!disabled"])
+            messagebox.showerror(e.title, str(e))
             return
 
         if role == "faculty":
-            fac = self.data.get("faculties", {}).get(uname)
-            if not fac or fac.get("password") != pwd:
-                messagebox.showerror("Login Failed", "Invalid faculty credentials.")
-                return
             self.current_user = uname
             self.current_role = "faculty"
             self._build_faculty_dashboard()
+        elif record.get("first_login", True):
+            self._set_first_password(uname)
         else:
-            stu = self.data.get("students", {}).get(uname)
-            if not stu or stu.get("password") != pwd:
-                messagebox.showerror("Login Failed", "Invalid student credentials.")
-                return
-            if stu.get("first_login", True):
-                while True:
-                    new_pwd = simpledialog.askstring("First Login", "Set a new password:", parent=self, show="*")
-                    if not new_pwd:
-                        messagebox.showwarning("Invalid", "Password cannot be empty.")
-                        continue
-                    stu["password"] = new_pwd
-                    stu["first_login"] = False
-                    save_data(self.data)
-                    messagebox.showinfo("Updated", "Password changed successfully.")
-                    break
-            self.current_user = uname
-            self.current_role = "student"
-            self._build_student_view()
+            self._enter_student(uname)
+
+    def _set_first_password(self, uname: str):
+        new_pwd = simpledialog.askstring("First Login", "Set a new password:", parent=self, show="*")
+        if new_pwd is None:
+            # cancelled: no access until the temporary password is replaced
+            self._logout()
+            return
+        future = self.service.verifier.pool.submit(self.service.change_student_password, uname, new_pwd)
+        self._when_done(future, lambda: self._finish_first_password(future, uname))
+
+    def _finish_first_password(self, future, uname: str):
+        try:
+            future.result()
+        except ServiceError as e:
+            messagebox.showwarning(e.title, str(e))
+            self._set_first_password(uname)
+            return
+        messagebox.showinfo("Updated", "Password changed successfully.")
+        self._enter_student(uname)
+
+    def _enter_student(self, uname: str):
+        self.current_user = uname
+        self.current_role = "student"
+        self._build_student_view()
 
     # ---------- FACULTY DASHBOARD ----------
     def _build_faculty_dashboard(self):
@@ -165,32 +230,41 @@ class SMSApp(tk.Tk):
         ttk.Button(left, text="Add Subject", command=self._add_subject_to_class).pack(fill=tk.X, pady=4)
         ttk.Button(left, text="Register Student", command=self._register_student_to_class).pack(fill=tk.X, pady=4)
         ttk.Button(left, text="Add / Update Marks", command=self._add_update_marks).pack(fill=tk.X, pady=4)
+        ttk.Button(left, text="Marks Grid (whole class)", command=self._open_marks_grid).pack(fill=tk.X, pady=4)
+        ttk.Button(left, text="Save Marks as Assessment", command=self._record_assessment).pack(fill=tk.X, pady=4)
         ttk.Button(left, text="Refresh Rank List", command=self._refresh_rank_list).pack(fill=tk.X, pady=4)
+        ttk.Button(left, text="Class Summary", command=self._show_class_summary).pack(fill=tk.X, pady=4)
+        ttk.Button(left, text="Import / Export CSV", command=self._open_csv_tools).pack(fill=tk.X, pady=4)
+        ttk.Button(left, text="Report Cards (all classes)", command=self._generate_reports).pack(fill=tk.X, pady=4)
+        ttk.Button(left, text="Diagnostics", command=self._show_diagnostics).pack(fill=tk.X, pady=4)
 
         right = ttk.Frame(main, padding=8)
         main.add(right, weight=3)
+        ttk.Label(right, text="Find Student (name, roll no or ID):").pack(anchor=tk.W)
+        self.student_search = SearchBox(right, self._search_school, self._open_search_result,
+                                        height=6, collapse=True)
+        self.student_search.pack(fill=tk.X, pady=(0, 8))
         ttk.Label(right, text="Select Class:").pack(anchor=tk.W)
         self.class_combo = ttk.Combobox(right, state="readonly")
         self.class_combo.pack(fill=tk.X, pady=4)
         self.class_combo.bind("<<ComboboxSelected>>", lambda e: self._refresh_rank_list())
 
-        self.rank_tree = ttk.Treeview(right, columns=("rank", "id", "name", "roll", "total"),
-                                      show="headings", selectmode="browse")
-        for col, width, text in [
+        self.rank_list = VirtualRankList(right, [
             ("rank", 60, "Rank"),
             ("id", 160, "Student ID"),
             ("name", 200, "Name"),
             ("roll", 80, "Roll"),
             ("total", 80, "Total"),
-        ]:
-            self.rank_tree.heading(col, text=text)
-            self.rank_tree.column(col, width=width, anchor=tk.CENTER)
-        self.rank_tree.pack(fill=tk.BOTH, expand=True)
+        ], key_column=1, selectmode="browse")
+        self.rank_list.pack(fill=tk.BOTH, expand=True)
+        self.rank_tree = self.rank_list.tree
         self.rank_tree.bind("<Double-1>", self._on_rank_double_click)
 
         self._populate_class_combo()
 
     def _logout(self):
+        if not storage.flush(timeout=5.0):
+            messagebox.showwarning("Save Pending", "Some changes have not been written to disk yet.", parent=self)
         self.current_user = None
         self.current_role = None
         self._build_login()
@@ -201,23 +275,18 @@ class SMSApp(tk.Tk):
             cname = simpledialog.askstring("Create Class", "Enter class name (e.g. 10A):", parent=self)
             if cname is None:
                 return
-            cname = cname.strip()
-            if not cname:
-                messagebox.showwarning("Invalid", "Class name cannot be empty.")
-                continue
-            if not CLASS_NAME_REGEX.match(cname):
-                messagebox.showerror("Invalid", "Class must start with digits and end with one letter (e.g. 10A).")
+            try:
+                cname = self.service.check_class_name(cname)
+            except ServiceError as e:
+                messagebox.showerror(e.title, str(e))
                 continue
-            for c in self.data["classes"].values():
-                if c["name"].lower() == cname.lower():
-                    messagebox.showerror("Duplicate", f"Class '{cname}' already exists.")
-                    break
-            else:
-                break
+            break
 
-        cid = f"class_{int(datetime.now().timestamp())}_{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}"
-        self.data["classes"][cid] = {"name": cname, "faculty": self.current_user, "students": [], "subjects": []}
-        save_data(self.data)
+        try:
+            self.service.create_class(self.current_user, cname)
+        except ServiceError as e:
+            messagebox.showwarning(e.title, str(e))
+            return
         messagebox.showinfo("Created", f"Class '{cname}' created successfully!")
         self._populate_class_combo()
 
@@ -229,12 +298,11 @@ class SMSApp(tk.Tk):
         sub = simpledialog.askstring("Add Subject", "Subject name:", parent=self)
         if not sub:
             return
-        sub = sub.strip()
-        if sub in self.data["classes"][cid].get("subjects", []):
-            messagebox.showwarning("Exists", "Subject already exists.")
+        try:
+            sub = self.service.add_subject(self.current_user, cid, sub)
+        except ServiceError as e:
+            messagebox.showwarning(e.title, str(e))
             return
-        self.data["classes"][cid]["subjects"].append(sub)
-        save_data(self.data)
         messagebox.showinfo("Added", f"Subject '{sub}' added.")
 
     # ---------- REGISTER STUDENT ----------
@@ -245,23 +313,19 @@ class SMSApp(tk.Tk):
         roll = simpledialog.askstring("Roll Number", "Enter numeric roll number:", parent=self)
         if not roll:
             return
-        roll = roll.strip()
-        if not roll.isdigit():
-            messagebox.showerror("Invalid", "Roll number must be numeric.")
+        try:
+            roll = self.service.check_roll_no(cid, roll)
+        except ServiceError as e:
+            messagebox.showerror(e.title, str(e))
             return
-        for sid in self.data["classes"][cid]["students"]:
-            if self.data["students"][sid]["roll_no"] == roll:
-                messagebox.showerror("Duplicate", f"Roll number '{roll}' already exists in this class.")
-                return
         name = simpledialog.askstring("Student Name", "Enter full name:", parent=self)
         if not name:
             return
-        sid = generate_student_id(roll)
-        pwd = generate_temp_password()
-        self.data["students"][sid] = {"name": name, "password": pwd, "first_login": True,
-                                      "class_id": cid, "roll_no": roll, "marks": {}}
-        self.data["classes"][cid]["students"].append(sid)
-        save_data(self.data)
+        try:
+            sid, pwd = self.service.register_student(self.current_user, cid, roll, name)
+        except ServiceError as e:
+            messagebox.showerror(e.title, str(e))
+            return
         messagebox.showinfo("Registered", f"Student ID: {sid}\nTemp Password: {pwd}")
         self._refresh_rank_list()
 
@@ -275,18 +339,13 @@ class SMSApp(tk.Tk):
         if not subjects:
             messagebox.showerror("Error", "Add subjects first.")
             return
-        students = cls.get("students", [])
-        if not students:
+        if not cls.get("students"):
             messagebox.showerror("Error", "No students in class.")
             return
 
-        choices = [f"{self.data['students'][s]['name']} ({s})" for s in students]
-        idx = simpledialog.askinteger("Select Student",
-                                      "Enter number:\n" + "\n".join(f"{i+1}. {c}" for i, c in enumerate(choices)),
-                                      parent=self, minvalue=1, maxvalue=len(choices))
-        if not idx:
+        sid = self._pick_student(cid)
+        if not sid:
             return
-        sid = students[idx - 1]
 
         win = tk.Toplevel(self)
         win.title(f"Marks - {self.data['students'][sid]['name']}")
@@ -300,104 +359,485 @@ class SMSApp(tk.Tk):
 
         def save_marks():
             try:
-                for sub, ent in entries.items():
-                    txt = ent.get().strip()
-                    if txt == "":
-                        continue
-                    val = int(txt)
-                    if val < 0:
-                        raise ValueError
-                    self.data["students"][sid]["marks"][sub] = val
-                save_data(self.data)
-                messagebox.showinfo("Saved", "Marks saved successfully.")
-                win.destroy()
-                self._refresh_rank_list()
-            except ValueError:
-                messagebox.showerror("Invalid", "Enter non-negative integer marks only.")
+                self.service.set_marks(self.current_user, sid, {sub: ent.get() for sub, ent in entries.items()})
+            except ServiceError as e:
+                messagebox.showerror(e.title, str(e))
+                return
+            messagebox.showinfo("Saved", "Marks saved successfully.")
+            win.destroy()
+            self._refresh_rank_list()
 
         ttk.Button(win, text="Save", command=save_marks).grid(row=len(subjects), column=0, columnspan=2, pady=10)
 
+    def _pick_student(self, cid: str) -> Optional[str]:
+        """Modal type-ahead picker over one class's students; None if cancelled."""
+        roster = self.data["classes"][cid].get("students", [])
+        students = self.data["students"]
+
+        def label(sid):
+            return f"{students[sid]['roll_no']:>4}  {students[sid]['name']}  ({sid})"
+
+        def search(text):
+            if not text.strip():
+                return [(sid, label(sid)) for sid in roster[:PICKER_ROWS]]
+            return [(h["student_id"], label(h["student_id"]))
+                    for h in self.service.search_students(text, PICKER_ROWS, [cid])]
+
+        chosen: List[str] = []
+
+        def pick(sid):
+            chosen.append(sid)
+            win.destroy()
+
+        win = tk.Toplevel(self)
+        win.title("Select Student")
+        win.transient(self)
+        ttk.Label(win, text="Type a name, roll number or student ID:").pack(anchor=tk.W, padx=8, pady=(8, 2))
+        box = SearchBox(win, search, pick, height=12)
+        box.pack(fill=tk.BOTH, expand=True, padx=8, pady=4)
+        ttk.Button(win, text="Cancel", command=win.destroy).pack(pady=(0, 8))
+        box.refresh()
+        box.entry.focus_set()
+        win.grab_set()
+        self.wait_window(win)
+        return chosen[0] if chosen else None
+
+    # ---------- MARKS GRID ----------
+    def _open_marks_grid(self):
+        """Whole class (students x subjects) in one editable grid, saved as one transaction."""
+        cid = self._choose_class_for_faculty()
+        if not cid:
+            return
+        cls = self.data["classes"][cid]
+        subjects = list(cls.get("subjects", []))
+        if not subjects:
+            messagebox.showerror("Error", "Add subjects first.")
+            return
+        if not cls.get("students"):
+            messagebox.showerror("Error", "No students in class.")
+            return
+
+        win = tk.Toplevel(self)
+        win.title(f"Marks - Class {cls['name']}")
+        win.geometry("1000x620")
+        top = ttk.Frame(win, padding=6)
+        top.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(top, text="Record in:").pack(side=tk.LEFT)
+        targets = [("Current marks", None)] + [
+            (f"{a['name']} ({a['term']})" if a["term"] else a["name"], a["assessment_id"])
+            for a in self.service.class_assessments(cid)]
+        target = ttk.Combobox(top, state="readonly", width=32, values=[t for t, _ in targets])
+        target.current(0)
+        target.pack(side=tk.LEFT, padx=6)
+        status = ttk.Label(top, text="")
+        status.pack(side=tk.LEFT, padx=12)
+        chosen = [0]  # index into targets of the rows on screen
+
+        def validate(text):
+            try:
+                return str(SchoolService.parse_mark(text))
+            except ServiceError as e:
+                raise ValueError(str(e))
+
+        def show_status(message: str = ""):
+            pending = grid.pending
+            text = grid.error or message or (f"{pending} unsaved mark(s)" if pending else "No changes")
+            status.configure(text=text, foreground="#b00020" if grid.error else "")
+
+        bottom = ttk.Frame(win, padding=6)
+        bottom.pack(side=tk.BOTTOM, fill=tk.X)  # before the grid, so a small window squeezes the grid
+        grid = EditableGrid(win, [("Roll", 60), ("Name", 180)], subjects, validate,
+                            on_change=show_status, height=20)
+        grid.pack(fill=tk.BOTH, expand=True, padx=6)
+
+        def load():
+            students = self.data["students"]
+            roster = sorted(self.data["classes"][cid].get("students", []),
+                            key=lambda sid: (len(students[sid]["roll_no"]), students[sid]["roll_no"]))
+            aid = targets[chosen[0]][1]
+            if aid is None:
+                marks = {sid: students[sid].get("marks", {}) for sid in roster}
+            else:
+                marks = assessments.all_marks(self.data["assessments"][aid])
+            grid.set_rows([(sid, (students[sid]["roll_no"], students[sid]["name"]),
+                            [marks.get(sid, {}).get(sub) for sub in subjects]) for sid in roster])
+
+        def confirm_discard() -> bool:
+            return not grid.pending or messagebox.askyesno(
+                "Unsaved Changes", f"Discard {grid.pending} unsaved mark(s)?", parent=win)
+
+        def switch(_event=None):
+            if target.current() == chosen[0]:
+                return
+            if not confirm_discard():
+                target.current(chosen[0])
+                return
+            chosen[0] = target.current()
+            load()
+
+        def save():
+            if not grid.commit_editor():
+                return
+            edits = grid.edits()
+            if not edits:
+                return
+            try:
+                written = self.service.set_class_marks(self.current_user, cid, edits,
+                                                       assessment=targets[chosen[0]][1])
+            except ServiceError as e:
+                messagebox.showerror(e.title, str(e), parent=win)
+                return
+            grid.mark_saved()
+            show_status(f"Saved {written} mark(s).")
+            self._refresh_rank_list()
+
+        def reload():
+            if confirm_discard():
+                self.service.refresh()
+                load()
+
+        def close():
+            if confirm_discard():
+                win.destroy()
+
+        target.bind("<<ComboboxSelected>>", switch)
+        ttk.Label(bottom, text="Enter/Tab to move, Esc to undo a cell, Ctrl+V pastes a block from a spreadsheet."
+                  ).pack(side=tk.LEFT)
+        ttk.Button(bottom, text="Close", command=close).pack(side=tk.RIGHT, padx=4)
+        ttk.Button(bottom, text="Reload", command=reload).pack(side=tk.RIGHT, padx=4)
+        ttk.Button(bottom, text="Discard", command=grid.discard).pack(side=tk.RIGHT, padx=4)
+        ttk.Button(bottom, text="Save", style="Accent.TButton", command=save).pack(side=tk.RIGHT, padx=4)
+        win.protocol("WM_DELETE_WINDOW", close)
+        load()
+
+    # ---------- ASSESSMENTS ----------
+    def _record_assessment(self):
+        cid = self._choose_class_for_faculty()
+        if not cid:
+            return
+        name = simpledialog.askstring("Assessment", "Assessment name (e.g. Midterm):", parent=self)
+        if not name:
+            return
+        term = simpledialog.askstring("Assessment", "Term (optional):", parent=self) or ""
+        try:
+            self.service.create_assessment(self.current_user, cid, name, term, from_current=True)
+        except ServiceError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+        messagebox.showinfo("Saved", f"Current marks saved as '{name.strip()}'.")
+
     # ---------- RANK LIST ----------
+    @instrument.timed("ui.refresh_rank_list")
     def _refresh_rank_list(self):
         cid = self._choose_class_for_faculty()
         if not cid:
             return
-        ranks = compute_totals_and_ranks(self.data, cid)
-        for i in self.rank_tree.get_children():
-            self.rank_tree.delete(i)
-        arr = sorted([(info["rank"], sid, info["total"]) for sid, info in ranks.items()], key=lambda x: x[0])
-        for rank, sid, total in arr:
-            s = self.data["students"][sid]
-            self.rank_tree.insert("", tk.END, values=(rank, sid, s["name"], s["roll_no"], total))
+        students = self.data["students"]
+
+        def make_row(entry):
+            rank, sid, total = entry
+            s = students[sid]
+            return (rank, sid, s["name"], s["roll_no"], total)
+
+        # only the rows in view are built; the rest are fetched on scroll
+        self.rank_list.set_rows(self.service.rank_list(cid), make_row, list_key=cid)
 
     def _choose_class_for_faculty(self):
-        idx = self.class_combo.current()
-        if idx < 0:
+        label = self.class_combo.get()
+        if not label:
             messagebox.showwarning("Select", "Select a class first.")
             return None
-        val = self.class_combo.get()
-        for cid, c in self.data["classes"].items():
-            if f"{c['name']} ({cid})" == val:
-                return cid
-        return None
+        return self.service.class_for_label(label)
 
     def _populate_class_combo(self):
-        fac = self.current_user
-        vals = [f"{c['name']} ({cid})" for cid, c in self.data["classes"].items() if c["faculty"] == fac]
+        self._class_ids = self.service.faculty_classes(self.current_user)
+        vals = [self.service.class_label(cid) for cid in self._class_ids]
         self.class_combo["values"] = vals
         if vals:
             self.class_combo.current(0)
             self._refresh_rank_list()
 
+    # ---------- CSV IMPORT / EXPORT ----------
+    def _open_csv_tools(self):
+        cid = self._choose_class_for_faculty()
+        if not cid:
+            return
+        win = tk.Toplevel(self)
+        win.title(f"CSV - {self.data['classes'][cid]['name']}")
+        for text, command in [
+            ("Import Students (roll_no,name)", lambda: self._csv_import_students(cid, win)),
+            ("Import Marks Sheet", lambda: self._csv_import_marks(cid, win)),
+            ("Export Rank List", lambda: self._csv_export(cid, win, bulk.export_rank_list, "ranks")),
+            ("Export Marks Sheet", lambda: self._csv_export(cid, win, bulk.export_marks_sheet, "marks")),
+        ]:
+            ttk.Button(win, text=text, command=command).pack(fill=tk.X, padx=12, pady=4)
+        ttk.Button(win, text="Close", command=win.destroy).pack(pady=8)
+
+    def _csv_import_students(self, cid: str, parent):
+        path = filedialog.askopenfilename(parent=parent, filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                created = bulk.import_students(self.service, self.current_user, cid, f)
+        except (ServiceError, OSError, UnicodeDecodeError) as e:
+            messagebox.showerror(getattr(e, "title", "Import Failed"), str(e), parent=parent)
+            return
+        self._refresh_rank_list()
+        out = filedialog.asksaveasfilename(parent=parent, title="Save temp passwords",
+                                           defaultextension=".csv", initialfile="credentials.csv")
+        if out:
+            try:
+                with open(out, "w", newline="", encoding="utf-8") as f:
+                    bulk.write_credentials(created, f)
+            except OSError as e:
+                # the students exist now; their temp passwords must not be lost with the file
+                self._show_credentials(created, parent)
+                messagebox.showerror("Save Failed", f"Could not save the temp passwords: {e}\n\n"
+                                     "They are listed in the window behind this message; copy them down.",
+                                     parent=parent)
+                return
+        messagebox.showinfo("Imported", f"Registered {len(created)} students.", parent=parent)
+
+    def _show_credentials(self, created, parent):
+        win = tk.Toplevel(parent)
+        win.title("Temp Passwords")
+        cols = ("student_id", "roll_no", "name", "temp_password")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=min(max(len(created), 3), 20))
+        for col in cols:
+            tree.heading(col, text=col.replace("_", " ").title())
+            tree.column(col, width=140)
+        for row in created:
+            tree.insert("", tk.END, values=row)
+        tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        ttk.Button(win, text="Close", command=win.destroy).pack(pady=8)
+
+    def _csv_import_marks(self, cid: str, parent):
+        path = filedialog.askopenfilename(parent=parent, filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                count = bulk.import_marks(self.service, self.current_user, cid, f)
+        except (ServiceError, OSError, UnicodeDecodeError) as e:
+            messagebox.showerror(getattr(e, "title", "Import Failed"), str(e), parent=parent)
+            return
+        self._refresh_rank_list()
+        messagebox.showinfo("Imported", f"Saved {count} marks.", parent=parent)
+
+    def _csv_export(self, cid: str, parent, export, kind: str):
+        name = self.data["classes"][cid]["name"]
+        path = filedialog.asksaveasfilename(parent=parent, defaultextension=".csv",
+                                            initialfile=f"{name}_{kind}.csv")
+        if not path:
+            return
+        try:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                export(self.service, cid, f)
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e), parent=parent)
+            return
+        messagebox.showinfo("Exported", f"Saved {path}", parent=parent)
+
+    # ---------- BATCH REPORTS ----------
+    def _generate_reports(self):
+        cids = self.service.faculty_classes(self.current_user)
+        if not cids:
+            messagebox.showerror("Error", "Create a class first.")
+            return
+        out = filedialog.askdirectory(parent=self, title="Folder for report cards")
+        if not out:
+            return
+        win = tk.Toplevel(self)
+        win.title("Report Cards")
+        status = ttk.Label(win, text=f"Rendering {len(cids)} classes...")
+        status.pack(padx=12, pady=(12, 4))
+        bar = ttk.Progressbar(win, length=320, maximum=len(cids))
+        bar.pack(padx=12, pady=(0, 12))
+        progress: "queue.Queue[int]" = queue.Queue()
+        future = self._report_pool.submit(reports.generate_reports, self.data, out, cids, "html",
+                                          progress=lambda done, total: progress.put(done), lock=self.service.lock)
+
+        def poll():
+            while not progress.empty():
+                bar["value"] = progress.get_nowait()
+            if future.done():
+                finish()
+            else:
+                win.after(100, poll)
+
+        def finish():
+            win.destroy()
+            try:
+                summary = future.result()
+            except Exception as e:
+                messagebox.showerror("Reports Failed", str(e), parent=self)
+                return
+            messagebox.showinfo("Reports", f"Wrote report cards for {summary['students']} students in "
+                                           f"{summary['classes']} classes to {out}", parent=self)
+        poll()
+
+    # ---------- DIAGNOSTICS ----------
+    def _show_diagnostics(self):
+        win = tk.Toplevel(self)
+        win.title("Diagnostics")
+        cols = ("metric", "count", "p50", "p95", "p99", "max", "last")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=18)
+        for col in cols:
+            tree.heading(col, text=col.title() if col == "metric" else col)
+            tree.column(col, width=240 if col == "metric" else 80, anchor=tk.W if col == "metric" else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        note = ttk.Label(win, text="")
+        note.pack(anchor=tk.W, padx=10)
+
+        def fmt(v):
+            return "-" if v is None else f"{v:,.3f}".rstrip("0").rstrip(".")
+
+        def refresh():
+            if not win.winfo_exists():
+                return
+            m = instrument.metrics()
+            tree.delete(*tree.get_children())
+            for name, s in m["latency_ms"].items():
+                tree.insert("", tk.END, values=(f"{name} (ms)", s["count"]) + tuple(fmt(s[k]) for k in cols[2:]))
+            for name, s in m["values"].items():
+                tree.insert("", tk.END, values=(name, s["count"]) + tuple(fmt(s[k]) for k in cols[2:]))
+            for name, n in m["counters"].items():
+                tree.insert("", tk.END, values=(name, n) + ("",) * (len(cols) - 2))
+            note.config(text=f"Session {m['uptime_s']:.0f}s, profiling: {', '.join(m['profile']) or 'off'} (SMS_PROFILE)")
+            win.after(2000, refresh)
+
+        def save():
+            path = filedialog.asksaveasfilename(parent=win, defaultextension=".json", initialfile="sms_metrics.json")
+            if path:
+                try:
+                    instrument.dump(path)
+                except OSError as e:
+                    messagebox.showerror("Save Failed", str(e), parent=win)
+
+        buttons = ttk.Frame(win)
+        buttons.pack(pady=8)
+        ttk.Button(buttons, text="Save JSON...", command=save).pack(side=tk.LEFT, padx=4)
+        ttk.Button(buttons, text="Close", command=win.destroy).pack(side=tk.LEFT, padx=4)
+        refresh()
+
+    # ---------- CLASS SUMMARY ----------
+    def _show_class_summary(self):
+        cid = self._choose_class_for_faculty()
+        if not cid:
+            return
+        try:
+            matrix = self.service.class_matrix(cid)
+        except ImportError:
+            messagebox.showerror("Unavailable", "Class summary needs numpy (pip install numpy).")
+            return
+        stats = matrix.subject_stats()
+        hist = matrix.grade_histogram()
+        bands = list(next(iter(hist.values()), {}).keys())
+
+        win = tk.Toplevel(self)
+        win.title(f"Summary - {self.data['classes'][cid]['name']}")
+        cols = ("subject", "count", "mean", "median", "std") + tuple(bands)
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=min(max(len(stats), 3), 15))
+        for col in cols:
+            tree.heading(col, text=col.title() if col not in bands else col)
+            tree.column(col, width=110 if col == "subject" else 70, anchor=tk.CENTER)
+        def fmt(v):
+            return "-" if v is None else f"{v:.1f}"
+
+        for sub, st in stats.items():
+            tree.insert("", tk.END, values=(sub, st["count"], fmt(st["mean"]), fmt(st["median"]), fmt(st["std"]))
+                        + tuple(hist[sub][b] for b in bands))
+        tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+
+        pct = matrix.total_percentiles()
+        ttk.Label(win, text="Total percentiles: " + "   ".join(f"P{int(q)}: {v:.1f}" for q, v in pct.items())
+                  ).pack(anchor=tk.W, padx=10)
+        ttk.Label(win, text="Top 10:", font=("Segoe UI", 11, "bold")).pack(anchor=tk.W, padx=10, pady=(8, 0))
+        for sid, total, rank in matrix.top_n(10):
+            ttk.Label(win, text=f"{rank}. {self.data['students'][sid]['name']} ({sid}) - {total}"
+                      ).pack(anchor=tk.W, padx=18)
+        ttk.Button(win, text="Close", command=win.destroy).pack(pady=8)
+
+    # ---------- STUDENT SEARCH ----------
+    def _search_school(self, text: str):
+        own = set(self.service.faculty_classes(self.current_user))
+        results = []
+        for h in self.service.search_students(text, SEARCH_RESULTS):
+            other = "" if h["class_id"] in own else ", other faculty"
+            results.append((h["student_id"], f"{h['name']}  -  roll {h['roll_no']}, class {h['class_name']}"
+                                             f"{other}  -  {h['student_id']}"))
+        return results
+
+    def _open_search_result(self, sid: str):
+        stu = self.data["students"].get(sid)
+        if not stu:
+            return
+        cid = stu["class_id"]
+        if cid not in self.service.faculty_classes(self.current_user):
+            cname = self.data["classes"].get(cid, {}).get("name", cid)
+            messagebox.showinfo("Student", f"{stu['name']} (roll {stu['roll_no']}) is in class {cname}, "
+                                           "which belongs to another faculty.")
+            return
+        self.class_combo.set(self.service.class_label(cid))
+        self._refresh_rank_list()
+        if self.rank_tree.exists(sid):  # rows past the first page are built on scroll
+            self.rank_tree.selection_set(sid)
+            self.rank_tree.see(sid)
+        self._open_student_popup(sid)
+
     # ---------- POPUP ----------
     def _on_rank_double_click(self, event):
         sel = self.rank_tree.selection()
         if not sel:
             return
-        sid = self.rank_tree.item(sel[0], "values")[1]
-        self._open_student_popup(sid)
+        self._open_student_popup(sel[0])
 
     def _open_student_popup(self, sid: str):
-        s = self.data["students"][sid]
-        cid = s["class_id"]
-        cls = self.data["classes"][cid]
-        subjects = cls.get("subjects", [])
-        ranks = compute_totals_and_ranks(self.data, cid)
-        total = ranks.get(sid, {}).get("total", 0)
-        rank = ranks.get(sid, {}).get("rank", "-")
+        report = self.service.student_report(sid)
 
         popup = tk.Toplevel(self)
-        popup.title(f"{s['name']} ({s['roll_no']})")
-        ttk.Label(popup, text=f"Student: {s['name']}", font=("Segoe UI", 13, "bold")).pack(pady=6)
-        for sub in subjects:
-            val = s["marks"].get(sub, 0)
+        popup.title(f"{report['name']} ({report['roll_no']})")
+        ttk.Label(popup, text=f"Student: {report['name']}", font=("Segoe UI", 13, "bold")).pack(pady=6)
+        for sub, val in report["marks"].items():
             ttk.Label(popup, text=f"{sub}: {val}").pack(anchor=tk.W, padx=10)
-        ttk.Label(popup, text=f"Total: {total}    Rank: {rank}", font=("Segoe UI", 12)).pack(pady=10)
+        ttk.Label(popup, text=f"Total: {report['total']}    Rank: {report['rank'] or '-'}",
+                  font=("Segoe UI", 12)).pack(pady=10)
+        self._pack_history(popup, sid)
         ttk.Button(popup, text="Close", command=popup.destroy).pack(pady=6)
 
+    def _pack_history(self, parent, sid: str):
+        """One line per assessment with the student's total, oldest first."""
+        history = [h for h in self.service.student_trajectory(sid) if h["total"] is not None]
+        if not history:
+            return
+        ttk.Label(parent, text="Progress:", font=("Segoe UI", 11, "bold")).pack(anchor=tk.W, padx=10)
+        prev = None
+        for h in history:
+            change = "" if prev is None else f"  ({h['total'] - prev:+d})"
+            term = f" ({h['term']})" if h["term"] else ""
+            ttk.Label(parent, text=f"{h['name']}{term}: {h['total']}{change}").pack(anchor=tk.W, padx=18)
+            prev = h["total"]
+
     # ---------- STUDENT DASHBOARD ----------
     def _build_student_view(self):
         for w in self.winfo_children():
             w.destroy()
         top = ttk.Frame(self, padding=8)
         top.pack(side=tk.TOP, fill=tk.X)
-        s = self.data["students"][self.current_user]
-        ttk.Label(top, text=f"Student: {s['name']}", font=("Segoe UI", 14)).pack(side=tk.LEFT)
+        report = self.service.student_report(self.current_user)
+        ttk.Label(top, text=f"Student: {report['name']}", font=("Segoe UI", 14)).pack(side=tk.LEFT)
         ttk.Button(top, text="Logout", command=self._logout).pack(side=tk.RIGHT)
 
         main = ttk.Frame(self, padding=12)
         main.pack(fill=tk.BOTH, expand=True)
-        cid = s["class_id"]
-        cls = self.data["classes"][cid]
-        ttk.Label(main, text=f"Class: {cls['name']}", font=("Segoe UI", 12)).pack(anchor=tk.W)
+        ttk.Label(main, text=f"Class: {report['class_name']}", font=("Segoe UI", 12)).pack(anchor=tk.W)
         ttk.Label(main, text="Your Marks:", font=("Segoe UI", 12, "bold")).pack(anchor=tk.W, pady=(8, 0))
-        for sub in cls.get("subjects", []):
-            val = s["marks"].get(sub, 0)
+        for sub, val in report["marks"].items():
             ttk.Label(main, text=f"{sub}: {val}").pack(anchor=tk.W, padx=8)
-        ranks = compute_totals_and_ranks(self.data, cid)
-        total = ranks.get(self.current_user, {}).get("total", 0)
-        rank = ranks.get(self.current_user, {}).get("rank", "-")
-        ttk.Label(main, text=f"Total: {total}    Rank: {rank}", font=("Segoe UI", 12)).pack(pady=12)
+        ttk.Label(main, text=f"Total: {report['total']}    Rank: {report['rank'] or '-'}",
+                  font=("Segoe UI", 12)).pack(pady=12)
+        self._pack_history(main, self.current_user)
 
 
 if __name__ == "__main__":
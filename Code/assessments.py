@@ -0,0 +1,178 @@
+# assessments.py
+# Marks history per assessment (unit test, midterm, final, ...), stored by column.
+#
+#   data["assessments"][aid] = {
+#       "class_id": cid, "name": "Midterm", "term": "2025 T1", "weight": 1.0,
+#       "students": [sid, ...],            row order; only ever appended to
+#       "marks": {subject: [int, ...]},    one column per subject, MISSING = -1
+#   }
+#
+# A column costs a few bytes per mark instead of repeating student and
+# subject keys for every mark of every exam, and a query touches only the
+# assessments and subjects it needs. students[sid]["marks"] keep the
+# latest values, so existing screens, rank caches and exports are
+# unaffected. Assessments of a class are ordered by creation.
+#
+# Writes are ordinary storage changes: one "set" per mark, addressed by
+# roster row (["assessments", aid, "marks", subject, "<row>"]), plus an
+# "append" for a student new to the assessment, so they journal, replicate
+# and conflict-check like everything else, and edits to different students
+# never clash. Rows are roster positions, so writers also declare the
+# roster as read: two concurrent appends would otherwise both commute and
+# claim the same row.
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+MISSING = -1  # marks are non-negative, so -1 means "no mark"
+
+Change = Tuple[str, List[str], Any]
+
+
+def for_class(data: Dict[str, Any], cid: str) -> List[str]:
+    """Assessment IDs of a class, oldest first (a key scan; SchoolService keeps an index)."""
+    prefix = cid + ":"
+    return [aid for aid in data.get("assessments", {}) if aid.startswith(prefix)]
+
+
+def assessment_id(cid: str, number: int) -> str:
+    """IDs embed the class, so a class's assessments are found without decoding any record."""
+    return f"{cid}:{number}"
+
+
+def assessment_class(aid: str) -> str:
+    return aid.rpartition(":")[0]
+
+
+def new_assessment(cid: str, name: str, term: str = "", weight: float = 1.0) -> Dict[str, Any]:
+    return {"class_id": cid, "name": name, "term": term, "weight": weight, "students": [], "marks": {}}
+
+
+def column_changes(assessment: Dict[str, Any], aid: str,
+                   rows: Iterable[Tuple[str, Dict[str, int]]]) -> List[Change]:
+    """Changes that store ``rows`` of (student_id, {subject: mark}) in the assessment.
+
+    One "set" per mark, addressed by roster row, so an edit costs the same
+    whatever the class size and edits to different students never clash.
+    A column the assessment does not have yet is written whole, once.
+    Pass ``["assessments", aid, "students"]`` as a read when applying them.
+    """
+    roster = list(assessment.get("students", []))
+    where = {sid: i for i, sid in enumerate(roster)}
+    changes: List[Change] = []
+    cells: Dict[str, Dict[int, int]] = {}
+    for sid, marks in rows:
+        if sid not in where:
+            where[sid] = len(roster)
+            roster.append(sid)
+            changes.append(("append", ["assessments", aid, "students"], sid))
+        row = where[sid]
+        for sub, val in marks.items():
+            cells.setdefault(sub, {})[row] = MISSING if val is None else int(val)
+    columns = assessment.get("marks", {})
+    for sub, values in cells.items():
+        if sub in columns:
+            # storage pads a short column with MISSING, so new rows need no rewrite
+            changes += [("set", ["assessments", aid, "marks", sub, str(row)], val) for row, val in values.items()]
+            continue
+        col = [MISSING] * (max(values) + 1)
+        for row, val in values.items():
+            col[row] = val
+        changes.append(("set", ["assessments", aid, "marks", sub], col))
+    return changes
+
+
+def _column(assessment: Dict[str, Any], sub: str) -> List[int]:
+    return assessment.get("marks", {}).get(sub, [])
+
+
+def student_marks(assessment: Dict[str, Any], sid: str) -> Dict[str, int]:
+    """{subject: mark} for one student; absent marks are left out."""
+    try:
+        row = assessment.get("students", []).index(sid)
+    except ValueError:
+        return {}
+    out = {}
+    for sub, col in assessment.get("marks", {}).items():
+        if row < len(col) and col[row] != MISSING:
+            out[sub] = col[row]
+    return out
+
+
+def all_marks(assessment: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """{student_id: {subject: mark}} for the whole roster, in one pass over the columns."""
+    roster = assessment.get("students", [])
+    out: Dict[str, Dict[str, int]] = {sid: {} for sid in roster}
+    for sub, col in assessment.get("marks", {}).items():
+        for sid, val in zip(roster, col):
+            if val != MISSING:
+                out[sid][sub] = val
+    return out
+
+
+def totals(assessment: Dict[str, Any], subjects: Sequence[str]) -> Dict[str, int]:
+    """Total per student on the assessment's roster over ``subjects``; missing marks count as 0."""
+    roster = assessment.get("students", [])
+    sums = [0] * len(roster)
+    for sub in subjects:
+        for row, val in enumerate(_column(assessment, sub)[:len(roster)]):
+            if val > 0:
+                sums[row] += val
+    return dict(zip(roster, sums))
+
+
+def weighted_totals(data: Dict[str, Any], cid: str, weights: Dict[str, float]) -> Dict[str, float]:
+    """Sum of weight * assessment total for every student in the class (absent from one: 0 there)."""
+    subjects = data["classes"][cid].get("subjects", [])
+    out = {sid: 0.0 for sid in data["classes"][cid].get("students", [])}
+    for aid, weight in weights.items():
+        if not weight:
+            continue
+        for sid, total in totals(data["assessments"][aid], subjects).items():
+            if sid in out:
+                out[sid] += weight * total
+    return {sid: round(total, 2) for sid, total in out.items()}
+
+
+# ---------- trend queries ----------
+
+def trajectory(data: Dict[str, Any], sid: str, aids: Sequence[str]) -> List[Dict[str, Any]]:
+    """One student's marks and total per assessment, in the order of ``aids``."""
+    stu = data["students"][sid]
+    subjects = data["classes"][stu["class_id"]].get("subjects", [])
+    out = []
+    for aid in aids:
+        a = data["assessments"][aid]
+        marks = student_marks(a, sid)
+        out.append({"assessment_id": aid, "name": a.get("name", ""), "term": a.get("term", ""),
+                    "marks": marks, "total": sum(marks.get(s, 0) for s in subjects) if marks else None})
+    return out
+
+
+def class_averages(data: Dict[str, Any], cid: str, aids: Sequence[str]) -> List[Dict[str, Any]]:
+    """Per assessment: mean mark per subject (over marks entered) and mean total."""
+    subjects = data["classes"][cid].get("subjects", [])
+    out = []
+    for aid in aids:
+        a = data["assessments"][aid]
+        means: Dict[str, Optional[float]] = {}
+        for sub in subjects:
+            vals = [v for v in _column(a, sub) if v != MISSING]
+            means[sub] = round(sum(vals) / len(vals), 2) if vals else None
+        tots = list(totals(a, subjects).values())
+        out.append({"assessment_id": aid, "name": a.get("name", ""), "term": a.get("term", ""),
+                    "averages": means, "average_total": round(sum(tots) / len(tots), 2) if tots else None})
+    return out
+
+
+def most_improved(data: Dict[str, Any], cid: str, before: str, after: str,
+                  n: int = 10) -> List[Tuple[str, int, int, int]]:
+    """Top ``n`` (student_id, total before, total after, gain) between two assessments.
+
+    Only students with marks in both assessments are compared.
+    """
+    subjects = data["classes"][cid].get("subjects", [])
+    old = totals(data["assessments"][before], subjects)
+    new = totals(data["assessments"][after], subjects)
+    gains = [(sid, old[sid], total, total - old[sid]) for sid, total in new.items() if sid in old]
+    gains.sort(key=lambda g: (-g[3], g[0]))
+    return gains[:n]
@@ -0,0 +1,141 @@
+# auth.py
+# Password hashing and off-thread verification.
+#
+# Stored passwords are self-describing strings:
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>        user-chosen passwords (memory-hard)
+#   pbkdf2_sha256$<iters>$<salt>$<hash>     fallback when hashlib lacks scrypt
+#   sha256$<salt>$<hash>                    generated temp passwords (high entropy, single use)
+# Anything else is a legacy plaintext record; it still verifies and is
+# rehashed on the next successful login.
+#
+# CredentialVerifier runs the slow KDF on a small thread pool so the Tk
+# mainloop / API event loop never block on it, and keeps a short-lived
+# cache of verified logins so a repeat login skips the KDF.
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from instrument import timed
+
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+PBKDF2_ITERATIONS = 600_000
+SESSION_TTL = 300.0  # seconds a verified login stays cached
+
+_SCHEMES = ("scrypt$", "pbkdf2_sha256$", "sha256$")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text.encode("ascii"))
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(_SCHEMES)
+
+
+def hash_password(pwd: str) -> str:
+    """Salted memory-hard hash for a user-chosen password (slow on purpose)."""
+    salt = secrets.token_bytes(16)
+    if hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(pwd.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", pwd.encode("utf-8"), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def hash_temp_password(pwd: str) -> str:
+    """Fast salted hash, only for generated high-entropy temp passwords."""
+    salt = secrets.token_bytes(16)
+    return f"sha256${_b64(salt)}${_b64(hashlib.sha256(salt + pwd.encode('utf-8')).digest())}"
+
+
+def verify_password(stored: str, pwd: str) -> Tuple[bool, bool]:
+    """Return (matches, needs_rehash)."""
+    candidate = pwd.encode("utf-8")
+    try:
+        if stored.startswith("scrypt$"):
+            _, n, r, p, salt, digest = stored.split("$")
+            expected = _unb64(digest)
+            actual = hashlib.scrypt(candidate, salt=_unb64(salt), n=int(n), r=int(r), p=int(p),
+                                    dklen=len(expected))
+            return hmac.compare_digest(actual, expected), (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        if stored.startswith("pbkdf2_sha256$"):
+            _, iters, salt, digest = stored.split("$")
+            expected = _unb64(digest)
+            actual = hashlib.pbkdf2_hmac("sha256", candidate, _unb64(salt), int(iters), dklen=len(expected))
+            return hmac.compare_digest(actual, expected), int(iters) < PBKDF2_ITERATIONS
+        if stored.startswith("sha256$"):
+            _, salt, digest = stored.split("$")
+            raw_salt = _unb64(salt)
+            return hmac.compare_digest(hashlib.sha256(raw_salt + candidate).digest(), _unb64(digest)), False
+    except (ValueError, TypeError):
+        return False, False
+    # legacy plaintext record
+    ok = hmac.compare_digest(stored.encode("utf-8"), candidate)
+    return ok, ok
+
+
+class CredentialVerifier:
+    """Thread-pool password verification with a short-lived verified-login cache."""
+
+    def __init__(self, workers: Optional[int] = None, session_ttl: float = SESSION_TTL):
+        self.pool = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1),
+                                       thread_name_prefix="auth")
+        self.session_ttl = session_ttl
+        self._key = secrets.token_bytes(32)  # per-process; cache entries never leave memory
+        self._sessions: Dict[Tuple[str, str], Tuple[bytes, str, float]] = {}
+        self._lock = threading.Lock()
+        self._dummy: Optional[str] = None
+
+    def _tag(self, pwd: str) -> bytes:
+        return hmac.new(self._key, pwd.encode("utf-8"), hashlib.sha256).digest()
+
+    def _cached(self, key: Tuple[str, str], stored: str, pwd: str) -> bool:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return False
+            tag, cached_stored, expires = entry
+            if expires < time.monotonic() or cached_stored != stored:
+                del self._sessions[key]
+                return False
+        return hmac.compare_digest(tag, self._tag(pwd))
+
+    @timed("auth.verify")
+    def verify(self, key: Tuple[str, str], stored: Optional[str], pwd: str) -> Tuple[bool, Optional[str]]:
+        """Blocking check; returns (ok, new_hash) where new_hash is set when the record should be upgraded."""
+        if stored is None:
+            # unknown user: burn the same work so timing doesn't reveal it
+            if self._dummy is None:
+                self._dummy = hash_password(secrets.token_hex(8))
+            verify_password(self._dummy, pwd)
+            return False, None
+        if self._cached(key, stored, pwd):
+            return True, None
+        ok, needs_rehash = verify_password(stored, pwd)
+        if not ok:
+            return False, None
+        new_hash = hash_password(pwd) if needs_rehash else None
+        with self._lock:
+            self._sessions[key] = (self._tag(pwd), new_hash or stored, time.monotonic() + self.session_ttl)
+        return True, new_hash
+
+    def submit(self, key: Tuple[str, str], stored: Optional[str], pwd: str) -> "Future[Tuple[bool, Optional[str]]]":
+        return self.pool.submit(self.verify, key, stored, pwd)
+
+    def forget(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,191 @@
+# bench.py
+# Benchmarks for the storage, ranking, lookup and UI-refresh hot paths.
+#
+#   python bench.py --sizes 1000 10000 100000 --out results.json
+#   xvfb-run python bench.py --ui            # include the Tk rank-list refresh
+#   python bench.py --compare base.json results.json --threshold 1.25
+#
+# Each run writes JSON (commit, python version, per-benchmark medians) so
+# results from two commits can be diffed with --compare, which exits
+# non-zero when any benchmark got slower than the threshold ratio.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import json_store
+from datagen import generate, write
+from indexes import IndexManager
+from search import StudentSearch
+from utils import compute_totals_and_ranks, ClassRanking
+
+CLASS_SIZE = 60
+
+
+def timeit(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_ms": round(statistics.median(samples) * 1000, 4),
+            "min_ms": round(min(samples) * 1000, 4), "runs": repeat}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def bench_size(students: int, subjects: int, marks_ratio: float, repeat: int, ui: bool) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+
+    def record(name: str, timing: Dict[str, float]) -> None:
+        results.append({"name": name, "students": students, **timing})
+        print(f"  {name:<32} {timing['median_ms']:>10.3f} ms")
+
+    classes = max(1, students // CLASS_SIZE)
+    per_class = students // classes
+    data = generate(faculties=max(1, classes // 5), classes=classes, students_per_class=per_class,
+                    subjects=subjects, marks_ratio=marks_ratio)
+    cid = next(iter(data["classes"]))
+    fac = data["classes"][cid]["faculty"]
+    sid = data["classes"][cid]["students"][0]
+    sub = data["classes"][cid]["subjects"][0]
+    big_cid = "class_bench_big"
+    data["classes"][big_cid] = {"name": "999Z", "faculty": fac, "students": list(data["students"]),
+                                "subjects": data["classes"][cid]["subjects"]}
+
+    # every write of the run, the app's included (bench_ui), lands in a temp dir
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.json")
+        write(data, path)
+        old_file, json_store.DATA_FILE = json_store.DATA_FILE, path
+        try:
+            record("storage.load_data", timeit(json_store.load_data, repeat))
+            record("storage.save_data", timeit(lambda: json_store.save_data(data), repeat))
+            counter = iter(range(10 ** 9))
+            record("storage.apply_change (1 mark)", timeit(
+                lambda: json_store.apply_change(data, "set", ["students", sid, "marks", sub], next(counter) % 100),
+                repeat))
+            record("storage.load_data (journaled)", timeit(json_store.load_data, repeat))
+
+            record("compute_totals_and_ranks (class)", timeit(lambda: compute_totals_and_ranks(data, cid), repeat))
+            record("compute_totals_and_ranks (all)", timeit(lambda: compute_totals_and_ranks(data, big_cid), repeat))
+            ranking = ClassRanking(data, big_cid)
+            marks = data["students"][sid]["marks"]
+
+            def one_update():
+                marks[sub] = (marks.get(sub, 0) + 37) % 101
+                ranking.update_student(sid)
+                ranking.rank(sid)
+            record("ClassRanking.update+rank (all)", timeit(one_update, repeat))
+            record("classes_for_faculty", timeit(lambda: json_store.classes_for_faculty(data, fac), repeat))
+            record("find_class_by_name (miss)", timeit(lambda: json_store.find_class_by_name(data, "0Q"), repeat))
+            record("find_student_by_roll (miss)", timeit(
+                lambda: json_store.find_student_by_roll(data, big_cid, "-1"), repeat))
+            indexes = IndexManager(data)
+            record("index: build", timeit(lambda: IndexManager(data), repeat))
+            record("index: classes_for_faculty", timeit(lambda: indexes.classes_for(fac), repeat))
+            record("index: class_by_name (miss)", timeit(lambda: indexes.class_by_name("0Q"), repeat))
+            record("index: student_by_roll (miss)", timeit(lambda: indexes.student_by_roll(big_cid, "-1"), repeat))
+            record("search: build", timeit(lambda: StudentSearch(data), repeat))
+            search = indexes.search()
+            first = data["students"][sid]["name"].split()[0]
+            record("search: name prefix", timeit(lambda: search.query(first[:3]), repeat))
+            record("search: full name", timeit(lambda: search.query(data["students"][sid]["name"]), repeat))
+            record("search: typo", timeit(lambda: search.query(first + "x"), repeat))
+            record("search: roll no", timeit(lambda: search.query("7"), repeat))
+            record("search: student id", timeit(lambda: search.query(sid), repeat))
+
+            if ui:
+                bench_ui(data, fac, big_cid, repeat, record)
+        finally:
+            json_store.DATA_FILE = old_file
+    return results
+
+
+def bench_ui(data: Dict[str, Any], fac: str, cid: str, repeat: int, record) -> None:
+    """Time _refresh_rank_list on a real (possibly Xvfb) Tk root."""
+    import tkinter as tk
+    from app import SMSApp
+    from service import SchoolService
+    try:
+        sms = SMSApp(SchoolService(data))
+    except tk.TclError as e:
+        print(f"  (skipping UI benchmarks: {e})")
+        return
+    try:
+        sms.withdraw()
+        sms.current_user, sms.current_role = fac, "faculty"
+        sms._build_faculty_dashboard()
+        sms.class_combo.current(sms._class_ids.index(cid))
+
+        def refresh():
+            sms._refresh_rank_list()
+            sms.update_idletasks()
+
+        def reset():
+            sms.rank_list.clear()
+        record("_refresh_rank_list (cold)", timeit(refresh, repeat, setup=reset))
+        refresh()
+        record("_refresh_rank_list (diff)", timeit(refresh, repeat))
+    finally:
+        sms.destroy()
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    with open(base_path, encoding="utf-8") as f:
+        base = {(r["name"], r["students"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    for r in new:
+        old = base.get((r["name"], r["students"]))
+        if not old or not old["median_ms"]:
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{r['name']:<34} {r['students']:>8} {old['median_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms"
+              f"  x{ratio:.2f} {flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark storage, ranking and UI hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="total students")
+    parser.add_argument("--subjects", type=int, default=6)
+    parser.add_argument("--marks-ratio", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ui", action="store_true", help="include Tk rank-list refresh (needs a display/Xvfb)")
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.threshold))
+
+    all_results: List[Dict[str, Any]] = []
+    for n in args.sizes:
+        print(f"{n} students:")
+        all_results.extend(bench_size(n, args.subjects, args.marks_ratio, args.repeat, args.ui))
+    report = {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": all_results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", args.out)
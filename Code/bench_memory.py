@@ -0,0 +1,47 @@
+# bench_memory.py
+# Bytes per student for the dict representation vs compact.CompactStore.
+#
+#   python bench_memory.py                 # 10k, 100k, 1M students
+#   python bench_memory.py --sizes 10000 50000 --subjects 8
+
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Any, Dict
+
+from compact import CompactStore
+from datagen import generate
+
+CLASS_SIZE = 60
+
+
+def measure(students: int, subjects: int) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    data = generate(faculties=10, classes=-(-students // CLASS_SIZE), students_per_class=CLASS_SIZE,
+                    subjects=subjects)
+    students = len(data["students"])
+    dict_bytes = tracemalloc.get_traced_memory()[0] - base
+    store = CompactStore.from_data(data)
+    del data
+    gc.collect()
+    compact_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del store
+    return {
+        "students": students,
+        "dict_bytes_per_student": round(dict_bytes / students, 1),
+        "compact_bytes_per_student": round(compact_bytes / students, 1),
+        "ratio": round(dict_bytes / max(compact_bytes, 1), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory per student: dict vs compact store")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--subjects", type=int, default=6)
+    args = parser.parse_args()
+    for n in args.sizes:
+        print(json.dumps(measure(n, args.subjects)))
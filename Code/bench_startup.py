@@ -0,0 +1,70 @@
+# bench_startup.py
+# Startup cost: indented data.json vs the lazy binary snapshot.
+#
+#   python bench_startup.py                  # 100k students
+#   python bench_startup.py --students 20000 --repeat 3
+#
+# Times load_data() plus the first login lookup (one faculty and one
+# student record) for each format, each in a fresh interpreter.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from datagen import generate, write
+import snapshot
+
+CLASS_SIZE = 60
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import json_store
+json_store.DATA_FILE = sys.argv[1]
+data = json_store.load_data()
+loaded = time.perf_counter()
+fac = data["faculties"][sys.argv[2]]["name"]
+stu = data["students"][sys.argv[3]]["password"]
+done = time.perf_counter()
+print(json.dumps({"load_ms": (loaded - start) * 1000, "login_ms": (done - start) * 1000}))
+"""
+
+
+def run_probe(path: str, fac: str, sid: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE, path, fac, sid], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    return json.loads(out)
+
+
+def main(students: int, repeat: int) -> dict:
+    data = generate(faculties=50, classes=-(-students // CLASS_SIZE), students_per_class=CLASS_SIZE)
+    fac = next(iter(data["faculties"]))
+    sid = list(data["students"])[len(data["students"]) // 2]
+    report = {"students": len(data["students"])}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir, bin_dir = os.path.join(tmp, "json"), os.path.join(tmp, "bin")
+        os.makedirs(json_dir)
+        os.makedirs(bin_dir)
+        json_path, bin_path = os.path.join(json_dir, "data.json"), os.path.join(bin_dir, "data.json")
+        write(data, json_path)
+        with open(bin_path + ".snap", "wb") as f:
+            f.write(snapshot.encode(data))
+        report["json_bytes"] = os.path.getsize(json_path)
+        report["snapshot_bytes"] = os.path.getsize(bin_path + ".snap")
+        for label, path in (("json", json_path), ("binary", bin_path)):
+            runs = [run_probe(path, fac, sid) for _ in range(repeat)]
+            report[f"{label}_load_ms"] = round(statistics.median(r["load_ms"] for r in runs), 1)
+            report[f"{label}_first_login_ms"] = round(statistics.median(r["login_ms"] for r in runs), 1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time: JSON vs binary snapshot")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(main(args.students, args.repeat), indent=2))
@@ -0,0 +1,91 @@
+# bulk.py
+# Streaming CSV import/export for students and marks.
+#
+# Importers read rows lazily with csv.DictReader and hand them to the
+# service's batch methods, which validate everything and then apply the
+# whole file as one transaction (one journal record / one SQL commit) with
+# a single rank rebuild. Exporters feed csv.writer from generators, so no
+# sheet is built in memory.
+#
+#   students CSV: roll_no,name
+#   marks CSV:    student_id or roll_no, then one column per subject
+
+import csv
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+from service import SchoolService, ServiceError
+
+
+def _reader(f: TextIO, required: Tuple[str, ...] = ()) -> csv.DictReader:
+    reader = csv.DictReader(f)
+    fields = [h.strip() for h in reader.fieldnames or []]
+    reader.fieldnames = fields
+    missing = [c for c in required if c not in fields]
+    if missing:
+        raise ServiceError("Invalid", f"CSV is missing column(s): {', '.join(missing)}")
+    return reader
+
+
+def import_students(service: SchoolService, faculty: str, cid: str, f: TextIO) -> List[Tuple[str, str, str, str]]:
+    """Register every roll_no,name row; returns (student_id, roll_no, name, temp_password)."""
+    reader = _reader(f, ("roll_no", "name"))
+    return service.register_students(faculty, cid, ((row["roll_no"], row["name"]) for row in reader))
+
+
+def import_marks(service: SchoolService, faculty: str, cid: str, f: TextIO) -> int:
+    """Apply a marks sheet keyed by student_id or roll_no; returns marks written."""
+    reader = _reader(f)
+    fields = reader.fieldnames or []
+    if "student_id" in fields:
+        key = "student_id"
+    elif "roll_no" in fields:
+        key = "roll_no"
+    else:
+        raise ServiceError("Invalid", "CSV needs a student_id or roll_no column.")
+    subjects = [c for c in fields if c not in ("student_id", "roll_no", "name")]
+    by_roll: Dict[str, str] = {}
+    if key == "roll_no":
+        students = service.data["students"]
+        by_roll = {students[s]["roll_no"]: s for s in service.data["classes"].get(cid, {}).get("students", [])}
+
+    def rows() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in reader:
+            ident = (row.get(key) or "").strip()
+            sid = by_roll.get(ident, f"roll {ident}") if key == "roll_no" else ident
+            yield sid, {sub: row.get(sub) or "" for sub in subjects}
+
+    return service.set_class_marks(faculty, cid, rows())
+
+
+def write_credentials(created: List[Tuple[str, str, str, str]], f: TextIO) -> None:
+    """Write the temp passwords from import_students for hand-out."""
+    writer = csv.writer(f)
+    writer.writerow(["student_id", "roll_no", "name", "temp_password"])
+    writer.writerows(created)
+
+
+def iter_rank_rows(service: SchoolService, cid: str) -> Iterator[List[Any]]:
+    students = service.data["students"]
+    yield ["rank", "student_id", "name", "roll_no", "total"]
+    for rank, sid, total in service.ranks.for_class(cid).ranked():
+        s = students[sid]
+        yield [rank, sid, s["name"], s["roll_no"], total]
+
+
+def iter_marks_rows(service: SchoolService, cid: str) -> Iterator[List[Any]]:
+    cls = service.data["classes"][cid]
+    students = service.data["students"]
+    subjects = cls.get("subjects", [])
+    yield ["student_id", "roll_no", "name"] + subjects
+    for sid in cls.get("students", []):
+        s = students[sid]
+        marks = s.get("marks", {})
+        yield [sid, s["roll_no"], s["name"]] + [marks.get(sub, "") for sub in subjects]
+
+
+def export_rank_list(service: SchoolService, cid: str, f: TextIO) -> None:
+    csv.writer(f).writerows(iter_rank_rows(service, cid))
+
+
+def export_marks_sheet(service: SchoolService, cid: str, f: TextIO) -> None:
+    csv.writer(f).writerows(iter_marks_rows(service, cid))
@@ -0,0 +1,199 @@
+# compact.py
+# Memory-compact in-memory representation of the dataset.
+#
+# Students become __slots__ records instead of dicts, and each class keeps
+# every student's marks in one flat array('i') (row = student, column =
+# subject position), so subject names are stored once per class rather
+# than once per student. Class IDs and subject names are interned.
+# Assessment mark columns become array('i') too. CompactStore.from_data()/
+# to_data() convert to and from the JSON shape used for persistence, and
+# round-trip it exactly: marks the array cannot hold (non-integers, marks
+# for subjects the class no longer has) stay in a per-student dict, and
+# students that fit no class block are kept as plain dicts.
+
+import sys
+import copy
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+MISSING = -1  # marks are non-negative, so -1 means "no mark"
+_MAX = 2 ** 31 - 1  # largest value an array('i') slot holds
+
+_STUDENT_KEYS = {"name", "password", "first_login", "class_id", "roll_no", "marks"}
+_CLASS_KEYS = {"name", "faculty", "students", "subjects"}
+
+
+def _is_mark(val: Any) -> bool:
+    """True for a value the marks arrays can hold."""
+    return isinstance(val, int) and not isinstance(val, bool) and 0 <= val <= _MAX
+
+
+def _column(col: Any) -> Any:
+    """An assessment marks column as array('i'), or a copy if it holds anything else."""
+    if isinstance(col, list) and all(_is_mark(v) or (type(v) is int and v == MISSING) for v in col):
+        return array("i", col)
+    return copy.deepcopy(col)
+
+
+class StudentRecord:
+    __slots__ = ("name", "password", "first_login", "class_id", "roll_no", "row", "other_marks")
+
+    def __init__(self, name: str, password: str, first_login: bool, class_id: str, roll_no: str, row: int):
+        self.name = name
+        self.password = password
+        self.first_login = first_login
+        self.class_id = class_id
+        self.roll_no = roll_no
+        self.row = row  # row in the class's marks array
+        self.other_marks: Optional[Dict[str, Any]] = None  # marks the array cannot hold
+
+
+class ClassBlock:
+    """One class: metadata, roster and a students x subjects marks array."""
+    __slots__ = ("name", "faculty", "subjects", "_col", "students", "marks")
+
+    def __init__(self, name: str, faculty: str, subjects: List[str]):
+        self.name = name
+        self.faculty = faculty
+        self.subjects = [sys.intern(s) for s in subjects]
+        self._col = {s: j for j, s in enumerate(self.subjects)}
+        self.students: List[str] = []
+        self.marks = array("i")
+
+    def add_row(self, sid: str) -> int:
+        self.students.append(sid)
+        self.marks.extend([MISSING] * len(self.subjects))
+        return len(self.students) - 1
+
+    def add_subject(self, subject: str) -> None:
+        """Append a column; re-lays the array out once."""
+        subject = sys.intern(subject)
+        if subject in self._col:
+            return
+        m = len(self.subjects)
+        old, self.marks = self.marks, array("i")
+        for i in range(len(self.students)):
+            self.marks.extend(old[i * m:(i + 1) * m])
+            self.marks.append(MISSING)
+        self._col[subject] = m
+        self.subjects.append(subject)
+
+    def get(self, row: int, subject: str) -> Optional[int]:
+        j = self._col.get(subject)
+        if j is None:
+            return None
+        val = self.marks[row * len(self.subjects) + j]
+        return None if val == MISSING else val
+
+    def set(self, row: int, subject: str, value: int) -> None:
+        self.marks[row * len(self.subjects) + self._col[subject]] = value
+
+    def row_marks(self, row: int) -> Dict[str, int]:
+        m = len(self.subjects)
+        vals = self.marks[row * m:(row + 1) * m]
+        return {sub: v for sub, v in zip(self.subjects, vals) if v != MISSING}
+
+
+class CompactStore:
+    """
+    Compact equivalent of the faculties/students/classes/assessments dict;
+    to_data(from_data(d)) == d.
+    """
+
+    def __init__(self):
+        self.faculties: Dict[str, Dict[str, str]] = {}
+        self.classes: Dict[str, ClassBlock] = {}
+        self.students: Dict[str, StudentRecord] = {}
+        self.loose: Dict[str, Dict[str, Any]] = {}  # student records kept as-is, see from_data
+        self.assessments: Optional[Dict[str, Dict[str, Any]]] = None  # None: the data had no such key
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> "CompactStore":
+        """Convert the JSON shape; ValueError if a class record has other fields than the usual four."""
+        store = cls()
+        store.faculties = {k: dict(v) for k, v in data.get("faculties", {}).items()}
+        students = data.get("students", {})
+        for cid, c in data.get("classes", {}).items():
+            if set(c) != _CLASS_KEYS:
+                raise ValueError(f"class {cid!r} has fields {sorted(c)}, expected {sorted(_CLASS_KEYS)}")
+            cid = sys.intern(cid)
+            block = store.classes[cid] = ClassBlock(c["name"], c["faculty"], c["subjects"])
+            m = len(block.subjects)
+            for sid in c["students"]:
+                row = block.add_row(sid)  # every roster entry keeps its row, so the roster round-trips
+                s = students.get(sid)
+                if (s is None or sid in store.students or s.get("class_id") != cid or set(s) != _STUDENT_KEYS
+                        or not isinstance(s["first_login"], bool) or not isinstance(s["marks"], dict)):
+                    continue
+                rec = StudentRecord(s["name"], s["password"], s["first_login"], cid, s["roll_no"], row)
+                base = row * m
+                for sub, val in s["marks"].items():
+                    j = block._col.get(sub)
+                    if j is not None and _is_mark(val):
+                        block.marks[base + j] = val
+                    else:
+                        if rec.other_marks is None:
+                            rec.other_marks = {}
+                        rec.other_marks[sub] = copy.deepcopy(val)
+                store.students[sid] = rec
+        # off every roster, on another class's roster or an unusual shape
+        store.loose = {sid: copy.deepcopy(s) for sid, s in students.items() if sid not in store.students}
+        if "assessments" in data:
+            store.assessments = {}
+            for aid, a in data["assessments"].items():
+                record = store.assessments[aid] = {k: copy.deepcopy(v) for k, v in a.items() if k != "marks"}
+                if "marks" in a:
+                    record["marks"] = {sub: _column(col) for sub, col in a["marks"].items()}
+        return store
+
+    def to_data(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"faculties": {k: dict(v) for k, v in self.faculties.items()},
+                                "students": {}, "classes": {}}
+        for cid, block in self.classes.items():
+            data["classes"][cid] = {"name": block.name, "faculty": block.faculty,
+                                    "students": list(block.students), "subjects": list(block.subjects)}
+        for sid in self.students:
+            data["students"][sid] = self.student_dict(sid)
+        data["students"].update(copy.deepcopy(self.loose))
+        if self.assessments is not None:
+            data["assessments"] = {}
+            for aid, a in self.assessments.items():
+                record = data["assessments"][aid] = {k: copy.deepcopy(v) for k, v in a.items() if k != "marks"}
+                if "marks" in a:
+                    record["marks"] = {sub: col.tolist() if isinstance(col, array) else copy.deepcopy(col)
+                                       for sub, col in a["marks"].items()}
+        return data
+
+    def student_dict(self, sid: str) -> Dict[str, Any]:
+        if sid in self.loose:
+            return copy.deepcopy(self.loose[sid])
+        rec = self.students[sid]
+        marks = self.classes[rec.class_id].row_marks(rec.row)
+        if rec.other_marks:
+            marks.update(copy.deepcopy(rec.other_marks))
+        return {"name": rec.name, "password": rec.password, "first_login": rec.first_login,
+                "class_id": rec.class_id, "roll_no": rec.roll_no, "marks": marks}
+
+    # ---------- mutations ----------
+    def add_student(self, sid: str, name: str, password: str, class_id: str, roll_no: str) -> StudentRecord:
+        block = self.classes[class_id]
+        rec = StudentRecord(name, password, True, sys.intern(class_id), roll_no, block.add_row(sid))
+        self.students[sid] = rec
+        return rec
+
+    def get_mark(self, sid: str, subject: str) -> Optional[int]:
+        rec = self.students[sid]
+        return self.classes[rec.class_id].get(rec.row, subject)
+
+    def set_mark(self, sid: str, subject: str, value: int) -> None:
+        if value < 0:
+            raise ValueError("marks must be non-negative")
+        rec = self.students[sid]
+        self.classes[rec.class_id].set(rec.row, subject, value)
+        if rec.other_marks:
+            rec.other_marks.pop(subject, None)
+
+    def iter_class_marks(self, class_id: str) -> Iterator[Dict[str, int]]:
+        block = self.classes[class_id]
+        for row in range(len(block.students)):
+            yield block.row_marks(row)
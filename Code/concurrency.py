@@ -0,0 +1,114 @@
+# concurrency.py
+# Cross-process coordination for stores shared by several app instances.
+#
+# FileLock is an advisory lock on a side file: fcntl.flock on POSIX,
+# msvcrt.locking on Windows. It is reentrant within a thread, blocks other
+# threads of the same process, and excludes other processes.
+#
+# Changes are compared by path: two writes clash when one path is a prefix
+# of the other (["students", sid] vs ["students", sid, "marks", "Maths"]),
+# except that appends to the same list commute.
+
+import os
+import threading
+import time
+from typing import List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ConflictError(Exception):
+    """Another process changed data this write depended on; merge has happened, retry."""
+
+    def __init__(self, paths: List[List[str]]):
+        shown = ", ".join("/".join(p) for p in paths[:5])
+        super().__init__(f"Concurrent change to {shown}")
+        self.paths = paths
+
+
+def _lock_fd(fd: int, blocking: bool) -> bool:
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            return False
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Exclusive advisory lock on `path`, shared by nested calls in one thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self._pid != os.getpid():
+            self._reset()  # forked child: the inherited descriptor shares the parent's lock
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if not _lock_fd(self._fd, blocking):
+                    self._thread_lock.release()
+                    return False
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_fd(self._fd)
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def paths_overlap(a: Sequence[str], b: Sequence[str]) -> bool:
+    """True if one path is a prefix of the other."""
+    n = min(len(a), len(b))
+    return list(a[:n]) == list(b[:n])
+
+
+def clashes(op_a: str, path_a: Sequence[str], op_b: str, path_b: Sequence[str]) -> bool:
+    """Whether two changes touch the same data in a way where order matters."""
+    if op_a == op_b == "append" and list(path_a) == list(path_b):
+        return False
+    return paths_overlap(path_a, path_b)
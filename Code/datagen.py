@@ -0,0 +1,103 @@
+# datagen.py
+# Synthetic dataset generator for benchmarks and load tests.
+#
+#   python datagen.py bench_data.json --classes 100 --students-per-class 60 \
+#       --subjects 6 --marks-ratio 0.8 --assessments 4
+#
+# Writes the same faculties/students/classes(/assessments) JSON shape the
+# app persists. Assessment marks drift from one exam to the next, and the
+# last one matches the current marks.
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+from typing import Any, Dict
+
+from assessments import MISSING, assessment_id
+
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rohan", "Divya",
+               "Karthik", "Meera", "Siddharth", "Lakshmi", "Aditya", "Pooja", "Nikhil", "Harini", "Varun", "Isha"]
+LAST_NAMES = ["Sharma", "Reddy", "Iyer", "Patel", "Nair", "Gupta", "Rao", "Kumar", "Menon", "Singh"]
+SUBJECTS = ["Maths", "Physics", "Chemistry", "Biology", "English", "History", "Geography", "Computer Science",
+            "Economics", "Hindi", "Telugu", "Art", "Music", "Physical Education", "Sanskrit"]
+
+
+def generate(faculties: int = 10, classes: int = 20, students_per_class: int = 60, subjects: int = 6,
+             marks_ratio: float = 1.0, seed: int = 1, assessments: int = 0) -> Dict[str, Any]:
+    """Build a dataset; `marks_ratio` is the fraction of (student, subject) marks filled in."""
+    rng = random.Random(seed)
+    subs = [SUBJECTS[j] if j < len(SUBJECTS) else f"Subject {j + 1}" for j in range(subjects)]
+    data: Dict[str, Any] = {"faculties": {}, "students": {}, "classes": {}}
+    fac_ids = [f"faculty{i + 1}" for i in range(max(faculties, 1))]
+    for uname in fac_ids:
+        data["faculties"][uname] = {"name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                                    "password": "password"}
+    for c in range(classes):
+        cid = f"class_{1700000000 + c}_{string.ascii_uppercase[c % 26]}"
+        cls = {"name": f"{c // 26 + 1}{string.ascii_uppercase[c % 26]}", "faculty": fac_ids[c % len(fac_ids)],
+               "students": [], "subjects": list(subs)}
+        data["classes"][cid] = cls
+        for roll in range(1, students_per_class + 1):
+            suffix = "".join(rng.choices(string.ascii_uppercase + string.digits, k=4))
+            sid = f"STU_{roll}_{suffix}"
+            while sid in data["students"]:
+                sid = f"STU_{roll}_" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=4))
+            marks = {sub: rng.randint(0, 100) for sub in subs if rng.random() < marks_ratio}
+            data["students"][sid] = {"name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                                     "password": "".join(rng.choices(string.ascii_letters + string.digits, k=8)),
+                                     "first_login": rng.random() < 0.3, "class_id": cid,
+                                     "roll_no": str(roll), "marks": marks}
+            cls["students"].append(sid)
+        for k in range(assessments):
+            _add_assessment(data, rng, cid, k, assessments)
+    return data
+
+
+def _add_assessment(data: Dict[str, Any], rng: random.Random, cid: str, k: int, count: int) -> None:
+    cls = data["classes"][cid]
+    last = k == count - 1
+    marks = {}
+    for sub in cls["subjects"]:
+        col = []
+        for sid in cls["students"]:
+            cur = data["students"][sid]["marks"].get(sub)
+            if cur is None:
+                col.append(MISSING)
+            else:
+                col.append(cur if last else max(0, min(100, cur + rng.randint(-25, 15))))
+        marks[sub] = col
+    data.setdefault("assessments", {})[assessment_id(cid, k + 1)] = {
+        "class_id": cid, "name": "Final" if last else f"Unit Test {k + 1}", "term": f"T{k + 1}",
+        "weight": 1.0, "students": list(cls["students"]), "marks": marks}
+
+
+def write(data: Dict[str, Any], path: str, indent: int = 2) -> None:
+    """Write a snapshot; refuses to sit under a journal or binary snapshot that would shadow it."""
+    for suffix in (".journal", ".snap"):
+        if os.path.exists(path + suffix):
+            raise FileExistsError(f"{path}{suffix} exists and would shadow the generated data")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic data.json")
+    parser.add_argument("output")
+    parser.add_argument("--faculties", type=int, default=10)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students-per-class", type=int, default=60)
+    parser.add_argument("--subjects", type=int, default=6)
+    parser.add_argument("--marks-ratio", type=float, default=1.0, help="fraction of marks filled in (sparsity)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--assessments", type=int, default=0, help="assessments per class")
+    args = parser.parse_args()
+    try:
+        write(generate(args.faculties, args.classes, args.students_per_class, args.subjects,
+                       args.marks_ratio, args.seed, args.assessments), args.output)
+    except FileExistsError as e:
+        print("Error:", e)
+        sys.exit(1)
+    print(f"Wrote {args.classes * args.students_per_class} students to {args.output}")
@@ -0,0 +1,203 @@
+# indexes.py
+# Secondary lookup maps over the in-memory dataset.
+#
+# The storage queries walk every class (or a whole roster) per call. The
+# IndexManager keeps the answers precomputed instead:
+#   faculty            -> [class ids, creation order]
+#   class name (lower) -> class id
+#   combobox label     -> class id     ("10A (class_...)")
+#   class id, roll no  -> student id   (per class, built on first lookup)
+#   class id           -> [assessment ids, creation order]  (from the keys alone)
+#   name / roll / id   -> student ids  (search.StudentSearch, built on first search)
+# SchoolService builds it once on load and updates it after every local
+# write and every change merged from another process. check() compares it
+# against a fresh rebuild, for tests and the stress run.
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from assessments import assessment_class
+from search import StudentSearch
+
+
+def class_label(name: str, cid: str) -> str:
+    """Text shown for a class in the faculty's class picker."""
+    return f"{name} ({cid})"
+
+
+class IndexManager:
+    """Precomputed class/student lookups for ``data``, kept current by SchoolService."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.by_faculty: Dict[str, List[str]] = {}
+        self.by_name: Dict[str, str] = {}
+        self.by_label: Dict[str, str] = {}
+        self._class_keys: Dict[str, Tuple[str, str, str]] = {}  # cid -> (faculty, lower name, label)
+        # roll maps touch every student record, so they are built per class on
+        # first use; a lazily decoded snapshot then stays undecoded until needed
+        self._rolls: Dict[str, Dict[str, str]] = {}
+        self._student_keys: Dict[str, Tuple[str, str]] = {}  # sid -> (cid, roll) for built classes
+        self.by_class_assessments: Dict[str, List[str]] = {}
+        self._search: Optional[StudentSearch] = None  # reads every student record, so also lazy
+        for cid in self.data.get("classes", {}):
+            self.update_class(cid, newest=True)
+        for aid in self.data.get("assessments", {}):
+            self.update_assessment(aid)
+
+    # ---------- lookups ----------
+    def classes_for(self, faculty: str) -> List[str]:
+        return list(self.by_faculty.get(faculty, ()))
+
+    def class_by_name(self, name: str) -> Optional[str]:
+        return self.by_name.get(name.lower())
+
+    def class_by_label(self, label: str) -> Optional[str]:
+        return self.by_label.get(label)
+
+    def label(self, cid: str) -> str:
+        return self._class_keys[cid][2]
+
+    def assessments_for(self, cid: str) -> List[str]:
+        return list(self.by_class_assessments.get(cid, ()))
+
+    def student_by_roll(self, cid: str, roll_no: str) -> Optional[str]:
+        return self._rolls_for(cid).get(roll_no)
+
+    def search(self) -> StudentSearch:
+        if self._search is None:
+            self._search = StudentSearch(self.data)
+        return self._search
+
+    def _rolls_for(self, cid: str) -> Dict[str, str]:
+        rolls = self._rolls.get(cid)
+        if rolls is None:
+            rolls = self._rolls[cid] = {}
+            students = self.data.get("students", {})
+            for sid in self.data.get("classes", {}).get(cid, {}).get("students", []):
+                roll = students.get(sid, {}).get("roll_no")
+                if roll is not None:
+                    rolls.setdefault(roll, sid)  # first on the roster wins, like the scan
+                    self._student_keys[sid] = (cid, roll)
+        return rolls
+
+    # ---------- maintenance ----------
+    def update(self, paths: Iterable[Sequence[str]]) -> None:
+        """Refresh the entries behind changed data paths (as passed to on_merge)."""
+        for path in paths:
+            if len(path) < 2:
+                if path and path[0] in ("classes", "students", "assessments"):
+                    self.rebuild()
+                    return
+                continue
+            if path[0] == "classes":
+                self.update_class(path[1], replaced=len(path) == 2)
+                if len(path) == 2:
+                    self._rolls.pop(path[1], None)  # whole record replaced; rebuild on next lookup
+            elif path[0] == "students":
+                self.update_student(path[1])
+            elif path[0] == "assessments":
+                self.update_assessment(path[1])
+
+    def update_class(self, cid: str, newest: bool = False, replaced: bool = False) -> None:
+        """Re-index one class.
+
+        ``newest``: known to be the last created, so no order lookup.
+        ``replaced``: the whole record was set again (a merge), which may
+        have moved it in creation order even if nothing indexed changed.
+        """
+        cls = self.data.get("classes", {}).get(cid)
+        keys = None
+        if cls is not None:
+            name = cls.get("name", "")
+            keys = (cls.get("faculty"), name.lower(), class_label(name, cid))
+        old = self._class_keys.pop(cid, None)
+        if keys is not None and keys == old and not replaced:
+            self._class_keys[cid] = keys  # roster/subjects change: nothing indexed moved
+            return
+        if old is not None:
+            faculty, name, label = old
+            owned = self.by_faculty.get(faculty, [])
+            if cid in owned:
+                owned.remove(cid)
+            if self.by_name.get(name) == cid:
+                del self.by_name[name]
+                # a class merged from another process may share the name
+                for other, (_, other_name, _) in self._class_keys.items():
+                    if other_name == name:
+                        self.by_name[name] = other
+                        break
+            self.by_label.pop(label, None)
+        if keys is None:
+            self._rolls.pop(cid, None)
+            return
+        self._class_keys[cid] = keys
+        owned = self.by_faculty.setdefault(keys[0], [])
+        if newest or not owned:
+            owned.append(cid)
+        else:
+            # renamed, or created here before a class merged from elsewhere
+            owned.insert(self._creation_slot(owned, cid), cid)
+        self.by_name.setdefault(keys[1], cid)
+        self.by_label[keys[2]] = cid
+
+    def _creation_slot(self, owned: List[str], cid: str) -> int:
+        order = {c: i for i, c in enumerate(self.data.get("classes", {}))}
+        mine = order.get(cid, len(order))
+        for i, other in enumerate(owned):
+            # skip classes whose removal has not been indexed yet
+            if order.get(other, -1) > mine:
+                return i
+        return len(owned)
+
+    def update_student(self, sid: str) -> None:
+        if self._search is not None:
+            self._search.update(sid)
+        old = self._student_keys.pop(sid, None)
+        if old is not None:
+            rolls = self._rolls.get(old[0])
+            if rolls is not None and rolls.get(old[1]) == sid:
+                del rolls[old[1]]
+        stu = self.data.get("students", {}).get(sid)
+        if not stu or stu.get("class_id") not in self._rolls or stu.get("roll_no") is None:
+            return
+        cid, roll = stu["class_id"], stu["roll_no"]
+        self._rolls[cid].setdefault(roll, sid)
+        self._student_keys[sid] = (cid, roll)
+
+    def update_assessment(self, aid: str) -> None:
+        cid = assessment_class(aid)
+        owned = self.by_class_assessments.setdefault(cid, [])
+        present = aid in self.data.get("assessments", {})
+        if present and aid not in owned:
+            owned.append(aid)
+        elif not present and aid in owned:
+            owned.remove(aid)
+
+    # ---------- consistency ----------
+    def check(self) -> List[str]:
+        """Differences from a fresh rebuild; an empty list means the maps are consistent."""
+        fresh = IndexManager(self.data)
+        problems: List[str] = []
+        for attr in ("by_faculty", "by_name", "by_label", "by_class_assessments"):
+            mine = {k: v for k, v in getattr(self, attr).items() if v}
+            theirs = {k: v for k, v in getattr(fresh, attr).items() if v}
+            for key in set(mine) | set(theirs):
+                if mine.get(key) != theirs.get(key):
+                    problems.append(f"{attr}[{key!r}]: {mine.get(key)!r} != {theirs.get(key)!r}")
+        for cid, rolls in self._rolls.items():
+            expected = fresh._rolls_for(cid)
+            if rolls != expected:
+                missing = {r: s for r, s in expected.items() if rolls.get(r) != s}
+                extra = {r: s for r, s in rolls.items() if expected.get(r) != s}
+                problems.append(f"rolls[{cid!r}]: missing {missing!r}, unexpected {extra!r}")
+        if self._search is not None:
+            expected = fresh.search().entries
+            for sid in set(self._search.entries) | set(expected):
+                if self._search.entries.get(sid) != expected.get(sid):
+                    problems.append(f"search[{sid!r}]: {self._search.entries.get(sid)!r} != {expected.get(sid)!r}")
+            if self._search.query_keys() != fresh.search().query_keys():
+                problems.append("search: word/roll/id keys differ from a rebuild")
+        return problems
@@ -0,0 +1,185 @@
+# instrument.py
+# Always-on, low-overhead timings and counters for the hot paths.
+#
+#   @timed("storage.load_data")       latency samples per call
+#   count("storage.conflicts")         plain counters
+#   observe("storage.save_bytes", n)   value series (bytes per save, file size, ...)
+#
+# Each series keeps a bounded window of recent values (SAMPLES) plus an
+# all-time count, total and max, so p50/p95/p99 reflect the recent session
+# and memory never grows. A timed call costs two perf_counter() reads and a
+# deque append.
+#
+# SMS_METRICS=path writes the metrics() JSON there at exit.
+# SMS_PROFILE=cprofile,tracemalloc also runs cProfile (main thread) and/or
+# tracemalloc from import to exit, writing <base>.<pid>.prof and
+# <base>.<pid>.mem.txt, where <base> is SMS_METRICS minus its extension,
+# or "sms" in the working directory.
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+SAMPLES = 2048  # recent values kept per series for percentiles
+PROFILE = {p.strip().lower() for p in os.environ.get("SMS_PROFILE", "").split(",") if p.strip()}
+METRICS_FILE = os.environ.get("SMS_METRICS", "")
+
+_started = time.time()
+_series_lock = threading.Lock()
+
+
+class Series:
+    """Recent values plus all-time count/total/max for one metric."""
+
+    __slots__ = ("recent", "count", "total", "max", "last")
+
+    def __init__(self):
+        self.recent: Deque[float] = deque(maxlen=SAMPLES)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, value: float) -> None:
+        self.recent.append(value)
+        self.count += 1
+        self.total += value
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+    def summary(self, scale: float = 1.0) -> Dict[str, Any]:
+        vals = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count * scale, 3) if self.count else None,
+            "p50": _pct(vals, 50, scale),
+            "p95": _pct(vals, 95, scale),
+            "p99": _pct(vals, 99, scale),
+            "max": round(self.max * scale, 3),
+            "last": round(self.last * scale, 3),
+        }
+
+
+_timings: Dict[str, Series] = {}
+_values: Dict[str, Series] = {}
+_counters: Dict[str, int] = {}
+
+
+def _pct(sorted_vals: List[float], q: float, scale: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, int(round(q / 100 * (len(sorted_vals) - 1))))
+    return round(sorted_vals[idx] * scale, 3)
+
+
+def _series(table: Dict[str, Series], name: str) -> Series:
+    series = table.get(name)
+    if series is None:
+        with _series_lock:
+            series = table.setdefault(name, Series())
+    return series
+
+
+def record(name: str, seconds: float) -> None:
+    """Add one latency sample, for spans that don't fit a decorator."""
+    _series(_timings, name).add(seconds)
+
+
+def observe(name: str, value: float) -> None:
+    _series(_values, name).add(value)
+
+
+def count(name: str, n: int = 1) -> None:
+    with _series_lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def timed(name: str) -> Callable:
+    """Decorator recording each call's wall time under ``name``, also when it raises."""
+    def wrap(fn: Callable) -> Callable:
+        series = _series(_timings, name)
+        clock = time.perf_counter
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                series.add(clock() - start)
+        return wrapper
+    return wrap
+
+
+def metrics() -> Dict[str, Any]:
+    """Everything collected so far; latencies in milliseconds."""
+    with _series_lock:
+        timings, values, counters = dict(_timings), dict(_values), dict(_counters)
+    return {
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - _started, 1),
+        "latency_ms": {k: s.summary(1000.0) for k, s in sorted(timings.items()) if s.count},
+        "values": {k: s.summary() for k, s in sorted(values.items()) if s.count},
+        "counters": dict(sorted(counters.items())),
+        "profile": sorted(PROFILE),
+    }
+
+
+def dump(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metrics(), f, indent=2)
+
+
+def reset() -> None:
+    with _series_lock:
+        for table in (_timings, _values):
+            for series in table.values():
+                series.__init__()
+        _counters.clear()
+
+
+# ---------- optional profilers ----------
+
+_profiler = None
+
+
+def _profile_path(suffix: str) -> str:
+    base = os.path.splitext(METRICS_FILE)[0] if METRICS_FILE else "sms"
+    return f"{base}.{os.getpid()}.{suffix}"
+
+
+def _finish() -> None:
+    import multiprocessing
+    if multiprocessing.parent_process() is not None:
+        return  # a pool worker (reports, stress) inherited the env; only the main process reports
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_profile_path("prof"))  # view with: python -m pstats <file>
+    if "tracemalloc" in PROFILE:
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            snap = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with open(_profile_path("mem.txt"), "w", encoding="utf-8") as f:
+                f.write(f"current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB\n\n")
+                for stat in snap.statistics("lineno")[:40]:
+                    f.write(f"{stat}\n")
+    if METRICS_FILE:
+        dump(METRICS_FILE)
+
+
+if "cprofile" in PROFILE:
+    import cProfile
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+if "tracemalloc" in PROFILE:
+    import tracemalloc
+    tracemalloc.start(10)
+if PROFILE or METRICS_FILE:
+    atexit.register(_finish)
@@ -0,0 +1,884 @@
+# json_store.py
+# JSON storage backend: a snapshot file plus an append-only change journal.
+#
+# Mutations are appended to the journal as small change records instead of
+# rewriting the whole database. load_data() replays the journal over the
+# snapshot, and once the journal grows past COMPACT_THRESHOLD bytes it is
+# folded into a fresh snapshot on a background thread.
+#
+# Change records are (op, path, value) triples:
+#   ("set",    ["students", sid, "marks", "Maths"], 87)
+#   ("append", ["classes", cid, "subjects"], "Maths")
+#   ("set",    ["assessments", aid, "marks", "Maths", "12"], 87)
+# The last form sets one element of a list (an assessment marks column, by
+# roster row); a list that is too short is padded with assessments.MISSING.
+# Each journal line holds one batch and a sequence number:
+#   {"seq": 42, "changes": [[op, path, value], ...]}
+# A journal starts with a {"journal": <random id>} header line, so a
+# process can tell a new journal from the one it was reading even when the
+# filesystem reuses the old file's inode.
+# Snapshots record the seq they cover, so replay skips batches that are
+# already part of them; lines from older versions without a seq count on
+# from the previous line.
+#
+# With SMS_SNAPSHOT=binary, compaction writes DATA_FILE + ".snap" in the
+# memory-mapped format from snapshot.py instead of data.json, and records
+# are decoded lazily on first access. A .snap file is always preferred on
+# load, whichever format is configured.
+#
+# By default apply_changes() writes its batch (append + fsync) before it
+# returns, and a failed write is rolled back and raised. After
+# start_writer(), a background persistence.PersistenceWorker takes over the
+# fsync and batches written without a ``base``: those are applied in memory
+# at once and queued until a burst of edits settles; a failed write stays
+# queued, is retried, and is reported on the worker's errors queue. Call
+# flush() before the data must be on disk.
+#
+# Several processes may share one DATA_FILE. Journal writes, rotation and
+# snapshot replacement happen under an advisory lock on DATA_FILE + ".lock",
+# and before writing a process first merges whatever the others appended
+# since it last looked (sync). Every record keeps a version: the seq of its
+# last change. When another process has compacted the journal away, only
+# records whose version is newer than what we have seen are reloaded from
+# the new snapshot. Passing base=sync(data) to apply_changes() makes the
+# write optimistic: if a change merged after `base` touches the same paths
+# (or the `reads` the caller validated against), ConflictError is raised
+# and nothing is written. The check runs under the file lock after merging
+# the journal, and the batch is appended before the lock is let go, so a
+# write that returned can never be invalidated by another process later.
+# That is why optimistic batches are appended on the caller's thread even
+# with a writer.
+#
+# Queued batches are not on disk yet, so whenever changes from other
+# processes are merged, the queued batches are taken out of memory, the
+# merge is applied, and they are applied again on top: memory always equals
+# the journal plus the queue, in journal order. Only batches without a
+# ``base`` wait in the queue, so a merge never has to drop one (_reapply
+# would, and report it like a failed write). Merges done by the writer
+# or compaction threads reach on_merge listeners on the next sync(), on the
+# caller's thread.
+
+import json
+import os
+import re
+import secrets
+import threading
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import snapshot
+from assessments import MISSING
+from concurrency import ConflictError, FileLock, clashes
+from instrument import count, observe, timed
+from persistence import PersistenceWorker
+
+__all__ = [
+    "DATA_FILE", "Change", "ConflictError", "load_data", "save_data", "apply_changes", "apply_change",
+    "sync", "on_merge", "compact_async", "start_writer", "flush", "stop_writer",
+    "classes_for_faculty", "find_class_by_name", "find_student_by_roll",
+]
+
+DATA_FILE = os.environ.get("SMS_DATA_FILE", "data.json")
+COMPACT_THRESHOLD = 1 << 20  # journal bytes before a background compaction
+SNAPSHOT_FORMAT = os.environ.get("SMS_SNAPSHOT", "json").strip().lower()  # "json" or "binary"
+RECENT_CHANGES = 10000  # merged changes remembered for conflict checks
+_JSON_META_HEAD = re.compile(rb'\{"_meta":\{"seq":(\d+)')  # compaction writes _meta.seq first
+
+Change = Tuple[str, Sequence[str], Any]
+Versions = Dict[str, Dict[str, int]]
+
+_lock = threading.RLock()     # guards in-memory data, the queue and the sync state below
+_io_lock = threading.Lock()   # one journal flush at a time
+_compacting = False
+_dirty = False                # journal written but not (yet) fsynced
+_writes = 0                   # journal appends so far, to tell which fsync covered which
+_writer: Optional[PersistenceWorker] = None
+_pending: List["_Batch"] = []  # applied in memory, not yet in the journal
+_rejected: List[ConflictError] = []  # queued batches dropped by a merge, for a synchronous flush to raise
+_deferred: List[List[str]] = []      # merged paths not yet passed to on_merge listeners
+_file_locks: Dict[str, FileLock] = {}
+_listeners: List[Callable[[], Optional[Callable]]] = []
+
+# What this process has merged from DATA_FILE so far.
+_seq = 0                                  # every batch up to here is in memory
+_journal_stat: Optional[Tuple[int, ...]] = None  # journal (dev, ino, size, mtime) when last read
+_journal_id: Optional[str] = None         # header id of that journal
+_journal_pos = 0                          # bytes of the journal already read
+_journal_torn = False                     # journal ends in a partial line
+_versions: Versions = {}                  # collection -> key -> seq of last change
+_versions_complete = False                # False until the snapshot's own versions are merged in
+_recent: Deque[Tuple[int, str, List[str], bool]] = deque(maxlen=RECENT_CHANGES)  # (seq, op, path, ours)
+_recent_floor = 0                         # conflict history before this seq has been dropped
+_MISSING = object()
+
+
+class _Batch:
+    """One apply_changes() call waiting for the journal."""
+
+    __slots__ = ("data", "changes", "body", "base", "reads", "undo")
+
+    def __init__(self, data: Dict[str, Any], changes: List[Change], base: Optional[int],
+                 reads: List[List[str]]):
+        self.data = data
+        self.changes = changes
+        # serialized now: later edits may mutate the same objects in place
+        self.body = json.dumps(changes, separators=(",", ":"))
+        self.base = base
+        self.reads = reads
+        self.undo: List[Tuple[str, Any, Any, Any]] = []
+
+
+def _empty() -> Dict[str, Any]:
+    return {"faculties": {}, "students": {}, "classes": {}, "assessments": {}}
+
+
+def _journal_file() -> str:
+    return DATA_FILE + ".journal"
+
+
+def _rotated_journal_file() -> str:
+    return DATA_FILE + ".journal.old"
+
+
+def _snapshot_file() -> str:
+    return DATA_FILE + ".snap"
+
+
+def _file_lock(suffix: str = ".lock") -> FileLock:
+    path = DATA_FILE + suffix
+    with _lock:
+        lock = _file_locks.get(path)
+        if lock is None:
+            lock = _file_locks[path] = FileLock(path)
+        return lock
+
+
+def _stat_key(st: Optional[os.stat_result]) -> Optional[Tuple[int, ...]]:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) if st else None
+
+
+def _apply(data: Dict[str, Any], op: str, path: Sequence[str], value: Any, replay: bool = False) -> None:
+    target = data
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    last = path[-1]
+    if op == "set":
+        if isinstance(target, list):
+            _set_item(target, last, value)
+        else:
+            target[last] = value
+    elif op == "append":
+        items = target.setdefault(last, [])
+        # live callers have already checked for duplicates
+        if not replay or value not in items:
+            items.append(value)
+    else:
+        raise ValueError(f"Unknown change op: {op!r}")
+
+
+def _set_item(items: List[Any], key: str, value: Any) -> None:
+    i = int(key)
+    if i >= len(items):
+        items.extend([MISSING] * (i + 1 - len(items)))
+    items[i] = value
+
+
+def _do(batch: _Batch) -> None:
+    """Apply a live batch to its data, keeping what is needed to take it out again."""
+    batch.undo = []
+    for op, path, value in batch.changes:
+        parent = batch.data
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        last = path[-1]
+        if op == "set" and isinstance(parent, list):
+            i = int(last)
+            batch.undo.append(("item", parent, i, (len(parent), parent[i] if i < len(parent) else MISSING)))
+            _set_item(parent, last, value)
+        elif op == "set":
+            batch.undo.append((op, parent, last, parent.get(last, _MISSING)))
+            parent[last] = value
+        elif op == "append":
+            items = parent.setdefault(last, [])
+            if value not in items:  # a merged batch may have appended it first, as replay would
+                items.append(value)
+                batch.undo.append((op, items, None, value))
+        else:
+            raise ValueError(f"Unknown change op: {op!r}")
+
+
+def _undo(batch: _Batch) -> None:
+    for op, target, key, old in reversed(batch.undo):
+        if op == "item":
+            length, target[key] = old[0], old[1]
+            del target[length:]  # padding added by the set
+        elif op == "set":
+            if old is _MISSING:
+                target.pop(key, None)
+            else:
+                target[key] = old
+        else:
+            for i in range(len(target) - 1, -1, -1):
+                if target[i] == old:
+                    del target[i]
+                    break
+    batch.undo = []
+
+
+def _remember(seq: int, op: str, path: List[str], ours: bool = False) -> None:
+    global _recent_floor
+    if len(path) >= 2:
+        _versions.setdefault(path[0], {})[path[1]] = seq
+    if len(_recent) == _recent.maxlen:
+        _recent_floor = _recent[0][0]
+    _recent.append((seq, op, path, ours))
+
+
+def _merge(data: Dict[str, Any], path: str, start: int = 0,
+           strict: bool = False) -> Tuple[List[List[str]], int, bool]:
+    """Apply journal batches after _seq from byte `start` of `path`.
+
+    Returns (changed paths, end of the last complete line, ok); with
+    `strict`, ok is False if the batches do not continue from _seq, i.e. the
+    file is not the journal we were reading.
+    """
+    global _seq, _journal_torn
+    merged: List[List[str]] = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(start)
+            raw = f.read()
+    except FileNotFoundError:
+        _journal_torn = False
+        return merged, start, True
+    end = raw.rfind(b"\n") + 1
+    _journal_torn = end < len(raw)
+    seq = _seq
+    for line in raw[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # torn line from an interrupted write; the batch never committed
+            continue
+        if "journal" in record:
+            continue  # header
+        seq = record.get("seq", seq + 1)
+        if seq <= _seq:
+            continue  # already in the snapshot or merged before
+        if strict and seq != _seq + 1:
+            return merged, start, False
+        for op, keys, value in record.get("changes", []):
+            _apply(data, op, keys, value, replay=True)
+            _remember(seq, op, keys)
+            merged.append(keys)
+        _seq = seq
+    return merged, start + end, True
+
+
+def _snapshot_seq(path: str) -> int:
+    """Journal seq covered by a snapshot file, without decoding it."""
+    if path == _snapshot_file():
+        return snapshot.read_meta(path)[0]
+    with open(path, "rb") as f:
+        match = _JSON_META_HEAD.match(f.read(64))
+    return int(match.group(1)) if match else 0  # written before versioning
+
+
+def _journal_header(path: str) -> Optional[str]:
+    """Id from the journal's header line; None if missing or written before headers."""
+    try:
+        with open(path, "rb") as f:
+            record = json.loads(f.readline(256))
+    except (OSError, ValueError):
+        return None
+    return record.get("journal") if isinstance(record, dict) else None
+
+
+def _disk_snapshot() -> Optional[str]:
+    if os.path.exists(_snapshot_file()):
+        return _snapshot_file()
+    if os.path.exists(DATA_FILE):
+        return DATA_FILE
+    return None
+
+
+def _read_json_snapshot(path: str) -> Tuple[Dict[str, Any], int, Versions]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    meta = data.pop("_meta", {})
+    return data, meta.get("seq", 0), meta.get("versions", {})
+
+
+def _disk_versions() -> Tuple[int, Versions]:
+    """(seq, versions) of the snapshot currently on disk."""
+    path = _disk_snapshot()
+    if path is None:
+        return 0, {}
+    if path == _snapshot_file():
+        return snapshot.read_meta(path, versions=True)
+    return _read_json_snapshot(path)[1:]
+
+
+def _merge_versions(versions: Versions) -> None:
+    global _versions_complete
+    for name, keys in versions.items():
+        mine = _versions.setdefault(name, {})
+        for key, seq in keys.items():
+            if seq > mine.get(key, 0):
+                mine[key] = seq
+    _versions_complete = True
+
+
+def _resync(data: Dict[str, Any]) -> List[List[str]]:
+    """Catch up after the journal was rotated by a compaction (ours or another process's)."""
+    global _seq, _journal_pos, _journal_stat, _journal_id
+    merged: List[List[str]] = []
+    path = _disk_snapshot()
+    if path is not None and _snapshot_seq(path) > _seq:
+        if path == _snapshot_file():
+            fresh = snapshot.open_snapshot(path)
+            snap_seq, versions = snapshot.read_meta(path, versions=True)
+        else:
+            fresh, snap_seq, versions = _read_json_snapshot(path)
+        # reload only the records changed after what we have merged
+        for name, keys in versions.items():
+            for key, seq in keys.items():
+                if seq > _seq and key in fresh.get(name, {}):
+                    data.setdefault(name, {})[key] = fresh[name][key]
+                    _remember(snap_seq, "set", [name, key])
+                    merged.append([name, key])
+        _seq = snap_seq
+        _merge_versions(versions)
+    # a rotated journal exists while a compaction is in flight (or crashed)
+    merged += _merge(data, _rotated_journal_file())[0]
+    more, _journal_pos, _ = _merge(data, _journal_file())
+    merged += more
+    _journal_stat = _stat_key(_stat(_journal_file()))
+    _journal_id = _journal_header(_journal_file())
+    return merged
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _catch_up(data: Dict[str, Any], notify: bool = True) -> List[List[str]]:
+    """Merge changes other processes journaled since we last looked; caller holds both locks.
+
+    Queued batches for ``data`` are taken out for the merge and applied again
+    on top, minus any optimistic batch the merge conflicts with. Without
+    ``notify`` (writer and compaction threads) listeners hear about it on
+    the next sync().
+    """
+    st = _stat(_journal_file())
+    key = _stat_key(st)
+    merged: List[List[str]] = []
+    # a missing journal never counts as unchanged: a compaction in another
+    # process may have parked new lines in the rotated file
+    if key is None or key != _journal_stat:
+        queued = [b for b in _pending if b.data is data]
+        for batch in reversed(queued):
+            _undo(batch)
+        try:
+            merged = _merge_new(data, st, key)
+        finally:
+            # dropped paths first: listeners must forget our claim (a class
+            # name, a roll number) before they index the merged one
+            merged[:0] = _reapply(queued)
+    if notify:
+        _notify(data, _deferred + merged)
+        del _deferred[:]
+    else:
+        _deferred.extend(merged)
+    return merged
+
+
+def _merge_new(data: Dict[str, Any], st: Optional[os.stat_result], key: Optional[Tuple[int, ...]]) -> List[List[str]]:
+    global _journal_pos, _journal_stat
+    if st is not None and _journal_stat is not None and key[:2] == _journal_stat[:2] \
+            and st.st_size >= _journal_pos and _journal_header(_journal_file()) == _journal_id:
+        # same file: read on from where we stopped
+        merged, pos, ok = _merge(data, _journal_file(), _journal_pos, strict=True)
+        if ok:
+            _journal_pos, _journal_stat = pos, key
+            return merged
+    else:
+        merged = []
+    # a new (or reused) journal file: a compaction happened in between
+    return merged + _resync(data)
+
+
+def _reapply(queued: List[_Batch]) -> List[List[str]]:
+    """Put queued batches back after a merge; returns the paths of those dropped as conflicting."""
+    dropped: List[Change] = []
+    for batch in queued:
+        conflicts = _conflicts(batch.base, batch.changes, batch.reads) if batch.base is not None else []
+        # a later batch building on a dropped one (marks for a dropped registration) goes too
+        conflicts += [path for op, path, _ in batch.changes
+                      if any(clashes(op, path, op_d, path_d) for op_d, path_d, _ in dropped)]
+        if not conflicts:
+            _do(batch)
+            continue
+        _pending.remove(batch)
+        count("storage.conflicts")
+        dropped += batch.changes
+        _report(ConflictError(conflicts))
+    return [path for _, path, _ in dropped]
+
+
+def _report(error: Exception) -> None:
+    """Hand a write failure to whoever can tell the user: the writer's error queue, or the caller."""
+    if _writer is not None:
+        _writer.errors.put(error)
+    elif isinstance(error, ConflictError):
+        _rejected.append(error)
+
+
+def _notify(data: Dict[str, Any], paths: List[List[str]]) -> None:
+    if not paths:
+        return
+    for ref in list(_listeners):
+        callback = ref()
+        if callback is None:
+            _listeners.remove(ref)
+        else:
+            callback(data, paths)
+
+
+def on_merge(callback: Callable[[Dict[str, Any], List[List[str]]], None]) -> None:
+    """Call ``callback(data, paths)`` whenever changes from other processes are merged into ``data``.
+
+    Bound methods are held weakly, so registering does not keep their object alive.
+    """
+    with _lock:
+        if hasattr(callback, "__self__"):
+            _listeners.append(weakref.WeakMethod(callback))
+        else:
+            _listeners.append(lambda: callback)
+
+
+def sync(data: Dict[str, Any]) -> int:
+    """Merge in what other processes have saved; returns the seq to pass as ``base``.
+
+    Never waits for a write in progress (ours or another process's): it
+    returns what is merged so far, and writes based on it are still checked
+    against everything merged later.
+    """
+    key = _stat_key(_stat(_journal_file()))
+    if key is None or key != _journal_stat:
+        lock = _file_lock()
+        if lock.acquire(blocking=False):
+            try:
+                with _lock:
+                    _catch_up(data)
+                    return _seq
+            finally:
+                lock.release()
+    with _lock:
+        if _deferred:
+            _notify(data, _deferred[:])
+            del _deferred[:]
+        return _seq
+
+
+def _write_temp(path: str, payload: Union[str, bytes]) -> str:
+    """Write and fsync ``path`` + ".tmp"; returns the temp path for _commit_temp()."""
+    tmp = path + ".tmp"
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+
+def _commit_temp(tmp: str, path: str) -> None:
+    os.replace(tmp, path)
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows cannot open directories
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+@timed("storage.load_data")
+def load_data() -> Dict[str, Any]:
+    """Load snapshot and replay the journal; empty structure on missing/corrupt file."""
+    global _seq, _journal_pos, _journal_stat, _journal_id, _versions, _versions_complete, _recent_floor
+    with _file_lock(), _lock:
+        data = _empty()
+        _seq, _versions, _versions_complete = 0, {}, False
+        if os.path.exists(_snapshot_file()):
+            try:
+                data = snapshot.open_snapshot(_snapshot_file())
+                _seq = snapshot.read_meta(_snapshot_file())[0]
+            except Exception as e:
+                print("Warning: unreadable snapshot, falling back to data.json:", e)
+        if not isinstance(data.get("students"), snapshot.LazyCollection) and os.path.exists(DATA_FILE):
+            try:
+                data, _seq, _versions = _read_json_snapshot(DATA_FILE)
+                _versions_complete = True
+            except Exception:
+                # If file is corrupt or unreadable, start from a clean structure
+                data, _seq = _empty(), 0
+        _recent.clear()
+        _recent_floor = _seq
+        try:
+            # a rotated journal only exists if a compaction was interrupted
+            _merge(data, _rotated_journal_file())
+            _, _journal_pos, _ = _merge(data, _journal_file())
+        except Exception as e:
+            print("Warning: failed to replay journal:", e)
+        _journal_stat = _stat_key(_stat(_journal_file()))
+        _journal_id = _journal_header(_journal_file())
+        return data
+
+
+@timed("storage.apply_changes")
+def apply_changes(data: Dict[str, Any], changes: Iterable[Change],
+                  base: Optional[int] = None, reads: Iterable[Sequence[str]] = ()) -> None:
+    """Apply changes to ``data`` and write them to the journal as one record.
+
+    The batch is written as a single line, so after a crash either all of
+    it or none of it is replayed. With ``base`` (from sync()), the batch is
+    checked under the file lock against everything journaled so far and
+    appended before this returns: ConflictError is raised (and nothing
+    applied) if a change merged since ``base`` clashes with it or with a
+    path in ``reads``, and once it returns no other process can invalidate
+    it. A failed write is undone and raised. After start_writer(), the
+    fsync is left to the writer thread, and batches without ``base`` are
+    only queued for it.
+    """
+    changes: List[Change] = [(op, list(path), value) for op, path, value in changes]
+    if not changes:
+        return
+    batch = _Batch(data, changes, base, [list(r) for r in reads])
+    with _lock:
+        writer = _writer
+        if writer is not None and base is None:
+            _do(batch)  # nothing to check: it cannot conflict, so it may wait for the writer
+            _pending.append(batch)
+    if writer is not None and base is None:
+        writer.notify()
+        return
+    _flush_pending(batch, fsync=writer is None)
+    if writer is not None:
+        writer.notify()  # fsync soon
+
+
+def _drop(batch: _Batch) -> None:
+    """Take a queued batch out of memory and the queue, keeping the ones after it."""
+    later = _pending[_pending.index(batch) + 1:]
+    for other in reversed(later):
+        _undo(other)
+    _undo(batch)
+    _pending.remove(batch)
+    for other in later:
+        _do(other)
+    _notify(batch.data, [path for _, path, _ in batch.changes])
+
+
+def _conflicts(base: int, changes: List[Change], reads: List[List[str]]) -> List[List[str]]:
+    if base < _recent_floor:
+        return [["*"]]  # history is gone; assume the worst
+    found = []
+    for seq, op, path, ours in _recent:
+        if seq <= base or ours:
+            continue  # our own writes were in memory when the caller validated
+        if any(clashes(op, path, mine, mine_path) for mine, mine_path, _ in changes) or \
+                any(clashes(op, path, "set", r) for r in reads):
+            found.append(path)
+    return found
+
+
+def apply_change(data: Dict[str, Any], op: str, path: Sequence[str], value: Any,
+                 base: Optional[int] = None) -> None:
+    """Single-change shorthand for apply_changes()."""
+    apply_changes(data, [(op, path, value)], base)
+
+
+def _flush_pending(batch: Optional[_Batch] = None, fsync: bool = True) -> None:
+    """Write every queued batch, plus ``batch``, with one append; on failure they stay queued.
+
+    ``batch`` (an optimistic write on the caller's thread) is conflict
+    checked and applied only after merging what other processes journaled,
+    with the file lock held until it is written; ConflictError means it
+    was never applied. Without ``fsync`` the journal is left dirty for the
+    writer thread to sync. The fsync runs after both locks are let go.
+
+    With no ``batch`` (the writer thread, flush()), raises ConflictError if
+    merging dropped a queued batch, and OSError if the write or fsync failed.
+    """
+    global _seq, _journal_pos, _journal_stat, _journal_id, _journal_torn, _dirty, _writes
+    size = None
+    journal = None
+    with _io_lock, _file_lock():
+        with _lock:
+            data = batch.data if batch is not None else _pending[0].data if _pending else None
+            if data is not None:
+                _catch_up(data, notify=batch is not None)
+            if batch is not None:
+                if batch.base is not None and batch.base < _seq:
+                    conflicts = _conflicts(batch.base, batch.changes, batch.reads)
+                    if conflicts:
+                        count("storage.conflicts")
+                        raise ConflictError(conflicts)
+                _do(batch)
+                _pending.append(batch)
+                rejected = []  # other batches' conflicts are not this caller's; the next flush raises them
+            else:
+                rejected, _rejected[:] = _rejected[:], []
+            batches = list(_pending)
+            seq = _seq
+            lines = []
+            for queued in batches:
+                seq += 1
+                lines.append(f'{{"seq":{seq},"changes":{queued.body}}}\n')
+            torn, written = _journal_torn, _writes
+        if lines:
+            # the file lock keeps other processes out; _lock is free for the UI meanwhile
+            payload = ("\n" if torn else "") + "".join(lines)  # never glue onto a crashed writer's partial line
+            try:
+                journal = open(_journal_file(), "ab")
+                start = os.fstat(journal.fileno()).st_size
+                header = None
+                if start == 0:
+                    header = secrets.token_hex(8)
+                    payload = json.dumps({"journal": header}) + "\n" + payload
+                try:
+                    journal.write(payload.encode("utf-8"))
+                    journal.flush()
+                except Exception:
+                    journal.truncate(start)  # the batches stay queued; the next flush writes them again
+                    raise
+                size = journal.tell()
+                stat = _stat_key(os.fstat(journal.fileno()))
+            except BaseException:
+                if journal is not None:
+                    journal.close()
+                _drop_failed(batch)  # before another flush could write it after all
+                raise
+            with _lock:
+                del _pending[:len(batches)]  # only flushes remove from the front, and _io_lock is ours
+                for n, queued in enumerate(batches, start=_seq + 1):
+                    for op, path, _ in queued.changes:
+                        _remember(n, op, path, ours=True)
+                if header is not None:
+                    _journal_id = header
+                _seq, _journal_pos, _journal_stat, _journal_torn = seq, size, stat, False
+                _dirty = True
+                _writes += 1
+                written = _writes
+            observe("storage.journal_bytes", len(payload))
+    # no lock needed: an fsync also covers whatever others appended before it
+    if journal is not None:
+        with journal:
+            synced = fsync and _fsync(journal.fileno(), written)
+        if fsync and not synced and batch is None:
+            raise OSError("journal written but not synced to disk; will retry")
+    elif fsync and _dirty:
+        _fsync_journal(written)
+    if rejected:
+        raise rejected[0]
+    if size is not None and size >= COMPACT_THRESHOLD:
+        compact_async(data)
+
+
+def _drop_failed(batch: Optional[_Batch]) -> None:
+    """Take the caller's batch out again after its write failed; the others stay queued."""
+    if batch is not None:
+        with _lock:
+            if batch in _pending:
+                _drop(batch)
+
+
+def _fsync(fd: int, written: int) -> bool:
+    """fsync the journal; clears _dirty if nothing was appended after write number ``written``."""
+    global _dirty
+    try:
+        os.fsync(fd)
+    except OSError:
+        return False
+    with _lock:
+        if _writes == written:
+            _dirty = False
+    return True
+
+
+def _fsync_journal(written: int) -> None:
+    global _dirty
+    try:
+        # no O_CREAT: a rotated journal is covered by the compaction's own fsync
+        fd = os.open(_journal_file(), os.O_WRONLY | os.O_APPEND)
+    except FileNotFoundError:
+        with _lock:
+            if _writes == written:
+                _dirty = False
+        return
+    try:
+        if not _fsync(fd, written):
+            raise OSError("journal fsync failed; will retry")
+    finally:
+        os.close(fd)
+
+
+def start_writer(window: float = 0.1) -> PersistenceWorker:
+    """Move journal writes to a background thread that coalesces bursts within `window` seconds."""
+    global _writer
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = PersistenceWorker(_flush_pending, window)
+            _writer.start()
+        return _writer
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Block until written changes are on disk; False if the flush failed."""
+    writer = _writer
+    if writer is not None and writer.is_alive():
+        return writer.flush(timeout)
+    try:
+        _flush_pending()
+    except Exception:
+        return False
+    return True
+
+
+def stop_writer() -> None:
+    """Flush and stop the background writer; later writes are synchronous again."""
+    global _writer
+    with _lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+    flush()
+
+
+def _compact(data: Dict[str, Any], blocking: bool = True) -> None:
+    global _compacting, _journal_stat, _journal_id, _journal_pos, _journal_torn
+    journal, rotated = _journal_file(), _rotated_journal_file()
+    compact_lock = _file_lock(".compact.lock")
+    if not compact_lock.acquire(blocking):
+        with _lock:
+            _compacting = False
+        return  # another process is compacting
+    try:
+        # file lock before _lock, as everywhere; the file lock is let go
+        # after the rotation so other processes can journal while we encode
+        lock = _file_lock()
+        lock.acquire()
+        with _lock:
+            try:
+                _catch_up(data, notify=False)
+                if not _versions_complete:
+                    _merge_versions(_disk_versions()[1])
+                # Everything journaled so far goes into the snapshot; park it in
+                # the rotated file so new changes start a fresh journal meanwhile.
+                if os.path.exists(journal):
+                    if os.path.exists(rotated):
+                        with open(journal, "r", encoding="utf-8") as src, \
+                                open(rotated, "a", encoding="utf-8") as dst:
+                            dst.write(src.read())
+                        os.remove(journal)
+                    else:
+                        os.replace(journal, rotated)
+                _journal_stat, _journal_id, _journal_pos, _journal_torn = None, None, 0, False
+            finally:
+                lock.release()
+            # queued batches are not in the journal, so they stay out of the snapshot
+            seq = _seq
+            queued = [b for b in _pending if b.data is data]
+            for batch in reversed(queued):
+                _undo(batch)
+            try:
+                if SNAPSHOT_FORMAT == "binary":
+                    target, other = _snapshot_file(), DATA_FILE
+                    payload: Union[str, bytes] = snapshot.encode(data, seq, _versions)
+                else:
+                    target, other = DATA_FILE, _snapshot_file()
+                    doc: Dict[str, Any] = {"_meta": {"seq": seq, "versions": _versions}}
+                    doc.update(snapshot.materialize(data))
+                    payload = json.dumps(doc, separators=(",", ":"))
+            finally:
+                for batch in queued:
+                    _do(batch)
+        tmp = _write_temp(target, payload)
+        with _file_lock():
+            current = _disk_snapshot()
+            if current is not None and _snapshot_seq(current) > seq:
+                os.remove(tmp)  # a newer snapshot landed meanwhile; ours is stale
+                return
+            _commit_temp(tmp, target)
+            if os.path.exists(rotated):
+                os.remove(rotated)
+            # the other format's snapshot is now stale and must not shadow this one
+            if os.path.exists(other):
+                os.remove(other)
+        observe("storage.snapshot_bytes", len(payload))
+        observe("storage.data_file_bytes", os.path.getsize(target))
+        count("storage.compactions")
+    finally:
+        compact_lock.release()
+        with _lock:
+            _compacting = False
+
+
+@timed("storage.save_data")
+def save_data(data: Dict[str, Any]) -> None:
+    """Write queued changes and a full snapshot, then reset the journal; raises if either fails."""
+    global _compacting
+    _flush_pending()
+    with _lock:
+        _compacting = True
+    _compact(data)
+
+
+def compact_async(data: Dict[str, Any]) -> None:
+    """Fold the journal into a new snapshot on a background thread."""
+    global _compacting
+    with _lock:
+        if _compacting:
+            return
+        _compacting = True
+
+    def run():
+        try:
+            _compact(data, blocking=False)
+        except Exception as e:
+            _report(e)  # the journal is intact; the next large write tries again
+
+    threading.Thread(target=run, name="storage-compact", daemon=True).start()
+
+
+# ---------- queries ----------
+# The JSON backend answers these by scanning the in-memory dicts.
+
+def classes_for_faculty(data: Dict[str, Any], faculty: str) -> List[str]:
+    """Class IDs owned by ``faculty``, in creation order."""
+    return [cid for cid, c in data.get("classes", {}).items() if c.get("faculty") == faculty]
+
+
+def find_class_by_name(data: Dict[str, Any], name: str) -> Optional[str]:
+    """Class ID with this name (case-insensitive), or None."""
+    name = name.lower()
+    for cid, c in data.get("classes", {}).items():
+        if c.get("name", "").lower() == name:
+            return cid
+    return None
+
+
+def find_student_by_roll(data: Dict[str, Any], class_id: str, roll_no: str) -> Optional[str]:
+    """Student ID with this roll number in the class, or None."""
+    students = data.get("students", {})
+    for sid in data.get("classes", {}).get(class_id, {}).get("students", []):
+        if students.get(sid, {}).get("roll_no") == roll_no:
+            return sid
+    return None
@@ -0,0 +1,131 @@
+# loadtest.py
+# Drive a running api.py instance with many concurrent clients and report
+# throughput and latency.
+#
+#   python api.py --port 8765 &
+#   python loadtest.py --port 8765 --clients 50 --duration 10
+#
+# Seeds its own faculty/class/students, then each client loops over a mix of
+# rank-list reads, student reads and marks updates on a keep-alive connection.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 JSON client."""
+
+    def __init__(self, host: str, port: int, token: Optional[str] = None):
+        self.host, self.port, self.token = host, port, token
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Any = None) -> Tuple[int, Any]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def seed(host: str, port: int, students: int, subjects: int) -> Dict[str, Any]:
+    c = Client(host, port)
+    uname = f"load_{random.randrange(1 << 30)}"
+    await c.request("POST", "/faculties", {"username": uname, "name": "Load Test", "password": "pw"})
+    _, login = await c.request("POST", "/login", {"role": "faculty", "username": uname, "password": "pw"})
+    c.token = login["token"]
+    cname = f"{random.randrange(1, 10 ** 6)}{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}"
+    _, cls = await c.request("POST", "/classes", {"name": cname})
+    cid = cls["class_id"]
+    subs = [f"Subject{i}" for i in range(subjects)]
+    for sub in subs:
+        await c.request("POST", f"/classes/{cid}/subjects", {"subject": sub})
+    sids = []
+    for roll in range(1, students + 1):
+        _, stu = await c.request("POST", f"/classes/{cid}/students", {"roll_no": str(roll), "name": f"Student {roll}"})
+        sids.append(stu["student_id"])
+    await c.close()
+    return {"token": c.token, "class_id": cid, "subjects": subs, "students": sids}
+
+
+async def worker(host: str, port: int, ctx: Dict[str, Any], deadline: float, write_ratio: float,
+                 latencies: List[float], errors: List[int]) -> None:
+    c = Client(host, port, ctx["token"])
+    try:
+        while time.perf_counter() < deadline:
+            r = random.random()
+            if r < write_ratio:
+                sid = random.choice(ctx["students"])
+                marks = {sub: random.randint(0, 100) for sub in ctx["subjects"]}
+                method, path, body = "PUT", f"/students/{sid}/marks", {"marks": marks}
+            elif r < (1 + write_ratio) / 2:
+                method, path, body = "GET", f"/classes/{ctx['class_id']}/ranks", None
+            else:
+                method, path, body = "GET", f"/students/{random.choice(ctx['students'])}", None
+            start = time.perf_counter()
+            status, _ = await c.request(method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        await c.close()
+
+
+def percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(round(q / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+async def main(args) -> Dict[str, Any]:
+    ctx = await seed(args.host, args.port, args.students, args.subjects)
+    latencies: List[float] = []
+    errors: List[int] = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(worker(args.host, args.port, ctx, deadline, args.write_ratio, latencies, errors)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "clients": args.clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a running api.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--subjects", type=int, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="fraction of marks updates")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,94 @@
+# persistence.py
+# Background persistence thread with write coalescing.
+#
+# Storage backends queue changes in memory and call notify(); the worker
+# waits `window` seconds for the burst to settle, then calls the backend's
+# flush function once for everything queued. Failures are put on `errors`
+# for the UI (or API) to report from its own thread; the backend keeps the
+# unwritten batch, so the next flush retries it.
+
+import queue
+import threading
+from typing import Callable, Optional
+
+
+class PersistenceWorker(threading.Thread):
+    MAX_DELAY = 10  # windows
+
+    def __init__(self, flush: Callable[[], None], window: float = 0.1):
+        super().__init__(name="storage-writer", daemon=True)
+        self._flush = flush
+        self.window = window
+        self.errors: "queue.Queue[Exception]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._urgent = False
+        self._stopping = False
+        self._generation = 0   # bumped on every notify()
+        self._flushed = 0      # last generation fully written
+        self._begun = 0        # flush attempts started
+        self._ended = 0        # flush attempts finished
+
+    def notify(self) -> None:
+        """Mark the store dirty; the write happens after the coalescing window."""
+        with self._cond:
+            self._dirty = True
+            self._generation += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write now and wait for it; False if it failed or timed out."""
+        with self._cond:
+            target = self._generation
+            started = self._begun
+            self._urgent = True
+            self._cond.notify_all()
+            # wait for an attempt begun after this call: an earlier one that
+            # failed says nothing about whether the retry works
+            self._cond.wait_for(lambda: self._ended > started or not self.is_alive(), timeout)
+            return self._flushed >= target
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush pending changes and end the thread."""
+        with self._cond:
+            self._stopping = True
+            self._urgent = True
+            self._cond.notify_all()
+        self.join(timeout)
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty or self._urgent or self._stopping)
+                # coalesce: keep absorbing notifications until the window passes
+                # quietly, but never hold a burst back longer than MAX_DELAY windows
+                rounds = 0
+                while not (self._urgent or self._stopping) and rounds < self.MAX_DELAY:
+                    seen = self._generation
+                    self._cond.wait_for(lambda: self._urgent or self._stopping, self.window)
+                    if self._generation == seen:
+                        break
+                    rounds += 1
+                target = self._generation
+                self._begun += 1
+                self._dirty = False
+                self._urgent = False
+                stopping = self._stopping
+            try:
+                self._flush()
+                ok = True
+            except Exception as e:
+                self.errors.put(e)
+                ok = False
+            with self._cond:
+                self._ended += 1
+                if ok:
+                    self._flushed = max(self._flushed, target)
+                elif not stopping:
+                    self._dirty = True  # retry after the next window
+                self._cond.notify_all()
+                if stopping:
+                    return
+            if not ok:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._urgent or self._stopping, max(self.window, 1.0))
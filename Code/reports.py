@@ -0,0 +1,233 @@
+# reports.py
+# Term-end report cards and class rank sheets for many classes at once.
+#
+#   python reports.py --out reports/                  every class, text
+#   python reports.py --out reports/ --format html --faculty faculty1 --workers 8
+#
+# Classes are fanned out over a ProcessPoolExecutor. Each task gets just its
+# class and that class's student records, runs compute_totals_and_ranks and
+# writes one card per student plus a class summary straight to disk, so the
+# parent never holds rendered output. Only a few tasks per worker are in
+# flight at a time, which keeps memory flat for a 500-class run.
+#
+# Output layout:
+#   <out>/index.txt|html
+#   <out>/<class name>_<class id>/summary.txt|html
+#   <out>/<class name>_<class id>/<student id>.txt|html
+
+import argparse
+import copy
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional, Tuple
+
+from utils import compute_totals_and_ranks
+
+FORMATS = ("text", "html")
+IN_FLIGHT_PER_WORKER = 4  # queued tasks per worker; enough to hide pickling, small enough to stream
+
+# (class id, class record, {student id: record}, output dir, format)
+Job = Tuple[str, Dict[str, Any], Dict[str, Dict[str, Any]], str, str]
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text).strip("_") or "class"
+
+
+def _subject_stats(cls: Dict[str, Any], students: Dict[str, Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+    """(subject, entered, mean, min, max) over the marks actually entered."""
+    rows = []
+    for sub in cls.get("subjects", []):
+        marks = (stu.get("marks", {}).get(sub) for stu in students.values())
+        vals = [m for m in marks if isinstance(m, int)]
+        mean = sum(vals) / len(vals) if vals else None
+        rows.append((sub, len(vals), mean, min(vals, default=None), max(vals, default=None)))
+    return rows
+
+
+def _card_text(cls: Dict[str, Any], sid: str, stu: Dict[str, Any], total: int, rank: int, size: int) -> str:
+    width = max([len(s) for s in cls.get("subjects", [])] + [7])
+    lines = [
+        "REPORT CARD",
+        f"Student: {stu.get('name', '')} ({sid})",
+        f"Class:   {cls.get('name', '')}    Roll: {stu.get('roll_no', '')}",
+        "",
+        f"{'Subject':<{width}}  Mark",
+        "-" * (width + 6),
+    ]
+    marks = stu.get("marks", {})
+    lines += [f"{sub:<{width}}  {marks.get(sub, '-'):>4}" for sub in cls.get("subjects", [])]
+    lines += ["-" * (width + 6), f"Total: {total}    Rank: {rank} of {size}", ""]
+    return "\n".join(lines)
+
+
+def _card_html(cls: Dict[str, Any], sid: str, stu: Dict[str, Any], total: int, rank: int, size: int) -> str:
+    e = html.escape
+    marks = stu.get("marks", {})
+    rows = "".join(f"<tr><td>{e(sub)}</td><td>{e(str(marks.get(sub, '-')))}</td></tr>"
+                   for sub in cls.get("subjects", []))
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{e(stu.get('name', ''))}</title></head><body>"
+            f"<h1>Report card</h1><p>{e(stu.get('name', ''))} ({e(sid)})<br>"
+            f"Class {e(cls.get('name', ''))}, roll {e(str(stu.get('roll_no', '')))}</p>"
+            f"<table border='1' cellpadding='4'><tr><th>Subject</th><th>Mark</th></tr>{rows}</table>"
+            f"<p><b>Total:</b> {total} &nbsp; <b>Rank:</b> {rank} of {size}</p></body></html>\n")
+
+
+def _write_summary(f, fmt: str, cid: str, cls: Dict[str, Any], students: Dict[str, Dict[str, Any]],
+                   ranked: List[Tuple[str, Dict[str, int]]]) -> None:
+    subjects = cls.get("subjects", [])
+    stats = _subject_stats(cls, students)
+    fmt_mean = lambda m: "-" if m is None else f"{m:.1f}"  # noqa: E731
+    if fmt == "html":
+        e = html.escape
+        f.write(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{e(cls.get('name', ''))}</title>"
+                f"</head><body><h1>Class {e(cls.get('name', ''))} ({e(cid)})</h1>"
+                "<h2>Subjects</h2><table border='1' cellpadding='4'>"
+                "<tr><th>Subject</th><th>Entered</th><th>Mean</th><th>Min</th><th>Max</th></tr>")
+        for sub, n, mean, lo, hi in stats:
+            f.write(f"<tr><td>{e(sub)}</td><td>{n}</td><td>{fmt_mean(mean)}</td>"
+                    f"<td>{'-' if lo is None else lo}</td><td>{'-' if hi is None else hi}</td></tr>")
+        f.write("</table><h2>Rank list</h2><table border='1' cellpadding='4'><tr><th>Rank</th><th>Student</th>"
+                "<th>Name</th><th>Roll</th>" + "".join(f"<th>{e(s)}</th>" for s in subjects) + "<th>Total</th></tr>")
+        for sid, r in ranked:
+            stu = students[sid]
+            marks = stu.get("marks", {})
+            f.write(f"<tr><td>{r['rank']}</td><td><a href='{e(sid)}.html'>{e(sid)}</a></td>"
+                    f"<td>{e(stu.get('name', ''))}</td><td>{e(str(stu.get('roll_no', '')))}</td>"
+                    + "".join(f"<td>{e(str(marks.get(s, '-')))}</td>" for s in subjects)
+                    + f"<td>{r['total']}</td></tr>")
+        f.write("</table></body></html>\n")
+        return
+    f.write(f"CLASS {cls.get('name', '')} ({cid})    students: {len(ranked)}\n\n")
+    f.write(f"{'Subject':<16} {'Entered':>7} {'Mean':>7} {'Min':>5} {'Max':>5}\n")
+    for sub, n, mean, lo, hi in stats:
+        f.write(f"{sub:<16} {n:>7} {fmt_mean(mean):>7} {'-' if lo is None else lo:>5} {'-' if hi is None else hi:>5}\n")
+    f.write(f"\n{'Rank':>4}  {'Student':<16} {'Roll':>6}  {'Total':>6}  Name\n")
+    for sid, r in ranked:
+        stu = students[sid]
+        f.write(f"{r['rank']:>4}  {sid:<16} {stu.get('roll_no', ''):>6}  {r['total']:>6}  {stu.get('name', '')}\n")
+
+
+def render_class(job: Job) -> Tuple[str, str, int, str]:
+    """Write one class's cards and summary; returns (class id, name, students, class dir). Runs in a worker."""
+    cid, cls, students, out_dir, fmt = job
+    ranks = compute_totals_and_ranks({"classes": {cid: cls}, "students": students}, cid)
+    ranked = sorted(ranks.items(), key=lambda kv: (kv[1]["rank"], kv[0]))
+    ext = "html" if fmt == "html" else "txt"
+    card = _card_html if fmt == "html" else _card_text
+    folder = f"{_safe_name(cls.get('name', ''))}_{_safe_name(cid)}"
+    class_dir = os.path.join(out_dir, folder)
+    os.makedirs(class_dir, exist_ok=True)
+    for sid, r in ranked:
+        with open(os.path.join(class_dir, f"{_safe_name(sid)}.{ext}"), "w", encoding="utf-8") as f:
+            f.write(card(cls, sid, students[sid], r["total"], r["rank"], len(ranked)))
+    with open(os.path.join(class_dir, f"summary.{ext}"), "w", encoding="utf-8") as f:
+        _write_summary(f, fmt, cid, cls, students, ranked)
+    return cid, cls.get("name", ""), len(ranked), folder
+
+
+def _job(data: Dict[str, Any], cid: str, out_dir: str, fmt: str) -> Job:
+    """Deep-copy just what one class's reports need, so tasks pickle small and
+    never see records the app edits after the lock is released."""
+    cls = data["classes"][cid]
+    every = data.get("students", {})
+    students = {sid: copy.deepcopy(every[sid]) for sid in cls.get("students", []) if sid in every}
+    return cid, copy.deepcopy(cls), students, out_dir, fmt
+
+
+def _write_index(out_dir: str, fmt: str, done: List[Tuple[str, str, int, str]]) -> None:
+    done = sorted(done, key=lambda d: (d[1], d[0]))
+    if fmt == "html":
+        e = html.escape
+        rows = "".join(f"<li><a href='{e(folder)}/summary.html'>{e(name)}</a> ({e(cid)}, {n} students)</li>"
+                       for cid, name, n, folder in done)
+        body = f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Reports</title></head><body><ul>{rows}</ul></body></html>\n"
+        path = os.path.join(out_dir, "index.html")
+    else:
+        body = "".join(f"{name:<10} {cid:<28} {n:>5}  {folder}/summary.txt\n" for cid, name, n, folder in done)
+        path = os.path.join(out_dir, "index.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(body)
+
+
+def generate_reports(data: Dict[str, Any], out_dir: str, class_ids: Optional[Iterable[str]] = None,
+                     fmt: str = "text", workers: Optional[int] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     lock: Optional[ContextManager[Any]] = None) -> Dict[str, Any]:
+    """Render report cards and summaries for ``class_ids`` (default: every class).
+
+    ``progress(done, total)`` is called from this thread after each class.
+    ``lock``, if given, is held while each class is copied out of ``data``
+    (pass SchoolService.lock when the app keeps editing meanwhile).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r}")
+    cids = list(data.get("classes", {}) if class_ids is None else class_ids)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    done: List[Tuple[str, str, int, str]] = []
+    pending = set()
+    todo = iter(cids)
+    # spawn: forking a process that runs Tk or storage threads is not safe
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        while True:
+            while len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                cid = next(todo, None)
+                if cid is None:
+                    break
+                if lock is None:
+                    job = _job(data, cid, out_dir, fmt)
+                else:
+                    with lock:
+                        job = _job(data, cid, out_dir, fmt)
+                pending.add(pool.submit(render_class, job))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done.append(future.result())
+                if progress:
+                    progress(len(done), len(cids))
+    _write_index(out_dir, fmt, done)
+    return {
+        "classes": len(done),
+        "students": sum(d[2] for d in done),
+        "workers": workers,
+        "seconds": round(time.perf_counter() - start, 2),
+        "out": out_dir,
+    }
+
+
+def _print_progress(done: int, total: int, start: float) -> None:
+    if done != total and done % max(total // 100, 1):
+        return  # about once per percent
+    elapsed = time.perf_counter() - start
+    eta = elapsed / done * (total - done) if done else 0.0
+    sys.stderr.write(f"\r{done}/{total} classes ({100 * done // max(total, 1)}%), {elapsed:.1f}s, ETA {eta:.1f}s ")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch report cards and rank sheets")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="text")
+    parser.add_argument("--faculty", help="only this faculty's classes")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = parser.parse_args()
+
+    from storage import load_data, classes_for_faculty
+    data = load_data()
+    cids = classes_for_faculty(data, args.faculty) if args.faculty else None
+    t0 = time.perf_counter()
+    summary = generate_reports(data, args.out, cids, args.format, args.workers,
+                               progress=lambda d, t: _print_progress(d, t, t0))
+    print(f"Wrote reports for {summary['students']} students in {summary['classes']} classes "
+          f"to {summary['out']} in {summary['seconds']}s using {summary['workers']} workers")
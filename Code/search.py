@@ -0,0 +1,193 @@
+# search.py
+# Type-ahead student search across the whole school.
+#
+# A query is matched against three keys per student:
+#   student ID   exact, or prefix ("stu_12")            case-insensitive
+#   roll number  exact (a digits-only query)
+#   name         every query word must match a name word, exactly, by
+#                prefix ("ana sha", 2+ letters) or, for words of 3+
+#                letters, by trigram similarity, which tolerates typos
+#                ("sharmaa", "shrama")
+#
+# Name words are indexed through a vocabulary of distinct words, and the
+# trigram and prefix lookups run over that vocabulary rather than over
+# students: a school of 100k students has only a few thousand distinct
+# name words, so a query costs well under 10 ms. Students sharing a name
+# word share one posting set.
+#
+# StudentSearch is owned by IndexManager, built on first query and updated
+# per student like the other indexes.
+
+import heapq
+from bisect import bisect_left, insort
+from operator import neg
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+
+MIN_SIMILARITY = 0.4  # Dice coefficient over trigrams for a fuzzy word match
+MIN_PREFIX = 2  # a single letter would pull in a large share of the school
+
+# score bands: a better kind of match always outranks a worse one
+EXACT_ID, EXACT_ROLL, ID_PREFIX, NAME = 100.0, 90.0, 80.0, 40.0
+
+Entry = Tuple[str, str, str]  # (lowercased name, roll no, class id)
+
+
+def _words(text: str) -> List[str]:
+    return text.lower().split()
+
+
+def _prefixed(keys: List[str], prefix: str):
+    """Keys of the sorted list ``keys`` that start with ``prefix``."""
+    i = bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix):
+        yield keys[i]
+        i += 1
+
+
+def _trigrams(word: str) -> Set[str]:
+    """Trigrams of the padded word, minus the leading "  x" (see _similar)."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(1, len(padded) - 2)}
+
+
+class StudentSearch:
+    """Name / roll number / student ID lookup over ``data["students"]``."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.entries: Dict[str, Entry] = {}
+        self._names: Dict[str, Set[str]] = {}   # name word -> student ids
+        self._grams: Dict[str, Set[str]] = {}   # trigram -> name words
+        self._sizes: Dict[str, int] = {}        # name word -> number of trigrams
+        self._rolls: Dict[str, Set[str]] = {}   # roll no -> student ids (one per class)
+        self._ids: Dict[str, str] = {}          # lowercased id -> id
+        for sid, stu in self.data.get("students", {}).items():
+            self._add(sid, stu)
+        self._vocab = sorted(self._names)        # for prefix ranges
+        self._id_keys = sorted(self._ids)
+
+    # ---------- maintenance ----------
+    def update(self, sid: str) -> None:
+        """Re-index one student after registration, an edit or removal."""
+        stu = self.data.get("students", {}).get(sid)
+        old = self.entries.get(sid)
+        if stu is not None and old == self._entry(stu):
+            return  # marks or password changed: nothing searchable moved
+        if old is not None:
+            self._remove(sid, old)
+        if stu is not None:
+            self._add(sid, stu, sorted_keys=True)
+
+    @staticmethod
+    def _entry(stu: Dict[str, Any]) -> Entry:
+        return str(stu.get("name", "")).lower(), str(stu.get("roll_no", "")), stu.get("class_id", "")
+
+    def _add(self, sid: str, stu: Dict[str, Any], sorted_keys: bool = False) -> None:
+        entry = self.entries[sid] = self._entry(stu)
+        for word in set(entry[0].split()):
+            owners = self._names.get(word)
+            if owners is None:
+                owners = self._names[word] = set()
+                grams = _trigrams(word)
+                self._sizes[word] = len(grams)
+                for gram in grams:
+                    self._grams.setdefault(gram, set()).add(word)
+                if sorted_keys:
+                    insort(self._vocab, word)
+            owners.add(sid)
+        self._rolls.setdefault(entry[1], set()).add(sid)
+        self._ids[sid.lower()] = sid
+        if sorted_keys:
+            insort(self._id_keys, sid.lower())
+
+    def _remove(self, sid: str, entry: Entry) -> None:
+        del self.entries[sid]
+        for word in set(entry[0].split()):
+            owners = self._names[word]
+            owners.discard(sid)
+            if not owners:
+                del self._names[word]
+                del self._sizes[word]
+                for gram in _trigrams(word):
+                    self._grams[gram].discard(word)
+                del self._vocab[bisect_left(self._vocab, word)]
+        rolls = self._rolls[entry[1]]
+        rolls.discard(sid)
+        if not rolls:
+            del self._rolls[entry[1]]
+        del self._ids[sid.lower()]
+        del self._id_keys[bisect_left(self._id_keys, sid.lower())]
+
+    def query_keys(self) -> Tuple[Any, ...]:
+        """Everything queries read, minus emptied sets; compared by IndexManager.check()."""
+        grams = {g: words for g, words in self._grams.items() if words}
+        return self._names, grams, self._rolls, self._ids, self._vocab, self._id_keys
+
+    # ---------- queries ----------
+    def query(self, text: str, limit: int = 20,
+              class_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Best ``limit`` (student id, score) pairs, best first; ``class_ids`` narrows the search."""
+        q = text.strip().lower()
+        if not q or limit <= 0:
+            return []
+        scores = self._name_matches(_words(q))
+        exact = [(sid, EXACT_ROLL) for sid in self._rolls.get(q, ())]
+        if len(q) >= 3:
+            exact += [(self._ids[key], ID_PREFIX) for key in _prefixed(self._id_keys, q)]
+        if q in self._ids:
+            exact.append((self._ids[q], EXACT_ID))
+        for sid, score in exact:
+            if score > scores.get(sid, 0.0):
+                scores[sid] = score
+        if class_ids is not None:
+            entries = self.entries
+            scores = {sid: score for sid, score in scores.items() if entries[sid][2] in class_ids}
+        # ties go by (name, roll, class): plain tuples keep the comparisons in C
+        ranked = zip(map(neg, scores.values()), map(self.entries.__getitem__, scores), scores)
+        return [(sid, round(-score, 2)) for score, _, sid in heapq.nsmallest(limit, ranked)]
+
+    def _name_matches(self, words: List[str]) -> Dict[str, float]:
+        """Students matching every word; score NAME plus up to 30 for match quality."""
+        total: Optional[Dict[str, float]] = None
+        for word in words:
+            best: Dict[str, float] = {}
+            # worst match first, so a student's best matching word is written last
+            for token, quality in sorted(self._similar(word).items(), key=lambda kv: kv[1]):
+                owners = self._names[token] if total is None else total.keys() & self._names[token]
+                best.update(dict.fromkeys(owners, quality))
+            if not best:
+                return {}
+            total = best if total is None else {sid: total[sid] + quality for sid, quality in best.items()}
+        if not total:
+            return {}
+        scale = 30.0 / len(words)
+        return {sid: NAME + scale * quality for sid, quality in total.items()}
+
+    def _similar(self, word: str) -> Dict[str, float]:
+        """Vocabulary words matching ``word``: 1.0 exact, 0.9 prefix, else trigram similarity."""
+        found: Dict[str, float] = {}
+        if word in self._names:
+            found[word] = 1.0
+        if len(word) >= MIN_PREFIX:
+            for token in _prefixed(self._vocab, word):
+                found.setdefault(token, 0.9)
+        if len(word) < 3:
+            return found
+        grams = _trigrams(word)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for token in self._grams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        for token, common in shared.items():
+            if token in found:
+                continue
+            # the "  x" trigram is counted here rather than indexed: its
+            # posting list would hold every word with that first letter
+            common += token[0] == word[0]
+            similarity = 2.0 * common / (len(grams) + self._sizes[token] + 2)
+            if similarity >= MIN_SIMILARITY:
+                found[token] = 0.8 * similarity  # a typo never beats a real prefix
+        return found
@@ -0,0 +1,569 @@
+# service.py
+# UI-free business logic shared by the Tk app (app.py) and the HTTP API (api.py).
+#
+# SchoolService owns the in-memory dataset plus its derived indexes and is
+# the only place that mutates it. Validation failures raise ServiceError,
+# which front ends turn into a dialog or an HTTP error.
+#
+# Other processes may write to the same store. Mutating methods run
+# optimistically: they validate against freshly synced data and write with
+# that sync point as the base; if another process changed something they
+# depended on in between, storage raises ConflictError after merging it and
+# the method simply runs again.
+
+import functools
+import random
+import re
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from storage import (
+    ConflictError,
+    load_data,
+    apply_change,
+    apply_changes,
+    sync,
+    on_merge,
+)
+from utils import compute_totals_and_ranks, generate_student_id, generate_temp_password, RankIndex
+import assessments
+from auth import CredentialVerifier, hash_password, hash_temp_password
+from indexes import IndexManager
+from instrument import count, timed
+
+CLASS_NAME_REGEX = re.compile(r'^\d+[A-Za-z]$')  # starts with digits, ends with 1 letter
+MAX_RETRIES = 5  # optimistic attempts before giving up on a contended write
+MAX_MARK = 2 ** 31 - 1  # fits the int32 analytics matrix and the array('i') columns
+
+
+class ServiceError(Exception):
+    """A request the service refuses; `title` is a short dialog heading."""
+
+    def __init__(self, title: str, message: str):
+        super().__init__(message)
+        self.title = title
+
+
+def _batch_error(errors: List[str], limit: int = 20) -> ServiceError:
+    more = f"\n... and {len(errors) - limit} more" if len(errors) > limit else ""
+    return ServiceError("Invalid", "\n".join(errors[:limit]) + more)
+
+
+def _optimistic(method):
+    """Run a mutating method on freshly synced data; rerun it if the write conflicts."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            for _ in range(MAX_RETRIES):
+                self._base = sync(self.data)
+                try:
+                    return method(self, *args, **kwargs)
+                except ConflictError:
+                    count("service.write_retries")
+                    continue  # the other change is merged now; validate again
+                finally:
+                    self._base = None
+            raise ServiceError("Busy", "Someone else is changing the same records. Please try again.")
+    return wrapper
+
+
+class SchoolService:
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self.data = load_data() if data is None else data
+        self.ranks = RankIndex(self.data)
+        self.matrices = None  # analytics.MatrixIndex, built on first summary
+        self.indexes = IndexManager(self.data)
+        self.lock = threading.RLock()
+        self.verifier = CredentialVerifier()
+        self._base: Optional[int] = None  # sync point of the running optimistic write
+        on_merge(self._on_merge)
+
+    def refresh(self) -> None:
+        """Merge in whatever other processes have saved since the last look."""
+        with self.lock:
+            sync(self.data)
+
+    def _on_merge(self, data: Dict[str, Any], paths: List[List[str]]) -> None:
+        """Keep the cached rank/analytics views in step with merged outside changes."""
+        if data is not self.data:
+            return
+        self.indexes.update(paths)
+        for path in paths:
+            if len(path) < 2:
+                continue
+            if path[0] == "students":
+                stu = self.data["students"].get(path[1])
+                if stu:
+                    self._sync_student(stu["class_id"], path[1])
+            elif path[0] == "classes":
+                self._invalidate_class(path[1])
+
+    # ---------- validation ----------
+    def check_faculty_username(self, uname: str) -> str:
+        uname = uname.strip()
+        if not uname:
+            raise ServiceError("Invalid", "Username cannot be empty.")
+        if uname in self.data.get("faculties", {}):
+            raise ServiceError("Exists", "Username already taken.")
+        return uname
+
+    def check_class_name(self, cname: str) -> str:
+        cname = cname.strip()
+        if not cname:
+            raise ServiceError("Invalid", "Class name cannot be empty.")
+        if not CLASS_NAME_REGEX.match(cname):
+            raise ServiceError("Invalid", "Class must start with digits and end with one letter (e.g. 10A).")
+        if self.indexes.class_by_name(cname):
+            raise ServiceError("Duplicate", f"Class '{cname}' already exists.")
+        return cname
+
+    def check_roll_no(self, cid: str, roll: str) -> str:
+        roll = roll.strip()
+        if not roll.isdigit():
+            raise ServiceError("Invalid", "Roll number must be numeric.")
+        if self.indexes.student_by_roll(cid, roll):
+            raise ServiceError("Duplicate", f"Roll number '{roll}' already exists in this class.")
+        return roll
+
+    def check_class_owner(self, faculty: str, cid: str) -> Dict[str, Any]:
+        cls = self.data["classes"].get(cid)
+        if not cls or cls.get("faculty") != faculty:
+            raise ServiceError("Not Found", "No such class for this faculty.")
+        return cls
+
+    def check_assessment(self, cid: str, aid: Optional[str]) -> bool:
+        """Validate an assessment of the class; True if marks for it are also the current marks."""
+        if aid is None:
+            return True
+        aids = self.indexes.assessments_for(cid)
+        if aid not in aids:
+            raise ServiceError("Not Found", "No such assessment for this class.")
+        return aid == aids[-1]
+
+    # ---------- accounts ----------
+    def register_faculty(self, uname: str, name: str, pwd: str) -> None:
+        """Slow (the password hash): call it off the UI thread."""
+        self.check_faculty_username(uname)
+        if not name or not name.strip():
+            raise ServiceError("Invalid", "Full name required.")
+        if not pwd:
+            raise ServiceError("Invalid", "Password required.")
+        # hashed once, before the lock and the retry loop
+        self._add_faculty(uname, name.strip(), hash_password(pwd))
+
+    @_optimistic
+    def _add_faculty(self, uname: str, name: str, hashed: str) -> None:
+        with self.lock:
+            uname = self.check_faculty_username(uname)
+            apply_change(self.data, "set", ["faculties", uname], {"name": name, "password": hashed},
+                         base=self._base)
+
+    def authenticate_async(self, role: str, uname: str, pwd: str) -> "Future[Dict[str, Any]]":
+        """Verify credentials on the auth thread pool.
+
+        The returned future resolves to the faculty/student record or fails
+        with ServiceError. Legacy plaintext (or outdated) hashes are upgraded
+        in place after a successful check.
+        """
+        result: "Future[Dict[str, Any]]" = Future()
+        if not uname or not pwd:
+            result.set_exception(ServiceError("Login Failed", "Enter username and password."))
+            return result
+        collection = "faculties" if role == "faculty" else "students"
+        self.refresh()
+        record = self.data.get(collection, {}).get(uname)
+        stored = record.get("password") if record else None
+
+        def done(check: "Future") -> None:
+            try:
+                ok, new_hash = check.result()
+                if not ok:
+                    raise ServiceError("Login Failed", f"Invalid {role} credentials.")
+                if new_hash is not None:
+                    with self.lock:
+                        apply_change(self.data, "set", [collection, uname, "password"], new_hash)
+                result.set_result(record)
+            except Exception as e:
+                result.set_exception(e)
+
+        self.verifier.submit((role, uname), stored, pwd).add_done_callback(done)
+        return result
+
+    def authenticate(self, role: str, uname: str, pwd: str) -> Dict[str, Any]:
+        """Blocking form of authenticate_async(), for scripts."""
+        return self.authenticate_async(role, uname, pwd).result()
+
+    def change_student_password(self, sid: str, new_pwd: str) -> None:
+        """Slow (the password hash): call it off the UI thread."""
+        if not new_pwd:
+            raise ServiceError("Invalid", "Password cannot be empty.")
+        hashed = hash_password(new_pwd)
+        with self.lock:
+            apply_changes(self.data, [
+                ("set", ["students", sid, "password"], hashed),
+                ("set", ["students", sid, "first_login"], False),
+            ])
+        self.verifier.forget(("student", sid))
+
+    # ---------- classes ----------
+    def faculty_classes(self, faculty: str) -> List[str]:
+        self.refresh()
+        return self.indexes.classes_for(faculty)
+
+    def class_label(self, cid: str) -> str:
+        """Text for the class in the faculty's class picker."""
+        return self.indexes.label(cid)
+
+    def class_for_label(self, label: str) -> Optional[str]:
+        return self.indexes.class_by_label(label)
+
+    @_optimistic
+    def create_class(self, faculty: str, cname: str) -> str:
+        with self.lock:
+            cname = self.check_class_name(cname)
+            cid = None
+            while cid is None or cid in self.data["classes"]:
+                cid = f"class_{int(datetime.now().timestamp())}_{random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}"
+            # the name check read every class, so any class change invalidates it
+            apply_changes(self.data, [("set", ["classes", cid],
+                                       {"name": cname, "faculty": faculty, "students": [], "subjects": []})],
+                          base=self._base, reads=[["classes"]])
+            self.indexes.update_class(cid)
+            return cid
+
+    @_optimistic
+    def add_subject(self, faculty: str, cid: str, sub: str) -> str:
+        with self.lock:
+            cls = self.check_class_owner(faculty, cid)
+            sub = (sub or "").strip()
+            if not sub:
+                raise ServiceError("Invalid", "Subject name cannot be empty.")
+            if sub in cls.get("subjects", []):
+                raise ServiceError("Exists", "Subject already exists.")
+            apply_changes(self.data, [("append", ["classes", cid, "subjects"], sub)],
+                          base=self._base, reads=[["classes", cid, "subjects"]])
+            self._invalidate_class(cid)
+            return sub
+
+    @_optimistic
+    def register_student(self, faculty: str, cid: str, roll: str, name: str) -> Tuple[str, str]:
+        """Register a student; returns (student_id, temp_password)."""
+        with self.lock:
+            self.check_class_owner(faculty, cid)
+            roll = self.check_roll_no(cid, roll)
+            if not name or not name.strip():
+                raise ServiceError("Invalid", "Student name required.")
+            sid = generate_student_id(roll)
+            while sid in self.data["students"]:
+                sid = generate_student_id(roll)
+            pwd = generate_temp_password()
+            apply_changes(self.data, [
+                ("set", ["students", sid], {"name": name, "password": hash_temp_password(pwd),
+                                            "first_login": True, "class_id": cid, "roll_no": roll,
+                                            "marks": {}}),
+                ("append", ["classes", cid, "students"], sid),
+            ], base=self._base, reads=[["classes", cid, "students"]])
+            self.indexes.update_student(sid)
+            self._sync_student(cid, sid)
+            return sid, pwd
+
+    def register_students(self, faculty: str, cid: str,
+                          rows: Iterable[Tuple[str, str]]) -> List[Tuple[str, str, str, str]]:
+        """Register many (roll_no, name) rows as one transaction.
+
+        Every row is validated before anything is written; on any error the
+        whole batch is rejected with a ServiceError listing the bad rows.
+        Returns (student_id, roll_no, name, temp_password) per row.
+        """
+        # read once: a conflict retry validates the same rows again
+        return self._register_students(faculty, cid, list(rows))
+
+    @_optimistic
+    def _register_students(self, faculty: str, cid: str,
+                           rows: List[Tuple[str, str]]) -> List[Tuple[str, str, str, str]]:
+        with self.lock:
+            self.check_class_owner(faculty, cid)
+            students = self.data["students"]
+            rolls = set()  # rolls taken by earlier rows of this batch
+            errors: List[str] = []
+            created: List[Tuple[str, str, str, str]] = []
+            new_ids = set()
+            changes = []
+            for line, (roll, name) in enumerate(rows, start=1):
+                roll, name = (roll or "").strip(), (name or "").strip()
+                if not roll.isdigit():
+                    errors.append(f"row {line}: roll number must be numeric")
+                elif roll in rolls or self.indexes.student_by_roll(cid, roll):
+                    errors.append(f"row {line}: duplicate roll number '{roll}'")
+                elif not name:
+                    errors.append(f"row {line}: student name required")
+                if errors:
+                    continue  # keep validating, but stop building the batch
+                rolls.add(roll)
+                sid = generate_student_id(roll)
+                while sid in students or sid in new_ids:
+                    sid = generate_student_id(roll)
+                new_ids.add(sid)
+                pwd = generate_temp_password()
+                changes.append(("set", ["students", sid], {"name": name, "password": hash_temp_password(pwd),
+                                                           "first_login": True, "class_id": cid,
+                                                           "roll_no": roll, "marks": {}}))
+                changes.append(("append", ["classes", cid, "students"], sid))
+                created.append((sid, roll, name, pwd))
+            if errors:
+                raise _batch_error(errors)
+            apply_changes(self.data, changes, base=self._base, reads=[["classes", cid, "students"]])
+            for sid, _, _, _ in created:
+                self.indexes.update_student(sid)
+            self._invalidate_class(cid)
+            return created
+
+    # ---------- marks ----------
+    @staticmethod
+    def parse_mark(raw: Any) -> Optional[int]:
+        """Integer mark in 0..MAX_MARK, None for blank; raises ServiceError otherwise."""
+        if isinstance(raw, str):
+            raw = raw.strip()
+            if raw == "":
+                return None
+        try:
+            val = int(raw)
+        except (TypeError, ValueError):
+            val = -1
+        if val < 0 or isinstance(raw, bool) or (isinstance(raw, float) and raw != val):
+            raise ServiceError("Invalid", "Enter non-negative integer marks only.")
+        if val > MAX_MARK:
+            raise ServiceError("Invalid", f"Marks cannot be larger than {MAX_MARK}.")
+        return val
+
+    @_optimistic
+    def set_marks(self, faculty: str, sid: str, marks: Dict[str, Any], assessment: Optional[str] = None) -> None:
+        """Validate and store marks {subject: value}; blank values are skipped.
+
+        With ``assessment`` the marks are recorded there too; they only
+        become the current marks if it is the class's latest assessment.
+        """
+        with self.lock:
+            stu = self.data["students"].get(sid)
+            if not stu:
+                raise ServiceError("Not Found", "No such student.")
+            cid = stu["class_id"]
+            cls = self.check_class_owner(faculty, cid)
+            latest = self.check_assessment(cid, assessment)
+            parsed = {}
+            for sub, raw in marks.items():
+                if sub not in cls.get("subjects", []):
+                    raise ServiceError("Invalid", f"Unknown subject '{sub}'.")
+                val = self.parse_mark(raw)
+                if val is not None:
+                    parsed[sub] = val
+            # validated against the class's subjects, so a concurrent subject change must conflict
+            changes, reads = [], [["classes", cid, "subjects"]]
+            if assessment is not None:
+                changes += assessments.column_changes(self.data["assessments"][assessment], assessment,
+                                                      [(sid, parsed)])
+                # columns are indexed by roster position: a concurrent roster
+                # append would shift what our rows mean
+                reads.append(["assessments", assessment, "students"])
+            if latest:
+                changes += [("set", ["students", sid, "marks", sub], val) for sub, val in parsed.items()]
+            apply_changes(self.data, changes, base=self._base, reads=reads)
+            self._sync_student(cid, sid)
+
+    def set_class_marks(self, faculty: str, cid: str, updates: Iterable[Tuple[str, Dict[str, Any]]],
+                        assessment: Optional[str] = None) -> int:
+        """Store marks for many (student_id, {subject: value}) rows as one transaction.
+
+        All rows are validated first; any error rejects the whole batch.
+        ``assessment`` works as in set_marks. Returns the number of marks written.
+        """
+        return self._set_class_marks(faculty, cid, list(updates), assessment)  # see register_students
+
+    @_optimistic
+    def _set_class_marks(self, faculty: str, cid: str, updates: List[Tuple[str, Dict[str, Any]]],
+                         assessment: Optional[str]) -> int:
+        with self.lock:
+            cls = self.check_class_owner(faculty, cid)
+            latest = self.check_assessment(cid, assessment)
+            subjects = set(cls.get("subjects", []))
+            students = self.data["students"]
+            errors: List[str] = []
+            changes = []
+            rows: Dict[str, Dict[str, int]] = {}
+            for line, (sid, marks) in enumerate(updates, start=1):
+                if students.get(sid, {}).get("class_id") != cid:
+                    errors.append(f"row {line}: student '{sid}' is not in this class")
+                    continue
+                for sub, raw in marks.items():
+                    if sub not in subjects:
+                        errors.append(f"row {line}: unknown subject '{sub}'")
+                        continue
+                    try:
+                        val = self.parse_mark(raw)
+                    except ServiceError:
+                        errors.append(f"row {line}: bad mark {raw!r} for {sub}")
+                        continue
+                    if val is not None and not errors:
+                        rows.setdefault(sid, {})[sub] = val
+            if errors:
+                raise _batch_error(errors)
+            reads = [["classes", cid, "subjects"]]  # see set_marks
+            if assessment is not None:
+                changes += assessments.column_changes(self.data["assessments"][assessment], assessment,
+                                                      rows.items())
+                reads.append(["assessments", assessment, "students"])  # see set_marks
+            if latest:
+                changes += [("set", ["students", sid, "marks", sub], val)
+                            for sid, marks in rows.items() for sub, val in marks.items()]
+            apply_changes(self.data, changes, base=self._base, reads=reads)
+            self._invalidate_class(cid)
+            return sum(len(marks) for marks in rows.values())
+
+    # ---------- assessments ----------
+    def class_assessments(self, cid: str) -> List[Dict[str, Any]]:
+        """[{assessment_id, name, term, weight}] oldest first."""
+        self.refresh()
+        out = []
+        for aid in self.indexes.assessments_for(cid):
+            a = self.data["assessments"][aid]
+            out.append({"assessment_id": aid, "name": a["name"], "term": a.get("term", ""),
+                        "weight": a.get("weight", 1.0)})
+        return out
+
+    @_optimistic
+    def create_assessment(self, faculty: str, cid: str, name: str, term: str = "", weight: Any = 1.0,
+                          from_current: bool = False) -> str:
+        """Add an assessment (it becomes the latest); ``from_current`` copies the current marks into it."""
+        with self.lock:
+            cls = self.check_class_owner(faculty, cid)
+            name, term = (name or "").strip(), (term or "").strip()
+            if not name:
+                raise ServiceError("Invalid", "Assessment name cannot be empty.")
+            try:
+                weight = float(weight)
+            except (TypeError, ValueError):
+                weight = -1.0
+            if weight < 0:
+                raise ServiceError("Invalid", "Weight must be a non-negative number.")
+            existing = self.indexes.assessments_for(cid)
+            for aid in existing:
+                a = self.data["assessments"][aid]
+                if a["name"].lower() == name.lower() and a.get("term", "") == term:
+                    raise ServiceError("Duplicate", f"Assessment '{name}' already exists for this term.")
+            number = len(existing) + 1
+            while assessments.assessment_id(cid, number) in self.data.get("assessments", {}):
+                number += 1
+            aid = assessments.assessment_id(cid, number)
+            record = assessments.new_assessment(cid, name, term, weight)
+            if from_current:
+                students = self.data["students"]
+                # a roster entry without a student record has no marks to copy
+                roster = [sid for sid in cls.get("students", []) if students.get(sid)]
+                record["students"] = roster
+                record["marks"] = {
+                    sub: [m if isinstance(m, int) and m >= 0 else assessments.MISSING
+                          for m in (students[sid].get("marks", {}).get(sub) for sid in roster)]
+                    for sub in cls.get("subjects", [])}
+            # the aid is picked from the class's current list, so a concurrent create clashes here
+            apply_changes(self.data, [("set", ["assessments", aid], record)], base=self._base)
+            self.indexes.update_assessment(aid)
+            return aid
+
+    def student_trajectory(self, sid: str) -> List[Dict[str, Any]]:
+        """Marks and total per assessment for one student, oldest first."""
+        self.refresh()
+        cid = self.data["students"][sid]["class_id"]
+        return assessments.trajectory(self.data, sid, self.indexes.assessments_for(cid))
+
+    def assessment_averages(self, cid: str) -> List[Dict[str, Any]]:
+        """Class mean per subject and mean total for each assessment, oldest first."""
+        self.refresh()
+        return assessments.class_averages(self.data, cid, self.indexes.assessments_for(cid))
+
+    def most_improved(self, cid: str, before: Optional[str] = None, after: Optional[str] = None,
+                      n: int = 10) -> List[Tuple[str, int, int, int]]:
+        """(student_id, total before, total after, gain); defaults to the last two assessments."""
+        self.refresh()
+        aids = self.indexes.assessments_for(cid)
+        if len(aids) < 2 and (before is None or after is None):
+            return []
+        before = before or aids[-2]
+        after = after or aids[-1]
+        for aid in (before, after):
+            self.check_assessment(cid, aid)
+        return assessments.most_improved(self.data, cid, before, after, n)
+
+    def assessment_ranks(self, cid: str, assessment: Optional[str] = None,
+                         weights: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+        """compute_totals_and_ranks for one assessment, or weighted ({aid: w}, or {} for the stored weights)."""
+        self.refresh()
+        if weights is not None:
+            if not weights:
+                weights = {aid: self.data["assessments"][aid].get("weight", 1.0)
+                           for aid in self.indexes.assessments_for(cid)}
+            for aid in weights:
+                self.check_assessment(cid, aid)
+            return compute_totals_and_ranks(self.data, cid, weights=weights)
+        self.check_assessment(cid, assessment)
+        return compute_totals_and_ranks(self.data, cid, assessment=assessment)
+
+    def _invalidate_class(self, cid: str) -> None:
+        """Drop derived views for a class after a bulk change; rebuilt once on next read."""
+        self.ranks.invalidate(cid)
+        if self.matrices:
+            self.matrices.invalidate(cid)
+
+    def _sync_student(self, cid: str, sid: str) -> None:
+        """Push one student's new/changed marks into the cached rank and analytics views."""
+        self.ranks.update_student(cid, sid)
+        if self.matrices:
+            self.matrices.update_student(cid, sid)
+
+    # ---------- reads ----------
+    @timed("service.rank_list")
+    def rank_list(self, cid: str) -> List[Tuple[int, str, int]]:
+        """(rank, student_id, total) from first to last."""
+        self.refresh()
+        return list(self.ranks.for_class(cid).ranked())
+
+    @timed("service.search_students")
+    def search_students(self, text: str, limit: int = 20,
+                        class_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Best matches for a name, roll number or student ID, best first."""
+        self.refresh()
+        with self.lock:
+            within = None if class_ids is None else set(class_ids)
+            hits = self.indexes.search().query(text, limit, within)
+            out = []
+            for sid, score in hits:
+                stu = self.data["students"][sid]
+                cid = stu["class_id"]
+                out.append({"student_id": sid, "name": stu["name"], "roll_no": stu["roll_no"], "class_id": cid,
+                            "class_name": self.data["classes"].get(cid, {}).get("name", ""), "score": score})
+            return out
+
+    def student_report(self, sid: str) -> Dict[str, Any]:
+        self.refresh()
+        s = self.data["students"][sid]
+        cid = s["class_id"]
+        cls = self.data["classes"][cid]
+        ranking = self.ranks.for_class(cid)
+        return {
+            "student_id": sid,
+            "name": s["name"],
+            "roll_no": s["roll_no"],
+            "class_id": cid,
+            "class_name": cls["name"],
+            "marks": {sub: s["marks"].get(sub, 0) for sub in cls.get("subjects", [])},
+            "total": ranking.total(sid) or 0,
+            "rank": ranking.rank(sid),
+        }
+
+    def class_matrix(self, cid: str):
+        """analytics.MarksMatrix for the class; raises ImportError without numpy."""
+        if self.matrices is None:
+            from analytics import MatrixIndex
+            self.matrices = MatrixIndex(self.data)
+        return self.matrices.for_class(cid)
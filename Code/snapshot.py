@@ -0,0 +1,169 @@
+# snapshot.py
+# Binary snapshot format with lazily decoded records.
+#
+# Layout (little-endian):
+#   b"SMSSNAP1" | u64 index offset | record bytes ... | index
+# Every record is the compact JSON of one faculty/student/class entry. The
+# index lists, per collection, a u32 count, (offset u64, length u32) pairs,
+# then a u32-length blob of the NUL-separated UTF-8 keys. open_snapshot()
+# memory-maps the file and reads only the index; records are decoded on
+# first access, so startup cost no longer grows with the size of every
+# student's marks.
+#
+# Collections are indexed in COLLECTIONS order; files written before a
+# collection was added simply end the index early and load it empty.
+#
+# After the index comes an optional metadata section: a JSON blob with the
+# per-record versions (see json_store.py) followed by a fixed footer of
+# b"SMSMETA1", the journal seq the snapshot covers and the blob's offset.
+# open_snapshot() never reads it; read_meta() only touches the footer
+# unless the versions are asked for.
+
+import json
+import mmap
+import struct
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"SMSSNAP1"
+META_MAGIC = b"SMSMETA1"
+COLLECTIONS = ("faculties", "students", "classes", "assessments")
+
+_HEADER = struct.Struct("<8sQ")
+_COUNT = struct.Struct("<I")
+_ENTRY = struct.Struct("<QI")
+_FOOTER = struct.Struct("<8sQQ")
+
+
+class LazyCollection(MutableMapping):
+    """Mapping backed by snapshot records; entries decode (and cache) on first access.
+
+    Undecoded entries are stored as their (offset, length) tuple, which no
+    JSON value can be, so one dict keeps both kinds in insertion order.
+    """
+
+    def __init__(self, buf, index: Dict[str, Tuple[int, int]]):
+        self._buf = buf
+        self._items: Dict[str, Any] = index  # key -> decoded value, or (offset, length) if untouched
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._items[key]
+        if type(value) is tuple:
+            off, length = value
+            value = self._items[key] = json.loads(self._buf[off:off + length])
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._items[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._items[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._items))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def raw_items(self) -> Iterator[Tuple[str, bytes]]:
+        """(key, encoded record) pairs; untouched records are copied without decoding."""
+        for key, value in list(self._items.items()):
+            if type(value) is tuple:
+                off, length = value
+                yield key, bytes(self._buf[off:off + length])
+            else:
+                yield key, json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _raw_items(collection) -> Iterator[Tuple[str, bytes]]:
+    if isinstance(collection, LazyCollection):
+        return collection.raw_items()
+    return ((k, json.dumps(v, separators=(",", ":")).encode("utf-8")) for k, v in list(collection.items()))
+
+
+def encode(data: Dict[str, Any], seq: int = 0, versions: Optional[Dict[str, Dict[str, int]]] = None) -> bytes:
+    """Serialize the dataset (plus its journal seq and record versions) into snapshot bytes."""
+    chunks: List[bytes] = [b""]  # header placeholder
+    pos = _HEADER.size
+    index_parts: List[bytes] = []
+    for name in COLLECTIONS:
+        entries: List[bytes] = []
+        keys: List[str] = []
+        for key, raw in _raw_items(data.get(name, {})):
+            if "\0" in key:
+                raise ValueError(f"NUL in record key {key!r}")
+            entries.append(_ENTRY.pack(pos, len(raw)))
+            keys.append(key)
+            chunks.append(raw)
+            pos += len(raw)
+        blob = "\0".join(keys).encode("utf-8")
+        index_parts += [_COUNT.pack(len(entries))] + entries + [_COUNT.pack(len(blob)), blob]
+    chunks[0] = _HEADER.pack(MAGIC, pos)
+    body = b"".join(chunks + index_parts)
+    meta = json.dumps({"versions": versions or {}}, separators=(",", ":")).encode("utf-8")
+    return body + meta + _FOOTER.pack(META_MAGIC, seq, len(body))
+
+
+def open_snapshot(path: str) -> Dict[str, Any]:
+    """Map a snapshot file and return the dataset with lazy collections."""
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            buf = b""  # empty file
+    if len(buf) < _HEADER.size:
+        raise ValueError("truncated snapshot")
+    magic, pos = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot file")
+    end = _index_end(buf)
+    data: Dict[str, Any] = {}
+    for name in COLLECTIONS:
+        if pos >= end:
+            data[name] = LazyCollection(buf, {})
+            continue
+        (count,) = _COUNT.unpack_from(buf, pos)
+        pos += _COUNT.size
+        entries = _ENTRY.iter_unpack(buf[pos:pos + count * _ENTRY.size]) if count else ()
+        pos += count * _ENTRY.size
+        (blob_len,) = _COUNT.unpack_from(buf, pos)
+        pos += _COUNT.size
+        keys = buf[pos:pos + blob_len].decode("utf-8").split("\0") if count else []
+        pos += blob_len
+        data[name] = LazyCollection(buf, dict(zip(keys, entries)))
+    return data
+
+
+def _index_end(buf) -> int:
+    """Offset where the index stops: the metadata blob, or the end of an older file."""
+    if len(buf) >= _HEADER.size + _FOOTER.size:
+        magic, _, offset = _FOOTER.unpack_from(buf, len(buf) - _FOOTER.size)
+        if magic == META_MAGIC:
+            return offset
+    return len(buf)
+
+
+def read_meta(path: str, versions: bool = False) -> Tuple[int, Dict[str, Dict[str, int]]]:
+    """(seq, versions) stored by encode(); (0, {}) for snapshots written without them."""
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size < _HEADER.size + _FOOTER.size:
+            return 0, {}
+        f.seek(size - _FOOTER.size)
+        magic, seq, offset = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic != META_MAGIC:
+            return 0, {}
+        if not versions:
+            return seq, {}
+        f.seek(offset)
+        return seq, json.loads(f.read(size - _FOOTER.size - offset))["versions"]
+
+
+def materialize(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain-dict copy of a (possibly lazy) dataset, e.g. for json.dump."""
+    return {name: dict(coll.items()) if isinstance(coll, LazyCollection) else coll
+            for name, coll in data.items()}
+
@@ -0,0 +1,452 @@
+# sqlite_store.py
+# SQLite storage backend with indexed lookups.
+#
+# Keeps the faculties/students/classes model in DB_FILE. load_data() still
+# returns the usual nested dict for the UI, while the query functions go
+# straight to the indexes instead of walking the dicts.
+#
+# Run `python sqlite_store.py data.json [data.db]` to migrate a JSON store.
+#
+# After start_writer(), apply_changes() only updates the dict and queues the
+# change; a persistence.PersistenceWorker commits each burst in a single
+# transaction outside the lock apply_changes() takes, so edits never wait
+# for the disk. Queries flush the queue first so SQL always sees every
+# edit. Without a writer a failed commit is raised to the caller; with one
+# it stays queued, is retried, and is reported on the worker's errors queue.
+#
+# Single process only. load_data() reads the DB once and the app then
+# serves every read from that dict, which nothing refreshes: sync() and
+# on_merge() exist for API parity with json_store and never poll the DB.
+# Conflicts are not detected either (``base``/``reads`` are ignored), and an
+# assessment's roster and each marks column are stored as whole JSON
+# values, so a second process writing the same DB would overwrite them and
+# never see the other's edits. Use the json backend for several app or API
+# processes on one store.
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from assessments import MISSING
+from concurrency import ConflictError
+from instrument import observe, timed
+from persistence import PersistenceWorker
+
+__all__ = [
+    "DB_FILE", "Change", "ConflictError", "load_data", "save_data", "apply_changes", "apply_change",
+    "sync", "on_merge", "start_writer", "flush", "stop_writer",
+    "classes_for_faculty", "find_class_by_name", "find_student_by_roll", "migrate_json",
+]
+
+DB_FILE = os.environ.get("SMS_DB_FILE", "data.db")
+
+Change = Tuple[str, Sequence[str], Any]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS faculties (
+    username TEXT PRIMARY KEY,
+    name     TEXT NOT NULL,
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    cid     TEXT PRIMARY KEY,
+    name    TEXT NOT NULL,
+    faculty TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classes_faculty ON classes(faculty);
+CREATE INDEX IF NOT EXISTS idx_classes_name ON classes(name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS class_subjects (
+    cid     TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    PRIMARY KEY (cid, subject)
+);
+CREATE TABLE IF NOT EXISTS students (
+    sid         TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    password    TEXT NOT NULL,
+    first_login INTEGER NOT NULL,
+    class_id    TEXT NOT NULL,
+    roll_no     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_students_class ON students(class_id);
+CREATE INDEX IF NOT EXISTS idx_students_class_roll ON students(class_id, roll_no);
+CREATE TABLE IF NOT EXISTS marks (
+    sid     TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    value   INTEGER NOT NULL,
+    PRIMARY KEY (sid, subject)
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    aid      TEXT PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    term     TEXT NOT NULL,
+    weight   REAL NOT NULL,
+    students TEXT NOT NULL          -- JSON list, row order of the columns
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_class ON assessments(class_id);
+CREATE TABLE IF NOT EXISTS assessment_columns (
+    aid     TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    col     TEXT NOT NULL,          -- JSON list of marks, -1 = missing
+    PRIMARY KEY (aid, subject)
+);
+"""
+
+# Scalar fields that may be set individually, mapped to their columns.
+_FACULTY_FIELDS = {"name", "password"}
+_CLASS_FIELDS = {"name", "faculty"}
+_STUDENT_FIELDS = {"name", "password", "first_login", "class_id", "roll_no"}
+_ASSESSMENT_FIELDS = {"name", "term", "weight"}
+
+_lock = threading.RLock()     # guards the queue and the connection handle
+_io_lock = threading.RLock()  # one transaction at a time; queries wait for the one in flight
+_conn: Optional[sqlite3.Connection] = None
+_pending: List[Change] = []   # applied to the dict, not yet committed
+_writer: Optional[PersistenceWorker] = None
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    with _lock:
+        if _conn is None:
+            _conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.executescript(SCHEMA)
+        return _conn
+
+
+# ---------- writes ----------
+
+def _insert_class(db: sqlite3.Connection, cid: str, cls: Dict[str, Any]) -> None:
+    db.execute("INSERT OR REPLACE INTO classes (cid, name, faculty) VALUES (?, ?, ?)",
+               (cid, cls["name"], cls["faculty"]))
+    db.execute("DELETE FROM class_subjects WHERE cid = ?", (cid,))
+    db.executemany("INSERT INTO class_subjects (cid, subject) VALUES (?, ?)",
+                   [(cid, sub) for sub in cls.get("subjects", [])])
+
+
+def _insert_student(db: sqlite3.Connection, sid: str, stu: Dict[str, Any]) -> None:
+    db.execute("INSERT OR REPLACE INTO students (sid, name, password, first_login, class_id, roll_no) "
+               "VALUES (?, ?, ?, ?, ?, ?)",
+               (sid, stu["name"], stu["password"], int(bool(stu.get("first_login", True))),
+                stu["class_id"], stu["roll_no"]))
+    _replace_marks(db, sid, stu.get("marks", {}))
+
+
+def _replace_marks(db: sqlite3.Connection, sid: str, marks: Dict[str, Any]) -> None:
+    db.execute("DELETE FROM marks WHERE sid = ?", (sid,))
+    db.executemany("INSERT INTO marks (sid, subject, value) VALUES (?, ?, ?)",
+                   [(sid, sub, val) for sub, val in marks.items()])
+
+
+def _insert_assessment(db: sqlite3.Connection, aid: str, a: Dict[str, Any]) -> None:
+    db.execute("INSERT OR REPLACE INTO assessments (aid, class_id, name, term, weight, students) "
+               "VALUES (?, ?, ?, ?, ?, ?)",
+               (aid, a["class_id"], a["name"], a.get("term", ""), a.get("weight", 1.0),
+                json.dumps(a.get("students", []))))
+    db.execute("DELETE FROM assessment_columns WHERE aid = ?", (aid,))
+    db.executemany("INSERT INTO assessment_columns (aid, subject, col) VALUES (?, ?, ?)",
+                   [(aid, sub, json.dumps(col)) for sub, col in a.get("marks", {}).items()])
+
+
+def _write(db: sqlite3.Connection, op: str, path: Sequence[str], value: Any) -> None:
+    """Translate one change record into SQL."""
+    kind, key, rest = path[0], path[1], list(path[2:])
+    if kind == "faculties":
+        if op == "set" and not rest:
+            db.execute("INSERT OR REPLACE INTO faculties (username, name, password) VALUES (?, ?, ?)",
+                       (key, value["name"], value["password"]))
+            return
+        if op == "set" and len(rest) == 1 and rest[0] in _FACULTY_FIELDS:
+            db.execute(f"UPDATE faculties SET {rest[0]} = ? WHERE username = ?", (value, key))
+            return
+    elif kind == "classes":
+        if op == "set" and not rest:
+            _insert_class(db, key, value)
+            return
+        if op == "set" and len(rest) == 1 and rest[0] in _CLASS_FIELDS:
+            db.execute(f"UPDATE classes SET {rest[0]} = ? WHERE cid = ?", (value, key))
+            return
+        if op == "append" and rest == ["subjects"]:
+            db.execute("INSERT OR IGNORE INTO class_subjects (cid, subject) VALUES (?, ?)", (key, value))
+            return
+        if op == "append" and rest == ["students"]:
+            return  # membership lives in students.class_id
+    elif kind == "students":
+        if op == "set" and not rest:
+            _insert_student(db, key, value)
+            return
+        if op == "set" and rest == ["marks"]:
+            _replace_marks(db, key, value)
+            return
+        if op == "set" and len(rest) == 2 and rest[0] == "marks":
+            db.execute("INSERT OR REPLACE INTO marks (sid, subject, value) VALUES (?, ?, ?)",
+                       (key, rest[1], value))
+            return
+        if op == "set" and len(rest) == 1 and rest[0] in _STUDENT_FIELDS:
+            if rest[0] == "first_login":
+                value = int(bool(value))
+            db.execute(f"UPDATE students SET {rest[0]} = ? WHERE sid = ?", (value, key))
+            return
+    elif kind == "assessments":
+        if op == "set" and not rest:
+            _insert_assessment(db, key, value)
+            return
+        if op == "set" and len(rest) == 1 and rest[0] in _ASSESSMENT_FIELDS:
+            db.execute(f"UPDATE assessments SET {rest[0]} = ? WHERE aid = ?", (value, key))
+            return
+        if op == "append" and rest == ["students"]:
+            (roster,) = db.execute("SELECT students FROM assessments WHERE aid = ?", (key,)).fetchone()
+            db.execute("UPDATE assessments SET students = ? WHERE aid = ?",
+                       (json.dumps(json.loads(roster) + [value]), key))
+            return
+        if op == "set" and len(rest) == 2 and rest[0] == "marks":
+            db.execute("INSERT OR REPLACE INTO assessment_columns (aid, subject, col) VALUES (?, ?, ?)",
+                       (key, rest[1], json.dumps(value)))
+            return
+        if op == "set" and len(rest) == 3 and rest[0] == "marks":
+            (col,) = db.execute("SELECT col FROM assessment_columns WHERE aid = ? AND subject = ?",
+                                (key, rest[1])).fetchone()
+            col = json.loads(col)
+            _set_item(col, rest[2], value)
+            db.execute("UPDATE assessment_columns SET col = ? WHERE aid = ? AND subject = ?",
+                       (json.dumps(col), key, rest[1]))
+            return
+    raise ValueError(f"Unsupported change for sqlite backend: {op} {list(path)}")
+
+
+def _apply(data: Dict[str, Any], op: str, path: Sequence[str], value: Any) -> None:
+    target = data
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    if op == "set" and isinstance(target, list):
+        _set_item(target, path[-1], value)
+    elif op == "set":
+        target[path[-1]] = value
+    else:
+        target.setdefault(path[-1], []).append(value)
+
+
+def _set_item(items: List[Any], key: str, value: Any) -> None:
+    """One marks-column cell, as json_store does it: a short column is padded with MISSING."""
+    i = int(key)
+    if i >= len(items):
+        items.extend([MISSING] * (i + 1 - len(items)))
+    items[i] = value
+
+
+@timed("storage.apply_changes")
+def apply_changes(data: Dict[str, Any], changes: Iterable[Change],
+                  base: Optional[int] = None, reads: Iterable[Sequence[str]] = ()) -> None:
+    """Apply changes to ``data`` and commit them to the DB in one transaction.
+
+    Without a writer thread a failed commit raises and leaves ``data``
+    untouched. ``base`` and ``reads`` are accepted for json_store
+    compatibility and ignored.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+    with _lock:
+        writer = _writer
+        if writer is not None:
+            for op, path, value in changes:
+                _apply(data, op, path, value)
+            _pending.extend(changes)
+    if writer is not None:
+        writer.notify()
+        return
+    with _io_lock:
+        _flush_pending()  # anything a stopped writer left behind goes first
+        with _connect() as db:
+            for op, path, value in changes:
+                _write(db, op, path, value)
+    for op, path, value in changes:
+        _apply(data, op, path, value)
+
+
+def apply_change(data: Dict[str, Any], op: str, path: Sequence[str], value: Any,
+                 base: Optional[int] = None) -> None:
+    """Single-change shorthand for apply_changes()."""
+    apply_changes(data, [(op, path, value)], base)
+
+
+def sync(data: Dict[str, Any]) -> int:
+    """No-op: this process's writes are the only ones ``data`` sees; returns 0 as the ``base``."""
+    return 0
+
+
+def on_merge(callback: Callable[[Dict[str, Any], List[List[str]]], None]) -> None:
+    """No-op: the DB is never polled, so there are no other processes' changes to report."""
+
+
+def _flush_pending() -> None:
+    """Commit every queued change in one transaction; on failure they are queued again.
+
+    The queue is swapped out under _lock and committed outside it, so
+    apply_changes() never waits for the disk.
+    """
+    with _io_lock:
+        with _lock:
+            changes, _pending[:] = _pending[:], []
+        if not changes:
+            return
+        try:
+            with _connect() as db:
+                for op, path, value in changes:
+                    _write(db, op, path, value)
+        except BaseException:
+            with _lock:
+                _pending[:0] = changes  # ahead of whatever was queued meanwhile
+            raise
+
+
+def start_writer(window: float = 0.1) -> PersistenceWorker:
+    """Move commits to a background thread that coalesces bursts within `window` seconds."""
+    global _writer
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = PersistenceWorker(_flush_pending, window)
+            _writer.start()
+        return _writer
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Block until queued changes are committed; False if the commit failed."""
+    writer = _writer
+    if writer is not None and writer.is_alive():
+        return writer.flush(timeout)
+    try:
+        _flush_pending()
+    except Exception:
+        return False
+    return True
+
+
+def stop_writer() -> None:
+    """Flush and stop the background writer; later writes are synchronous again."""
+    global _writer
+    with _lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+    flush()
+
+
+def _query(sql: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+    with _io_lock:
+        _flush_pending()
+        return _connect().execute(sql, params).fetchall()
+
+
+@timed("storage.load_data")
+def load_data() -> Dict[str, Any]:
+    """Materialize the DB as the nested faculties/students/classes dict."""
+    with _io_lock:
+        _flush_pending()
+        db = _connect()
+        data: Dict[str, Any] = {"faculties": {}, "students": {}, "classes": {}}
+        for uname, name, pwd in db.execute("SELECT username, name, password FROM faculties"):
+            data["faculties"][uname] = {"name": name, "password": pwd}
+        for cid, name, fac in db.execute("SELECT cid, name, faculty FROM classes ORDER BY rowid"):
+            data["classes"][cid] = {"name": name, "faculty": fac, "students": [], "subjects": []}
+        for cid, sub in db.execute("SELECT cid, subject FROM class_subjects ORDER BY rowid"):
+            data["classes"][cid]["subjects"].append(sub)
+        for sid, name, pwd, first, cid, roll in db.execute(
+                "SELECT sid, name, password, first_login, class_id, roll_no FROM students ORDER BY rowid"):
+            data["students"][sid] = {"name": name, "password": pwd, "first_login": bool(first),
+                                     "class_id": cid, "roll_no": roll, "marks": {}}
+            if cid in data["classes"]:
+                data["classes"][cid]["students"].append(sid)
+        for sid, sub, val in db.execute("SELECT sid, subject, value FROM marks ORDER BY rowid"):
+            data["students"][sid]["marks"][sub] = val
+        data["assessments"] = {}
+        for aid, cid, name, term, weight, roster in db.execute(
+                "SELECT aid, class_id, name, term, weight, students FROM assessments ORDER BY rowid"):
+            data["assessments"][aid] = {"class_id": cid, "name": name, "term": term, "weight": weight,
+                                        "students": json.loads(roster), "marks": {}}
+        for aid, sub, col in db.execute("SELECT aid, subject, col FROM assessment_columns ORDER BY rowid"):
+            data["assessments"][aid]["marks"][sub] = json.loads(col)
+        return data
+
+
+@timed("storage.save_data")
+def save_data(data: Dict[str, Any]) -> None:
+    """Replace the DB contents with ``data``; raises if the transaction fails."""
+    with _io_lock:
+        with _lock:
+            changes, _pending[:] = _pending[:], []  # already reflected in ``data``
+        try:
+            with _connect() as db:
+                for table in ("faculties", "classes", "class_subjects", "students", "marks",
+                              "assessments", "assessment_columns"):
+                    db.execute(f"DELETE FROM {table}")
+                for uname, fac in data.get("faculties", {}).items():
+                    _write(db, "set", ["faculties", uname], fac)
+                for cid, cls in data.get("classes", {}).items():
+                    _insert_class(db, cid, cls)
+                for sid, stu in data.get("students", {}).items():
+                    _insert_student(db, sid, stu)
+                for aid, a in data.get("assessments", {}).items():
+                    _insert_assessment(db, aid, a)
+        except BaseException:
+            with _lock:
+                _pending[:0] = changes
+            raise
+    observe("storage.data_file_bytes", os.path.getsize(DB_FILE))
+
+
+# ---------- queries ----------
+
+def classes_for_faculty(data: Dict[str, Any], faculty: str) -> List[str]:
+    """Class IDs owned by ``faculty``, in creation order."""
+    rows = _query("SELECT cid FROM classes WHERE faculty = ? ORDER BY rowid", (faculty,))
+    return [cid for (cid,) in rows]
+
+
+def find_class_by_name(data: Dict[str, Any], name: str) -> Optional[str]:
+    """Class ID with this name (case-insensitive), or None."""
+    rows = _query("SELECT cid FROM classes WHERE name = ? COLLATE NOCASE LIMIT 1", (name,))
+    return rows[0][0] if rows else None
+
+
+def find_student_by_roll(data: Dict[str, Any], class_id: str, roll_no: str) -> Optional[str]:
+    """Student ID with this roll number in the class, or None."""
+    rows = _query("SELECT sid FROM students WHERE class_id = ? AND roll_no = ? LIMIT 1", (class_id, roll_no))
+    return rows[0][0] if rows else None
+
+
+# ---------- migration ----------
+
+def migrate_json(json_path: str, db_path: Optional[str] = None) -> Dict[str, int]:
+    """One-shot import of a JSON store (snapshot + journal) into a SQLite file."""
+    global DB_FILE, _conn
+    import json_store
+
+    if not os.path.exists(json_path) and not os.path.exists(json_path + ".journal"):
+        raise FileNotFoundError(json_path)
+    old_json, json_store.DATA_FILE = json_store.DATA_FILE, json_path
+    try:
+        data = json_store.load_data()
+    finally:
+        json_store.DATA_FILE = old_json
+    with _lock:
+        if db_path is not None and db_path != DB_FILE:
+            if _conn is not None:
+                _conn.close()
+                _conn = None
+            DB_FILE = db_path
+        save_data(data)
+    return {k: len(data.get(k, {})) for k in ("faculties", "classes", "students", "assessments")}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python sqlite_store.py data.json [data.db]")
+        sys.exit(2)
+    counts = migrate_json(*sys.argv[1:])
+    print("Migrated:", json.dumps(counts))
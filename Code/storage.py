@@ -1,29 +1,19 @@
 # storage.py
-# JSON storage helpers (safe read/write)
+# Storage facade: picks a backend from config and re-exports its API.
+#
+#   SMS_STORAGE=json    (default) data.json snapshot + journal, see json_store.py
+#   SMS_STORAGE=sqlite  indexed SQLite file, see sqlite_store.py (one process only)
+#
+# Both backends expose the same functions: load_data, save_data,
+# apply_changes/apply_change and the lookup queries used by the app.
 
-import json
 import os
-from typing import Any, Dict
 
-DATA_FILE = "data.json"
+BACKEND = os.environ.get("SMS_STORAGE", "json").strip().lower()
 
-
-def load_data() -> Dict[str, Any]:
-    """Load DB or return empty structure on missing/corrupt file."""
-    if not os.path.exists(DATA_FILE):
-        return {"faculties": {}, "students": {}, "classes": {}}
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        # If file is corrupt or unreadable, return clean structure
-        return {"faculties": {}, "students": {}, "classes": {}}
-
-
-def save_data(data: Dict[str, Any]) -> None:
-    """Write DB to disk; catch exceptions so UI won't crash."""
-    try:
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print("Warning: failed to save data.json:", e)
+if BACKEND == "sqlite":
+    from sqlite_store import *  # noqa: F401,F403
+elif BACKEND == "json":
+    from json_store import *  # noqa: F401,F403
+else:
+    raise ImportError(f"Unknown SMS_STORAGE backend: {BACKEND!r}")
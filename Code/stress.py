@@ -0,0 +1,151 @@
+# stress.py
+# Many processes mutating one shared JSON store at once; checks nothing is lost.
+#
+#   python stress.py --procs 8 --ops 300
+#   python stress.py --procs 4 --ops 500 --binary --compact-bytes 8192
+#
+# Every worker is a separate interpreter with its own SchoolService, just
+# like several app.py windows on one data.json. Each one:
+#   - writes marks in its own subject for random students, so workers keep
+#     changing different fields of the same records,
+#   - registers students with roll numbers that collide across workers,
+#   - creates classes whose names collide across workers.
+# A tiny compaction threshold makes journals rotate under the workers'
+# feet. Afterwards the store is reloaded and every acknowledged write is
+# checked: the last mark each worker wrote, every registered student, no
+# duplicate roll numbers or class names, and each worker's lookup indexes
+# still match a fresh rebuild. A write dropped after it returned (reported
+# as ConflictError on the writer's errors queue) counts as lost too.
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+
+def worker(args: Tuple[int, str, int, int, int]) -> Dict[str, Any]:
+    index, path, ops, compact_bytes, seed = args
+    import json_store
+    json_store.COMPACT_THRESHOLD = compact_bytes
+    from service import SchoolService, ServiceError
+
+    rng = random.Random(seed)
+    svc = SchoolService()
+    svc.search_students("stress")  # build the search index, so check() covers its updates too
+    json_store.start_writer(0.005)
+    fac = "faculty1"
+    seeded = [cid for cid in svc.faculty_classes(fac) if not svc.data["classes"][cid]["name"].endswith("Z")]
+    marks: Dict[str, int] = {}
+    students: List[Tuple[str, str, str]] = []
+    classes: List[Tuple[str, str]] = []
+    rejected = 0
+    subject = f"Subject {index + 1}"
+    for _ in range(ops):
+        roll = rng.random()
+        try:
+            if roll < 0.7:
+                cid = rng.choice(seeded)
+                sid = rng.choice(svc.data["classes"][cid]["students"])
+                value = rng.randint(0, 100)
+                svc.set_marks(fac, sid, {subject: value})
+                marks[sid] = value
+            elif roll < 0.9:
+                cid = rng.choice(seeded)
+                roll_no = str(rng.randint(1000, 1000 + ops // 4))
+                sid, _ = svc.register_student(fac, cid, roll_no, f"Stress {index}")
+                students.append((sid, cid, roll_no))
+            else:
+                name = f"{rng.randint(100, 100 + ops // 10)}Z"  # seeded classes never end in Z
+                classes.append((svc.create_class(fac, name), name))
+        except ServiceError:
+            rejected += 1  # duplicate roll/class name, or a busy record
+    writer = json_store._writer
+    json_store.stop_writer()
+    svc.refresh()
+    dropped = 0
+    while not writer.errors.empty():
+        dropped += isinstance(writer.errors.get_nowait(), json_store.ConflictError)
+    return {"subject": subject, "marks": marks, "students": students, "classes": classes, "rejected": rejected,
+            "dropped": dropped, "index_problems": svc.indexes.check()}
+
+
+def seed_store(path: str, procs: int) -> None:
+    from datagen import generate, write
+    data = generate(faculties=1, classes=4, students_per_class=25, subjects=procs, marks_ratio=0.0)
+    subjects = [f"Subject {i + 1}" for i in range(procs)]
+    for cls in data["classes"].values():
+        cls["subjects"] = subjects
+    write(data, path)
+
+
+def verify(path: str, results: List[Dict[str, Any]]) -> List[str]:
+    import json_store
+    json_store.DATA_FILE = path
+    data = json_store.load_data()
+    problems: List[str] = []
+    for res in results:
+        problems += [f"stale index: {p}" for p in res["index_problems"]]
+        if res["dropped"]:
+            problems.append(f"{res['subject']} worker: {res['dropped']} acknowledged writes dropped later")
+        for sid, value in res["marks"].items():
+            got = data["students"][sid]["marks"].get(res["subject"])
+            if got != value:
+                problems.append(f"lost mark: {sid} {res['subject']} expected {value}, found {got}")
+        for sid, cid, roll_no in res["students"]:
+            stu = data["students"].get(sid)
+            if stu is None or stu["roll_no"] != roll_no or sid not in data["classes"][cid]["students"]:
+                problems.append(f"lost student: {sid} (roll {roll_no} in {cid})")
+        for cid, name in res["classes"]:
+            if data["classes"].get(cid, {}).get("name") != name:
+                problems.append(f"lost class: {cid} ({name})")
+    names = [c["name"].lower() for c in data["classes"].values()]
+    if len(names) != len(set(names)):
+        problems.append("duplicate class names")
+    for cid, cls in data["classes"].items():
+        rolls = [data["students"][s]["roll_no"] for s in cls["students"]]
+        if len(rolls) != len(set(rolls)):
+            problems.append(f"duplicate roll numbers in {cid}")
+    return problems
+
+
+def main(procs: int, ops: int, compact_bytes: int, binary: bool) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.json")
+        os.environ["SMS_STORAGE"] = "json"
+        os.environ["SMS_DATA_FILE"] = path
+        os.environ["SMS_SNAPSHOT"] = "binary" if binary else "json"
+        seed_store(path, procs)
+        start = time.perf_counter()
+        ctx = multiprocessing.get_context("spawn")  # fresh interpreters, like separate app windows
+        with ctx.Pool(procs) as pool:
+            results = pool.map(worker, [(i, path, ops, compact_bytes, i + 1) for i in range(procs)])
+        elapsed = time.perf_counter() - start
+        problems = verify(path, results)
+    return {
+        "procs": procs,
+        "ops_per_proc": ops,
+        "seconds": round(elapsed, 2),
+        "marks_written": sum(len(r["marks"]) for r in results),
+        "students_registered": sum(len(r["students"]) for r in results),
+        "classes_created": sum(len(r["classes"]) for r in results),
+        "rejected": sum(r["rejected"] for r in results),
+        "dropped": sum(r["dropped"] for r in results),
+        "problems": problems[:20],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent multi-process store stress test")
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=300, help="mutations per process")
+    parser.add_argument("--compact-bytes", type=int, default=16384, help="journal size that triggers compaction")
+    parser.add_argument("--binary", action="store_true", help="use the binary snapshot format")
+    args = parser.parse_args()
+    report = main(args.procs, args.ops, args.compact_bytes, args.binary)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["problems"] else 0)
@@ -0,0 +1,42 @@
+# test_compact.py
+# CompactStore.from_data()/to_data() round-trip the whole dataset, including
+# assessments and marks the compact arrays cannot hold.
+
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from compact import CompactStore  # noqa: E402
+from datagen import generate  # noqa: E402
+
+
+def test_generated_school_round_trips():
+    data = generate(faculties=3, classes=5, students_per_class=20, marks_ratio=0.7, assessments=3)
+    assert CompactStore.from_data(copy.deepcopy(data)).to_data() == data
+
+
+def test_unusual_marks_and_students_round_trip():
+    data = generate(faculties=1, classes=2, students_per_class=4, assessments=1)
+    cid, other = list(data["classes"])
+    sids = data["classes"][cid]["students"]
+    data["students"][sids[0]]["marks"].update({"Maths": 72.5, "Dropped Subject": 40, "English": "AB"})
+    data["students"][sids[1]]["marks"]["Physics"] = -3
+    data["students"][sids[2]]["class_id"] = other  # on one class's roster, pointing at another
+    data["students"]["STU_orphan"] = {"name": "No Roster", "password": "x", "first_login": False,
+                                      "class_id": cid, "roll_no": "99", "marks": {"Maths": 10}}
+    data["classes"][cid]["students"].append("STU_missing")
+    aid = next(iter(data["assessments"]))
+    data["assessments"][aid]["marks"]["Maths"][0] = 55.5
+    assert CompactStore.from_data(copy.deepcopy(data)).to_data() == data
+
+
+def test_set_mark_replaces_a_kept_value():
+    data = generate(faculties=1, classes=1, students_per_class=2)
+    sid = next(iter(data["students"]))
+    data["students"][sid]["marks"]["Maths"] = "AB"
+    store = CompactStore.from_data(data)
+    store.set_mark(sid, "Maths", 81)
+    assert store.student_dict(sid)["marks"]["Maths"] == 81
+    assert store.get_mark(sid, "Maths") == 81
@@ -0,0 +1,140 @@
+# test_json_store.py
+# Journal behaviour of the JSON backend: crash replay, rotation by another
+# process, conflict rollback and compaction racing appends. "Another
+# process" is a real subprocess sharing the same DATA_FILE.
+
+import copy
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+CODE_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, CODE_DIR)
+
+import instrument  # noqa: E402
+import json_store  # noqa: E402
+from json_store import ConflictError  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """json_store on a fresh DATA_FILE in tmp_path, synchronous writes."""
+    monkeypatch.setattr(json_store, "DATA_FILE", str(tmp_path / "data.json"))
+    monkeypatch.setattr(json_store, "SNAPSHOT_FORMAT", "json")
+    for name in ("_pending", "_rejected", "_deferred"):
+        monkeypatch.setattr(json_store, name, [])
+    monkeypatch.setattr(json_store, "_compacting", False)
+    assert json_store._writer is None
+    return json_store
+
+
+def _other_process(store, script: str) -> None:
+    """Run ``script`` against the same DATA_FILE in a separate interpreter, with `s` = json_store."""
+    env = dict(os.environ, SMS_DATA_FILE=store.DATA_FILE, SMS_SNAPSHOT="json")
+    code = "import json_store as s\ndata = s.load_data()\n" + script
+    subprocess.run([sys.executable, "-c", code], cwd=CODE_DIR, env=env, check=True, timeout=60)
+
+
+def _mark(sid: str, sub: str = "Maths"):
+    return ["students", sid, "marks", sub]
+
+
+def _journal_lines(store):
+    with open(store._journal_file(), "rb") as f:
+        return f.read().splitlines()
+
+
+def test_replay_skips_torn_last_line_and_next_write_starts_clean(store):
+    data = store.load_data()
+    store.apply_change(data, "set", _mark("S1"), 10)
+    store.apply_change(data, "set", _mark("S2"), 20)
+    with open(store._journal_file(), "ab") as f:
+        f.write(b'{"seq":3,"changes":[["set",["students","S3"')  # crashed mid-append
+
+    data = store.load_data()
+    assert data["students"] == {"S1": {"marks": {"Maths": 10}}, "S2": {"marks": {"Maths": 20}}}
+    assert store._journal_torn
+
+    store.apply_change(data, "set", _mark("S4"), 40)
+    torn, last = _journal_lines(store)[-2:]
+    assert torn.endswith(b'"S3"')  # left alone, not glued to the new batch
+    assert json.loads(last) == {"seq": 3, "changes": [["set", _mark("S4"), 40]]}
+    assert store.load_data() == data
+
+
+def test_rotation_by_another_process_is_merged(store):
+    data = store.load_data()
+    store.apply_change(data, "set", _mark("S1"), 10)
+    before = store.sync(data)
+
+    # compacts (rotating our journal away), then starts a new journal
+    _other_process(store, "s.apply_change(data, 'set', ['students', 'S2', 'marks', 'Maths'], 20)\n"
+                          "s.save_data(data)\n"
+                          "s.apply_change(data, 'set', ['students', 'S1', 'marks', 'English'], 30)\n")
+    assert store._journal_header(store._journal_file()) != store._journal_id
+
+    assert store.sync(data) > before
+    assert data["students"] == {"S1": {"marks": {"Maths": 10, "English": 30}},
+                                "S2": {"marks": {"Maths": 20}}}
+    # a write based on the stale seq still sees the other process's changes
+    with pytest.raises(ConflictError):
+        store.apply_change(data, "set", _mark("S2"), 21, base=before)
+    store.apply_change(data, "set", _mark("S3"), 40, base=store.sync(data))
+    assert store.load_data() == data
+
+
+def test_conflict_drops_whole_batch_and_leaves_memory_alone(store):
+    data = store.load_data()
+    store.apply_change(data, "set", _mark("S1"), 10)
+    base = store.sync(data)
+    _other_process(store, "s.apply_change(data, 'set', ['students', 'S1', 'marks', 'Maths'], 50)\n")
+    lines = _journal_lines(store)
+
+    with pytest.raises(ConflictError):
+        store.apply_changes(data, [("set", _mark("S1"), 11),
+                                   ("set", _mark("S9"), 90),  # no clash, but part of the same batch
+                                   ("append", ["classes", "C1", "students"], "S9")], base=base)
+
+    assert data["students"] == {"S1": {"marks": {"Maths": 50}}}  # the other write, merged; none of ours
+    assert "C1" not in data["classes"]
+    assert store._pending == []
+    assert _journal_lines(store) == lines
+    assert store.load_data() == data
+
+
+def test_compaction_while_appending(store, monkeypatch):
+    monkeypatch.setattr(store, "COMPACT_THRESHOLD", 2048)  # appends keep starting compactions too
+    data = store.load_data()
+    errors = []
+    compactions = instrument.metrics()["counters"].get("storage.compactions", 0)
+
+    def append(worker: int):
+        try:
+            for i in range(150):
+                store.apply_change(data, "set", _mark(f"W{worker}_{i}"), i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        store.compact_async(data)
+        time.sleep(0.005)
+    for t in threads:
+        t.join()
+    store.save_data(data)  # waits for a compaction still running
+    for t in threading.enumerate():
+        if t.name == "storage-compact":
+            t.join()
+
+    assert errors == []
+    assert instrument.metrics()["counters"]["storage.compactions"] > compactions + 1
+    assert len(data["students"]) == 4 * 150
+    expected = copy.deepcopy(data)
+    assert store.load_data() == expected
@@ -0,0 +1,108 @@
+# test_ranking.py
+# Property test: incrementally maintained ranks always agree with a full
+# compute_totals_and_ranks() over random sequences of mark updates.
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import utils  # noqa: E402
+from utils import ClassRanking, RankIndex, compute_totals_and_ranks  # noqa: E402
+
+SUBJECTS = ["Maths", "Science", "English"]
+SEEDS = range(200)
+
+
+def _school(rng: random.Random):
+    data = {"classes": {}, "students": {}}
+    for c in range(2):
+        cid = f"class_{c}"
+        roster = [f"S{c}_{i}" for i in range(rng.randint(0, 12))]
+        data["classes"][cid] = {"subjects": SUBJECTS[:rng.randint(1, 3)], "students": roster}
+        for sid in roster:
+            data["students"][sid] = {"class_id": cid, "marks": {}}
+    return data
+
+
+def _random_mark(rng: random.Random):
+    # a narrow range forces ties; strings and junk count as 0 like the full scan
+    return rng.choice([rng.randint(0, 4), rng.randint(0, 100), str(rng.randint(0, 4)), "absent", None])
+
+
+def _step(rng: random.Random, data, index: RankIndex) -> None:
+    cid = rng.choice(sorted(data["classes"]))
+    cls = data["classes"][cid]
+    if not cls["students"] or rng.random() < 0.1:
+        sid = f"{cid}_new{len(data['students'])}"
+        data["students"][sid] = {"class_id": cid, "marks": {}}
+        cls["students"].append(sid)
+    else:
+        sid = rng.choice(cls["students"])
+    marks = data["students"][sid]["marks"]
+    sub = rng.choice(SUBJECTS)  # may be outside the class's subjects, which must not count
+    value = _random_mark(rng)
+    if value is None:
+        marks.pop(sub, None)
+    else:
+        marks[sub] = value
+    index.update_student(cid, sid)
+
+
+def _check(data, index: RankIndex) -> None:
+    for cid in data["classes"]:
+        expected = compute_totals_and_ranks(data, cid)
+        ranking = index.for_class(cid)
+        assert ranking.as_dict() == expected
+        for sid, row in expected.items():
+            assert ranking.total(sid) == row["total"]
+            assert ranking.rank(sid) == row["rank"]
+        order = [sid for _, sid, _ in ranking.ranked()]
+        assert order == sorted(expected, key=lambda s: (-expected[s]["total"], s))
+
+
+def test_random_updates_match_full_recompute():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        data = _school(rng)
+        index = RankIndex(data)
+        for cid in data["classes"]:
+            index.for_class(cid)  # built before the updates, so they are applied incrementally
+        for _ in range(rng.randint(1, 60)):
+            _step(rng, data, index)
+        _check(data, index)
+
+
+def test_every_step_matches_full_recompute():
+    rng = random.Random(1234)
+    data = _school(rng)
+    index = RankIndex(data)
+    for _ in range(300):
+        _step(rng, data, index)
+        _check(data, index)
+
+
+def test_rebuild_after_subject_change():
+    rng = random.Random(99)
+    data = _school(rng)
+    for _ in range(50):
+        cid = rng.choice(sorted(data["classes"]))
+        for sid in data["classes"][cid]["students"]:
+            data["students"][sid]["marks"][rng.choice(SUBJECTS)] = rng.randint(0, 5)
+    for cid, cls in data["classes"].items():
+        ranking = ClassRanking(data, cid)
+        cls["subjects"] = list(reversed(SUBJECTS))
+        ranking.rebuild()
+        assert ranking.as_dict() == compute_totals_and_ranks(data, cid)
+
+
+def test_tiny_blocks_split_and_empty(monkeypatch):
+    # blocks of 1-2 keys, so every update splits or drops one
+    monkeypatch.setattr(utils._RankOrder, "LOAD", 1)
+    rng = random.Random(7)
+    data = _school(rng)
+    index = RankIndex(data)
+    for _ in range(300):
+        _step(rng, data, index)
+        _check(data, index)
@@ -2,8 +2,13 @@
 # Helpers for ID/password generation and ranking.
 
 import random
+import secrets
 import string
-from typing import Dict, Any, List, Tuple
+from bisect import bisect_left, insort
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import assessments
+from instrument import timed
 
 
 def generate_student_id(roll_no: str) -> str:
@@ -12,33 +17,53 @@ def generate_student_id(roll_no: str) -> str:
     return f"STU_{roll_no}_{suffix}"
 
 
-def generate_temp_password(length: int = 8) -> str:
-    """Generate a random alphanumeric password."""
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+def generate_temp_password(length: int = 10) -> str:
+    """Generate a random alphanumeric password from a CSPRNG."""
+    alphabet = string.ascii_letters + string.digits
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def student_total(student: Dict[str, Any], subjects: List[str]) -> int:
+    """Sum of a student's marks over the class subjects; bad values count as 0."""
+    total = 0
+    marks = student.get("marks", {})
+    for sub in subjects:
+        try:
+            total += int(marks.get(sub, 0))
+        except Exception:
+            total += 0
+    return total
 
 
-def compute_totals_and_ranks(data: Dict[str, Any], class_id: str) -> Dict[str, Dict[str, int]]:
+@timed("ranks.compute_totals_and_ranks")
+def compute_totals_and_ranks(data: Dict[str, Any], class_id: str, assessment: Optional[str] = None,
+                             weights: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
     """
     For the class compute totals and ranks.
     Returns mapping: student_id -> {"total": int, "rank": int}
     Ties share same rank (dense ranking).
+    By default totals use the current marks. With ``assessment`` they come
+    from that assessment's columns; with ``weights`` ({assessment_id:
+    weight}) they are the weighted sum of assessment totals (floats).
+    Students of the class without marks there total 0.
     """
     cls = data.get("classes", {}).get(class_id)
     if not cls:
         return {}
     subjects: List[str] = cls.get("subjects", []) or []
-    totals: List[Tuple[str, int]] = []
-    for sid in cls.get("students", []) or []:
-        student = data.get("students", {}).get(sid, {})
-        total = 0
-        for sub in subjects:
-            try:
-                total += int(student.get("marks", {}).get(sub, 0))
-            except Exception:
-                total += 0
-        totals.append((sid, total))
+    roster = cls.get("students", []) or []
+    totals: List[Tuple[str, Any]] = []
+    if weights:
+        totals = list(assessments.weighted_totals(data, class_id, weights).items())
+    elif assessment is not None:
+        by_sid = assessments.totals(data["assessments"][assessment], subjects)
+        totals = [(sid, by_sid.get(sid, 0)) for sid in roster]
+    else:
+        for sid in roster:
+            student = data.get("students", {}).get(sid, {})
+            totals.append((sid, student_total(student, subjects)))
     totals.sort(key=lambda x: (-x[1], x[0]))  # highest total first
-    ranks: Dict[str, Dict[str, int]] = {}
+    ranks: Dict[str, Dict[str, Any]] = {}
     prev_total = None
     prev_rank = 0
     for idx, (sid, total) in enumerate(totals, start=1):
@@ -50,3 +75,171 @@ def compute_totals_and_ranks(data: Dict[str, Any], class_id: str) -> Dict[str, D
             rank = prev_rank
         ranks[sid] = {"total": total, "rank": rank}
     return ranks
+
+
+class _RankOrder:
+    """
+    Sorted (-total, student_id) keys in blocks of LOAD to 2 * LOAD, with a
+    Fenwick tree over the block sizes. add/remove shift one block and
+    touch O(log blocks) tree nodes, and a key's position is a tree prefix
+    sum plus one bisect, so neither grows with the class size the way
+    list.insert/del on one flat list does.
+    """
+    LOAD = 256
+
+    def __init__(self, keys: Iterable[Tuple[int, str]] = ()):
+        keys = sorted(keys)
+        self._blocks: List[List[Tuple[int, str]]] = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        """Rebuild block maxes and the tree after blocks were split or dropped."""
+        self._maxes = [block[-1] for block in self._blocks]
+        n = len(self._blocks)
+        tree = [0] * (n + 1)
+        for i, block in enumerate(self._blocks, start=1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _resize(self, i: int, delta: int) -> None:
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, i: int) -> int:
+        """Number of keys in blocks [0, i)."""
+        n = 0
+        while i:
+            n += self._tree[i]
+            i -= i & -i
+        return n
+
+    def add(self, key: Tuple[int, str]) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._reindex()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self._blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._reindex()
+        else:
+            self._resize(i, 1)
+
+    def remove(self, key: Tuple[int, str]) -> None:
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+            self._resize(i, -1)
+        else:
+            del self._blocks[i]
+            self._reindex()
+
+    def bisect_left(self, key: Tuple[int, str]) -> int:
+        """Number of keys smaller than ``key``."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return self._before(i)
+        return self._before(i) + bisect_left(self._blocks[i], key)
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        for block in self._blocks:
+            yield from block
+
+
+class ClassRanking:
+    """
+    Incrementally maintained totals and ranks for one class.
+    Keeps each student's total cached plus a sorted (-total, student_id)
+    index (_RankOrder), so a mark update repositions one entry and a rank
+    lookup costs O(log n). Results match compute_totals_and_ranks exactly.
+    """
+
+    def __init__(self, data: Dict[str, Any], class_id: str):
+        self.data = data
+        self.class_id = class_id
+        self._totals: Dict[str, int] = {}
+        self._order = _RankOrder()
+        self.rebuild()
+
+    def _subjects(self) -> List[str]:
+        cls = self.data.get("classes", {}).get(self.class_id, {})
+        return cls.get("subjects", []) or []
+
+    def rebuild(self) -> None:
+        """Recompute every total, e.g. after the subject list changed."""
+        cls = self.data.get("classes", {}).get(self.class_id, {})
+        subjects = self._subjects()
+        students = self.data.get("students", {})
+        self._totals = {sid: student_total(students.get(sid, {}), subjects)
+                        for sid in cls.get("students", []) or []}
+        self._order = _RankOrder((-total, sid) for sid, total in self._totals.items())
+
+    def update_student(self, sid: str) -> None:
+        """Re-total one student (new or changed marks) and reposition them."""
+        total = student_total(self.data.get("students", {}).get(sid, {}), self._subjects())
+        old = self._totals.get(sid)
+        if old == total:
+            return
+        if old is not None:
+            self._order.remove((-old, sid))
+        self._totals[sid] = total
+        self._order.add((-total, sid))
+
+    def total(self, sid: str) -> Optional[int]:
+        return self._totals.get(sid)
+
+    def rank(self, sid: str) -> Optional[int]:
+        """1 + number of students with a strictly higher total."""
+        total = self._totals.get(sid)
+        if total is None:
+            return None
+        return self._order.bisect_left((-total, "")) + 1
+
+    def ranked(self) -> Iterator[Tuple[int, str, int]]:
+        """Yield (rank, student_id, total) from first to last."""
+        prev_total = None
+        rank = 0
+        for idx, (neg_total, sid) in enumerate(self._order, start=1):
+            if -neg_total != prev_total:
+                rank = idx
+                prev_total = -neg_total
+            yield rank, sid, -neg_total
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        """Same shape as compute_totals_and_ranks."""
+        return {sid: {"total": total, "rank": rank} for rank, sid, total in self.ranked()}
+
+
+class RankIndex:
+    """Lazily built ClassRanking per class, shared by the whole app."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self._classes: Dict[str, ClassRanking] = {}
+
+    def for_class(self, class_id: str) -> ClassRanking:
+        ranking = self._classes.get(class_id)
+        if ranking is None:
+            ranking = self._classes[class_id] = ClassRanking(self.data, class_id)
+        return ranking
+
+    def update_student(self, class_id: str, sid: str) -> None:
+        if class_id in self._classes:
+            self._classes[class_id].update_student(sid)
+
+    def invalidate(self, class_id: Optional[str] = None) -> None:
+        """Drop cached rankings for one class, or all of them."""
+        if class_id is None:
+            self._classes.clear()
+        else:
+            self._classes.pop(class_id, None)
@@ -0,0 +1,423 @@
+# widgets.py
+# Reusable Tk widgets.
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+Row = Tuple[Any, ...]
+
+
+class VirtualRankList(ttk.Frame):
+    """
+    Treeview that only materializes the rows the user has scrolled to.
+    set_rows() takes the full logical list plus a row factory; the first
+    `page` rows are built and more are appended as the view nears the
+    bottom. Refreshes are diffed against the rows already shown, so only
+    rows whose values or position changed touch the Treeview. Item IDs are
+    the row keys (student IDs).
+    """
+
+    def __init__(self, master, columns: Sequence[Tuple[str, int, str]], key_column: int = 0,
+                 page: int = 200, **tree_kw):
+        super().__init__(master)
+        self.page = page
+        self.key_column = key_column
+        self.tree = ttk.Treeview(self, columns=[c for c, _, _ in columns], show="headings", **tree_kw)
+        for col, width, text in columns:
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor=tk.CENTER)
+        self.scroll = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self._items: Sequence[Any] = []
+        self._make_row: Callable[[Any], Row] = tuple
+        self._list_key: Optional[Hashable] = None
+        self._shown: Dict[str, Row] = {}  # iid -> values currently in the tree
+        self._order: List[str] = []       # iids in tree order
+        self._loading = False
+
+    def set_rows(self, items: Sequence[Any], make_row: Callable[[Any], Row],
+                 list_key: Optional[Hashable] = None) -> None:
+        """Show `items`; `make_row` turns one into Treeview values on demand.
+        A different `list_key` (e.g. another class) resets the view to the top."""
+        if list_key != self._list_key:
+            self.clear()
+            self._list_key = list_key
+        self._items = items
+        self._make_row = make_row
+        count = min(len(items), max(len(self._order), self.page))
+        self._sync([make_row(item) for item in items[:count]])
+
+    def clear(self) -> None:
+        if self._order:
+            self.tree.delete(*self._order)
+        self._shown.clear()
+        self._order = []
+        self._items = []
+        self.tree.yview_moveto(0)
+
+    @property
+    def total_rows(self) -> int:
+        return len(self._items)
+
+    def _sync(self, rows: List[Row]) -> None:
+        keys = [str(row[self.key_column]) for row in rows]
+        wanted = set(keys)
+        stale = [iid for iid in self._order if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self._shown[iid]
+        current = [iid for iid in self._order if iid in wanted]
+        for idx, (iid, row) in enumerate(zip(keys, rows)):
+            old = self._shown.get(iid)
+            if old is None:
+                self.tree.insert("", idx, iid=iid, values=row)
+                current.insert(idx, iid)
+            else:
+                if old != row:
+                    self.tree.item(iid, values=row)
+                if current[idx] != iid:
+                    self.tree.move(iid, "", idx)
+                    current.remove(iid)
+                    current.insert(idx, iid)
+            self._shown[iid] = row
+        self._order = current
+
+    def _on_yscroll(self, first: str, last: str) -> None:
+        self.scroll.set(first, last)
+        if float(last) > 0.9 and len(self._order) < len(self._items) and not self._loading:
+            self._loading = True
+            self.after_idle(self._load_more)
+
+    def _load_more(self) -> None:
+        self._loading = False
+        start = len(self._order)
+        for item in self._items[start:start + self.page]:
+            row = self._make_row(item)
+            iid = str(row[self.key_column])
+            self.tree.insert("", tk.END, iid=iid, values=row)
+            self._shown[iid] = row
+            self._order.append(iid)
+
+
+class SearchBox(ttk.Frame):
+    """
+    Entry with a type-ahead result list. `search(text)` returns up to a
+    screenful of (key, label) pairs and runs once typing pauses for
+    `delay_ms`; Enter, a double click or Return in the list calls
+    `on_pick(key)`. Down moves from the entry into the list. With
+    `collapse`, the list is hidden while it has nothing to show.
+    """
+
+    def __init__(self, master, search: Callable[[str], List[Tuple[str, str]]],
+                 on_pick: Callable[[str], None], delay_ms: int = 120, height: int = 8,
+                 collapse: bool = False, width: int = 40):
+        super().__init__(master)
+        self.search = search
+        self.on_pick = on_pick
+        self.delay_ms = delay_ms
+        self.collapse = collapse
+        self.entry = ttk.Entry(self, width=width)
+        self.entry.pack(fill=tk.X)
+        self.listbox = tk.Listbox(self, height=height, activestyle="dotbox", exportselection=False)
+        if not collapse:
+            self.listbox.pack(fill=tk.BOTH, expand=True, pady=(4, 0))
+        self._keys: List[str] = []
+        self._pending: Optional[str] = None  # after() id of the queued search
+        self._last: Optional[str] = None
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", lambda e: self._pick(0))
+        self.entry.bind("<Down>", self._focus_list)
+        self.entry.bind("<Escape>", lambda e: self.clear())
+        self.listbox.bind("<Double-1>", lambda e: self._pick_selected())
+        self.listbox.bind("<Return>", lambda e: self._pick_selected())
+
+    def clear(self) -> None:
+        self.entry.delete(0, tk.END)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Run the search for the current text now."""
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._pending = None
+        text = self.entry.get()
+        self._last = text
+        results = self.search(text)
+        self._keys = [key for key, _ in results]
+        self.listbox.delete(0, tk.END)
+        for _, label in results:
+            self.listbox.insert(tk.END, label)
+        if self.collapse:
+            if results and not self.listbox.winfo_ismapped():
+                self.listbox.pack(fill=tk.BOTH, expand=True, pady=(4, 0))
+            elif not results:
+                self.listbox.pack_forget()
+
+    def _on_key(self, event) -> None:
+        if self.entry.get() == self._last:
+            return  # arrows, shift, ...: nothing to search
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.delay_ms, self.refresh)
+
+    def _focus_list(self, event) -> None:
+        if self._keys:
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+
+    def _pick_selected(self) -> None:
+        sel = self.listbox.curselection()
+        if sel:
+            self._pick(sel[0])
+
+    def _pick(self, index: int) -> None:
+        if self._pending is not None:
+            self.refresh()  # Enter right after typing: use results for the full text
+        if index < len(self._keys):
+            self.on_pick(self._keys[index])
+
+
+class EditableGrid(ttk.Frame):
+    """
+    Spreadsheet-style grid over a Treeview. The `fixed` columns are
+    read-only labels, the `editable` ones are cells. An Entry sits on the
+    current cell: typing edits it; Enter, Tab, Shift-Tab and the Up/Down
+    arrows commit and move; Escape undoes the cell; a click moves there.
+    Pasting a tab/newline separated block (a spreadsheet copy) fills cells
+    from the current one. `validate(text)` returns the text to show or
+    raises ValueError; a cell cleared to blank goes back to its saved
+    value. Edits collect in a change set until mark_saved() or discard(),
+    and edited rows are highlighted. Each edit touches one row of the
+    Treeview, so the grid stays quick at thousands of rows.
+    """
+
+    def __init__(self, master, fixed: Sequence[Tuple[str, int]], editable: Sequence[str],
+                 validate: Callable[[str], str], on_change: Optional[Callable[[], None]] = None,
+                 cell_width: int = 70, **tree_kw):
+        super().__init__(master)
+        self.validate = validate
+        self.on_change = on_change or (lambda: None)
+        self.editable = list(editable)
+        self._nfixed = len(fixed)
+        cols = [f"c{i}" for i in range(len(fixed) + len(editable))]
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", selectmode="none", **tree_kw)
+        for col, (text, width) in zip(cols, list(fixed) + [(name, cell_width) for name in editable]):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor=tk.CENTER, stretch=False)
+        yscroll = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        xscroll = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(yscrollcommand=lambda a, b: self._on_scroll(yscroll, a, b),
+                            xscrollcommand=lambda a, b: self._on_scroll(xscroll, a, b))
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        yscroll.grid(row=0, column=1, sticky="ns")
+        xscroll.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.tree.tag_configure("edited", background="#fff4c2")
+        style = ttk.Style(self)
+        style.map("Grid.TEntry", fieldbackground=[("invalid", "#ffd6d6")])
+        self.editor = ttk.Entry(self.tree, style="Grid.TEntry", justify=tk.CENTER)
+        self.error: Optional[str] = None  # why the last input was rejected, for a status line
+
+        self._keys: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._fixed: Dict[str, List[Any]] = {}
+        self._saved: Dict[str, List[str]] = {}       # key -> editable values as loaded/saved
+        self.changes: Dict[str, Dict[int, str]] = {}  # key -> {editable column: new text}
+        self._cursor = (0, 0)                         # (row, editable column)
+        self._placing = False
+
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Configure>", lambda e: self._place_editor())
+        for key, move in (("<Return>", (1, 0)), ("<Down>", (1, 0)), ("<Up>", (-1, 0)),
+                          ("<Tab>", (0, 1)), ("<Shift-Tab>", (0, -1)), ("<ISO_Left_Tab>", (0, -1))):
+            self.editor.bind(key, lambda e, m=move: self.move(*m))
+        self.editor.bind("<Escape>", lambda e: self._load_editor())
+        self.editor.bind("<<Paste>>", self._paste)
+
+    # ---------- contents ----------
+    def set_rows(self, rows: Sequence[Tuple[str, Sequence[Any], Sequence[Any]]]) -> None:
+        """Show (key, fixed values, editable values) rows, dropping any unsaved edits."""
+        self.tree.delete(*self._keys)
+        self._keys = [key for key, _, _ in rows]
+        self._row_of = {key: i for i, key in enumerate(self._keys)}
+        self._fixed = {key: list(fixed) for key, fixed, _ in rows}
+        self._saved = {key: ["" if v is None else str(v) for v in values] for key, _, values in rows}
+        self.changes.clear()
+        for key in self._keys:
+            self.tree.insert("", tk.END, iid=key, values=self._fixed[key] + self._saved[key])
+        self._cursor = (0, 0)
+        self.tree.yview_moveto(0)
+        self._load_editor()
+        self.on_change()
+
+    @property
+    def pending(self) -> int:
+        """Number of edited cells not saved yet."""
+        return sum(len(cols) for cols in self.changes.values())
+
+    def edits(self) -> List[Tuple[str, Dict[str, str]]]:
+        """The change set as (key, {column name: text}), in row order."""
+        return [(key, {self.editable[c]: text for c, text in self.changes[key].items()})
+                for key in self._keys if key in self.changes]
+
+    def mark_saved(self) -> None:
+        """The change set was stored: make it the saved state."""
+        for key, cols in self.changes.items():
+            for c, text in cols.items():
+                self._saved[key][c] = text
+            self.tree.item(key, tags=())
+        self.changes.clear()
+        self.on_change()
+
+    def discard(self) -> None:
+        for key in list(self.changes):
+            del self.changes[key]
+            self._show_row(key)
+        self._load_editor()
+        self.on_change()
+
+    def commit_editor(self) -> bool:
+        """Store what is typed in the current cell; False (and self.error) if it is invalid."""
+        if not self._keys:
+            return True
+        row, col = self._cursor
+        self.error = self._set_cell(row, col, self.editor.get())
+        if self.error:
+            self.editor.state(["invalid"])
+            self.on_change()
+            return False
+        self.editor.state(["!invalid"])
+        self._show_row(self._keys[row])
+        self.on_change()
+        return True
+
+    def _value(self, key: str, col: int) -> str:
+        return self.changes.get(key, {}).get(col, self._saved[key][col])
+
+    def _set_cell(self, row: int, col: int, text: str) -> Optional[str]:
+        """Record one cell's new text in the change set; returns an error message instead if invalid."""
+        key = self._keys[row]
+        text = text.strip()
+        if text:
+            try:
+                text = self.validate(text)
+            except ValueError as e:
+                return str(e)
+        else:
+            text = self._saved[key][col]  # blank: back to the saved value
+        cols = self.changes.setdefault(key, {})
+        if text == self._saved[key][col]:
+            cols.pop(col, None)
+        else:
+            cols[col] = text
+        if not cols:
+            del self.changes[key]
+        return None
+
+    def _show_row(self, key: str) -> None:
+        values = self._fixed[key] + [self._value(key, c) for c in range(len(self.editable))]
+        self.tree.item(key, values=values, tags=("edited",) if key in self.changes else ())
+
+    # ---------- editor ----------
+    def move(self, drow: int, dcol: int) -> str:
+        if self._keys and self.commit_editor():
+            row, col = self._cursor
+            self._cursor = (min(max(row + drow, 0), len(self._keys) - 1),
+                            min(max(col + dcol, 0), len(self.editable) - 1))
+            self._load_editor()
+        return "break"
+
+    def _on_click(self, event) -> Optional[str]:
+        key = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)  # "#1", "#2", ...
+        if not key or not column:
+            return None
+        col = int(column[1:]) - 1 - self._nfixed
+        if col < 0:
+            return "break"
+        if self.commit_editor():
+            self._cursor = (self._row_of[key], col)
+            self._load_editor()
+        return "break"
+
+    def _load_editor(self) -> None:
+        """Put the editor on the current cell, showing its value."""
+        self.editor.state(["!invalid"])
+        if not self._keys:
+            self.editor.place_forget()
+            return
+        row, col = self._cursor
+        key = self._keys[row]
+        self.tree.see(key)
+        self.editor.delete(0, tk.END)
+        self.editor.insert(0, self._value(key, col))
+        self.editor.select_range(0, tk.END)
+        self.editor.focus_set()
+        self._place_editor()
+
+    def _place_editor(self) -> None:
+        if not self._keys:
+            return
+        row, col = self._cursor
+        bbox = self.tree.bbox(self._keys[row], f"c{self._nfixed + col}")
+        if bbox:
+            x, y, w, h = bbox
+            self.editor.place(x=x, y=y, width=w, height=h)
+        else:
+            self.editor.place_forget()  # scrolled out of view; typing still goes to it
+
+    def _on_scroll(self, bar: ttk.Scrollbar, first: str, last: str) -> None:
+        bar.set(first, last)
+        if not self._placing:
+            self._placing = True
+            self.after_idle(self._after_scroll)
+
+    def _after_scroll(self) -> None:
+        self._placing = False
+        self._place_editor()
+
+    # ---------- paste ----------
+    def _paste(self, event) -> Optional[str]:
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return "break"
+        text = text.replace("\r\n", "\n").replace("\r", "\n").rstrip("\n")
+        if "\t" not in text and "\n" not in text:
+            return None  # one value: an ordinary paste into the cell
+        if not self.commit_editor():
+            return "break"
+        row0, col0 = self._cursor
+        lines = text.split("\n")
+        errors: List[str] = []
+        touched = []
+        for r, line in enumerate(lines):
+            row = row0 + r
+            if row >= len(self._keys):
+                errors.append(f"{len(lines) - r} rows past the end")
+                break
+            for c, cell in enumerate(line.split("\t")):
+                if col0 + c >= len(self.editable):
+                    break
+                err = self._set_cell(row, col0 + c, cell)
+                if err:
+                    errors.append(f"row {row + 1}, {self.editable[col0 + c]}: {err}")
+            touched.append(self._keys[row])
+        for key in touched:
+            self._show_row(key)
+        self.error = None
+        if errors:
+            more = f" (+{len(errors) - 1} more)" if len(errors) > 1 else ""
+            self.error = f"Skipped {errors[0]}{more}"
+        self._load_editor()
+        self.on_change()
+        return "break"